@@ -1,22 +1,42 @@
 import os
+import csv
+import sqlite3
+import hashlib
 import tempfile
 import mimetypes
 import uuid
+import time
+import logging
 from datetime import datetime
-from flask import Flask, jsonify, request
+from flask import Flask, Response, g, jsonify, request, stream_with_context
 from werkzeug.utils import secure_filename
-from dotenv import load_dotenv
-from docx import Document
-import openpyxl
 import boto3
+from botocore.config import Config as BotoConfig
 from botocore.exceptions import ClientError, NoCredentialsError
 from services.claude_service import ClaudeService
-
-# Load environment variables from .env file
-load_dotenv()
+from services.model_router import ModelRouter
+from services.docx_extractor import extract_docx_text
+from services.table_serializer import serialize_table
+from services.workbook_service import WorkbookService, read_workbook_sheets, sheets_to_text, should_split
+from services.token_estimator import estimate_request_tokens
+from services.metrics import RequestTimer, metrics
+from services.fast_json import FastJSONProvider, dumps as json_dumps
+from services.compression import COMPRESSIBLE_MIMETYPES, choose_encoding, compress, compress_stream
+from services.request_coalescer import CoalesceTimeout, RequestCoalescer
+from services.near_duplicate import NearDuplicateIndex, confirms_duplicate, fingerprint_file
+from services.revision_index import (RevisionDiff, RevisionIndex, merge_revision, pdf_text_layer,
+                                     revised_rows_text, source_rows)
+from services.result_store import ResultStore
+from services.s3_outbox import S3Outbox
+from services.reconciliation import ClaimsError, normalize_claims, parse_claims_csv, reconcile
+from config import Config, setup_logging  # also loads .env
 
 # Initialize Flask app
 app = Flask(__name__)
+app.json = FastJSONProvider(app)  # orjson when installed
+
+# Non-blocking JSON logging - must run before anything below logs
+setup_logging(app)
 
 # Configure Flask app with environment variables
 app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', 'fallback-secret-key')
@@ -27,6 +47,98 @@ AWS_ACCESS_KEY_ID = os.environ.get('AWS_ACCESS_KEY_ID')
 AWS_SECRET_ACCESS_KEY = os.environ.get('AWS_SECRET_ACCESS_KEY')
 AWS_S3_BUCKET = os.environ.get('AWS_S3_BUCKET', 'saasverse-timesheet-files')
 AWS_S3_REGION = os.environ.get('AWS_S3_REGION', 'ap-southeast-2')
+AWS_S3_ENDPOINT_URL = os.environ.get('AWS_S3_ENDPOINT_URL')  # optional, e.g. MinIO or a local stub
+S3_KEY_PREFIX = 'timesheets/'
+S3_DOWNLOAD_CHUNK_SIZE = 1024 * 1024  # 1MB chunks when streaming objects from S3
+
+# Durable S3 outbox - files are spooled locally and uploaded by background threads with retries
+S3_OUTBOX = os.environ.get('S3_OUTBOX', 'true').lower() == 'true'
+S3_OUTBOX_WORKERS = int(os.environ.get('S3_OUTBOX_WORKERS', 2))  # upload threads per gunicorn worker
+S3_OUTBOX_MAX_ATTEMPTS = int(os.environ.get('S3_OUTBOX_MAX_ATTEMPTS', 10))
+
+# Multi-sheet workbooks - 'parallel' extracts each timesheet sheet concurrently, 'single' sends one prompt
+XLSX_SHEET_MODE = os.environ.get('XLSX_SHEET_MODE', 'parallel')
+SHEET_MAX_WORKERS = int(os.environ.get('SHEET_MAX_WORKERS', 8))
+MAX_TIMESHEET_SHEETS = int(os.environ.get('MAX_TIMESHEET_SHEETS', 24))
+
+# Response compression - gzip/brotli for clients that send Accept-Encoding
+COMPRESS_RESPONSES = os.environ.get('COMPRESS_RESPONSES', 'true').lower() == 'true'
+COMPRESS_MIN_SIZE = int(os.environ.get('COMPRESS_MIN_SIZE', 1024))  # bytes; smaller bodies gain nothing
+GZIP_LEVEL = int(os.environ.get('GZIP_LEVEL', 6))
+BROTLI_QUALITY = int(os.environ.get('BROTLI_QUALITY', 4))
+
+# Direct-to-S3 uploads - clients PUT/POST straight to the bucket, bypassing MAX_CONTENT_LENGTH
+PRESIGNED_URL_EXPIRY = int(os.environ.get('PRESIGNED_URL_EXPIRY', 900))  # seconds
+MAX_DIRECT_UPLOAD_SIZE = int(os.environ.get('MAX_DIRECT_UPLOAD_SIZE', 100 * 1024 * 1024))  # 100MB
+
+# Model routing - short text-layer timesheets start on the fast model and are escalated to the
+# strong model when the result fails validation, is low-confidence or its days don't add up
+MODEL_ROUTING = os.environ.get('MODEL_ROUTING', 'true').lower() == 'true'
+CLAUDE_FAST_MODEL = os.environ.get('CLAUDE_FAST_MODEL', 'claude-haiku-4-5')
+CLAUDE_STRONG_MODEL = os.environ.get('CLAUDE_STRONG_MODEL', 'claude-sonnet-4-5-20250929')
+ROUTING_MAX_FAST_TOKENS = int(os.environ.get('ROUTING_MAX_FAST_TOKENS', 6000))
+ROUTING_MAX_FAST_ROWS = int(os.environ.get('ROUTING_MAX_FAST_ROWS', 120))
+
+# 'tool' has Claude fill a schema-constrained record_timesheet call with compact day rows;
+# 'json' is the older free-form JSON reply
+CLAUDE_OUTPUT_FORMAT = os.environ.get('CLAUDE_OUTPUT_FORMAT', 'tool')
+
+model_router = None
+if MODEL_ROUTING:
+    model_router = ModelRouter(
+        CLAUDE_FAST_MODEL,
+        CLAUDE_STRONG_MODEL,
+        min_confidence=Config.MIN_CONFIDENCE,
+        max_fast_tokens=ROUTING_MAX_FAST_TOKENS,
+        max_fast_rows=ROUTING_MAX_FAST_ROWS,
+        hours_tolerance=Config.MATCH_TOLERANCE_HOURS
+    )
+
+# Local state shared by all gunicorn workers on this host (SQLite files)
+DATA_DIR = os.environ.get('DATA_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data'))
+
+# Single-flight coalescing - duplicate in-flight extractions wait for the first one
+COALESCE_REQUESTS = os.environ.get('COALESCE_REQUESTS', 'true').lower() == 'true'
+COALESCE_WAIT_TIMEOUT = int(os.environ.get('COALESCE_WAIT_TIMEOUT', 120))  # seconds
+IDEMPOTENCY_REPLAY_TTL = int(os.environ.get('IDEMPOTENCY_REPLAY_TTL', 24 * 3600))  # seconds
+# Also share a result with duplicates arriving this soon after it completed (0 = in-flight duplicates only)
+COALESCE_SHARE_WINDOW = float(os.environ.get('COALESCE_SHARE_WINDOW', 0))  # seconds
+
+coalescer = None
+if COALESCE_REQUESTS:
+    coalescer = RequestCoalescer(
+        os.path.join(DATA_DIR, 'coalescing.db'),
+        replay_ttl=IDEMPOTENCY_REPLAY_TTL,
+        wait_timeout=COALESCE_WAIT_TIMEOUT,
+        share_window=COALESCE_SHARE_WINDOW
+    )
+
+# Near-duplicate scans/photos - 'flag' re-extracts and adds an anomaly when the content confirms the match,
+# 'reuse' returns the earlier extraction without calling Claude (only safe if clients don't share templates)
+NEAR_DUPLICATE_POLICY = os.environ.get('NEAR_DUPLICATE_POLICY', 'flag')  # flag | reuse | off
+NEAR_DUPLICATE_THRESHOLD = int(os.environ.get('NEAR_DUPLICATE_THRESHOLD', 6))  # bits of the 64-bit perceptual hash
+
+near_duplicates = None
+if NEAR_DUPLICATE_POLICY in ('reuse', 'flag'):
+    near_duplicates = NearDuplicateIndex(os.path.join(DATA_DIR, 'near_duplicates.db'),
+                                         threshold=NEAR_DUPLICATE_THRESHOLD)
+
+# Revised timesheets - a resubmitted XLSX/DOCX/text-layer PDF is diffed against the earlier version's rows
+# and only the changed rows are extracted again (or re-valued locally when only numbers changed)
+INCREMENTAL_EXTRACTION = os.environ.get('INCREMENTAL_EXTRACTION', 'true').lower() == 'true'
+REVISION_MIN_SIMILARITY = float(os.environ.get('REVISION_MIN_SIMILARITY', 0.8))  # fraction of rows shared
+REVISION_MAX_PDF_PAGES = 10
+
+revisions = None
+if INCREMENTAL_EXTRACTION:
+    revisions = RevisionIndex(os.path.join(DATA_DIR, 'revisions.db'), min_similarity=REVISION_MIN_SIMILARITY)
+
+# Every extraction is kept for /api/timesheets queries and reports
+STORE_RESULTS = os.environ.get('STORE_RESULTS', 'true').lower() == 'true'
+TIMESHEETS_PAGE_SIZE = 50
+TIMESHEETS_MAX_PAGE_SIZE = 500
+
+result_store = ResultStore(os.path.join(DATA_DIR, 'results.db')) if STORE_RESULTS else None
 
 # Initialize S3 client only if credentials are available
 s3_client = None
@@ -38,14 +150,28 @@ try:
             's3',
             aws_access_key_id=AWS_ACCESS_KEY_ID,
             aws_secret_access_key=AWS_SECRET_ACCESS_KEY,
-            region_name=AWS_S3_REGION
+            region_name=AWS_S3_REGION,
+            endpoint_url=AWS_S3_ENDPOINT_URL,
+            config=BotoConfig(signature_version='s3v4')  # presigned POST policies need SigV4
         )
         s3_enabled = True
-        print(f'S3 enabled: bucket={AWS_S3_BUCKET}, region={AWS_S3_REGION}')
+        app.logger.info(f'S3 enabled: bucket={AWS_S3_BUCKET}, region={AWS_S3_REGION}')
     else:
-        print('S3 disabled: AWS credentials not found')
+        app.logger.warning('S3 disabled: AWS credentials not found')
 except Exception as e:
-    print(f'S3 init failed: {str(e)}')
+    app.logger.error(f'S3 init failed: {str(e)}')
+
+s3_outbox = None
+if s3_enabled and S3_OUTBOX:
+    s3_outbox = S3Outbox(
+        os.path.join(DATA_DIR, 's3_outbox.db'),
+        os.path.join(DATA_DIR, 's3_spool'),
+        s3_client,
+        AWS_S3_BUCKET,
+        workers=S3_OUTBOX_WORKERS,
+        max_attempts=S3_OUTBOX_MAX_ATTEMPTS
+    )
+    s3_outbox.start()
 
 # Supported file extensions and MIME types
 ALLOWED_EXTENSIONS = {'pdf', 'docx', 'xlsx', 'png', 'jpg', 'jpeg'}
@@ -57,6 +183,79 @@ ALLOWED_MIMETYPES = {
     'image/jpeg'
 }
 
+# Endpoints whose stage timings are exported via Server-Timing and /metrics
+INSTRUMENTED_ENDPOINTS = {'upload_file', 'process_from_s3', 's3_upload_only'}
+
+@app.before_request
+def start_request_timer():
+    """Attach a request id and a fresh stage timer to every request"""
+    g.request_id = request.headers.get('X-Request-ID') or uuid.uuid4().hex
+    g.timer = RequestTimer()
+
+@app.after_request
+def record_request_timings(response):
+    """Emit Server-Timing and fold stage timings into the /metrics histograms"""
+    timer = g.get('timer')
+    if timer is None or request.endpoint not in INSTRUMENTED_ENDPOINTS:
+        return response
+
+    if response.status_code >= 500:
+        outcome = 'error'
+    elif response.status_code >= 400:
+        outcome = 'rejected'
+    else:
+        outcome = g.get('outcome', 'success')
+
+    total = timer.elapsed()
+    response.headers['Server-Timing'] = timer.server_timing_header(total)
+    response.headers['X-Request-ID'] = g.request_id
+    metrics.observe_request(timer, g.get('file_type', 'unknown'), outcome, total)
+
+    # Routine successes are sampled (LOG_SUCCESS_SAMPLE_RATE); anything else is always logged
+    routine = outcome in ('success', 'coalesced', 'replayed', 'near_duplicate')
+    level = logging.ERROR if outcome == 'error' else logging.INFO if routine else logging.WARNING
+    app.logger.log(level, 'request completed', extra={
+        'endpoint': request.endpoint,
+        'status': response.status_code,
+        'outcome': outcome,
+        'file_type': g.get('file_type'),
+        'file_hash': g.get('file_hash'),
+        'file_size_bytes': g.get('file_size'),
+        'duration_ms': round(total * 1000, 1),
+        'stages_ms': {stage: round(seconds * 1000, 1) for stage, seconds in timer.spans.items()},
+        'token_usage': {field: count for field, count in timer.usage.items() if count},
+        'input_tokens_estimate': timer.input_tokens_estimate,
+        'models': timer.models,
+        'sample': routine
+    })
+    return response
+
+@app.after_request
+def compress_response(response):
+    """Negotiated gzip/brotli encoding of larger JSON and text bodies (runs before the timing hook)"""
+    if (not COMPRESS_RESPONSES or response.direct_passthrough or 'Content-Encoding' in response.headers
+            or response.status_code < 200 or response.status_code in (204, 304)
+            or response.mimetype not in COMPRESSIBLE_MIMETYPES):
+        return response
+
+    response.vary.add('Accept-Encoding')
+    encoding = choose_encoding(request.accept_encodings)
+    if encoding is None:
+        return response
+
+    if response.is_streamed:
+        response.response = compress_stream(response.response, encoding, GZIP_LEVEL, BROTLI_QUALITY)
+    else:
+        data = response.get_data()
+        if len(data) < COMPRESS_MIN_SIZE:
+            return response
+        started = time.perf_counter()
+        response.set_data(compress(data, encoding, GZIP_LEVEL, BROTLI_QUALITY))
+        if g.get('timer') is not None:
+            g.timer.add_span('compress', time.perf_counter() - started)
+    response.headers['Content-Encoding'] = encoding
+    return response
+
 def allowed_file(filename):
     """Check if file extension is allowed"""
     return '.' in filename and \
@@ -78,32 +277,56 @@ def get_file_type(filename):
     }
     return type_mapping.get(extension, 'unknown')
 
-def upload_to_s3(file_bytes, filename, content_type=None):
-    """Upload file to S3 and return public URL. Returns None if S3 not enabled or upload fails."""
+def build_s3_key(filename, file_hash=None):
+    """Generate organized S3 key path: timesheets/YYYY/MM/uniqueid_filename (the id is content-derived if hashed)"""
+    now = datetime.utcnow()
+    safe_name = secure_filename(filename)
+    unique_id = file_hash[:16] if file_hash else uuid.uuid4().hex[:8]
+    return f'{S3_KEY_PREFIX}{now.year}/{now.strftime("%m")}/{unique_id}_{safe_name}'
+
+def build_s3_url(s3_key):
+    """Build the public URL for an object in the timesheet bucket"""
+    return f'https://{AWS_S3_BUCKET}.s3.{AWS_S3_REGION}.amazonaws.com/{s3_key}'
+
+def guess_content_type(filename):
+    """Map a filename to the content type stored alongside the S3 object"""
+    ext = filename.rsplit('.', 1)[-1].lower() if '.' in filename else ''
+    content_type_map = {
+        'pdf': 'application/pdf',
+        'png': 'image/png',
+        'jpg': 'image/jpeg',
+        'jpeg': 'image/jpeg',
+        'doc': 'application/msword',
+        'docx': 'application/vnd.openxmlformats-officedocument.wordprocessingml.document',
+        'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+    }
+    return content_type_map.get(ext, 'application/octet-stream')
+
+def upload_to_s3(file_bytes, filename, content_type=None, file_hash=None):
+    """
+    Persist a file to S3 and return (public URL, status)
+
+    With the outbox the file is spooled and acknowledged with its final URL and status
+    'pending' (or 'uploaded' if already in S3); otherwise it is uploaded inline.
+    Returns (None, None) if S3 is not enabled or the upload fails.
+    """
     if not s3_enabled or not s3_client:
-        return None
+        return None, None
 
-    try:
-        # Generate organized S3 key path: timesheets/YYYY/MM/uniqueid_filename
-        now = datetime.utcnow()
-        safe_name = secure_filename(filename)
-        unique_id = uuid.uuid4().hex[:8]
-        s3_key = f'timesheets/{now.year}/{now.strftime("%m")}/{unique_id}_{safe_name}'
-
-        # Determine content type if not provided
-        if not content_type:
-            ext = filename.rsplit('.', 1)[-1].lower() if '.' in filename else ''
-            content_type_map = {
-                'pdf': 'application/pdf',
-                'png': 'image/png',
-                'jpg': 'image/jpeg',
-                'jpeg': 'image/jpeg',
-                'doc': 'application/msword',
-                'docx': 'application/vnd.openxmlformats-officedocument.wordprocessingml.document',
-                'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-            }
-            content_type = content_type_map.get(ext, 'application/octet-stream')
+    # Determine content type if not provided
+    if not content_type:
+        content_type = guess_content_type(filename)
+    file_hash = file_hash or hashlib.sha256(file_bytes).hexdigest()
+    s3_key = build_s3_key(filename, file_hash)
+
+    if s3_outbox is not None:
+        try:
+            status = s3_outbox.enqueue(file_bytes, s3_key, file_hash, filename, content_type)
+            return build_s3_url(s3_key), status['state']
+        except (OSError, sqlite3.Error) as e:
+            app.logger.warning(f'S3 outbox unavailable, uploading inline: {str(e)}', extra={'file_name': filename})
 
+    try:
         # Upload to S3
         s3_client.put_object(
             Bucket=AWS_S3_BUCKET,
@@ -113,77 +336,387 @@ def upload_to_s3(file_bytes, filename, content_type=None):
         )
 
         # Build and return public URL
-        s3_url = f'https://{AWS_S3_BUCKET}.s3.{AWS_S3_REGION}.amazonaws.com/{s3_key}'
-        print(f'File uploaded to S3: {s3_url}')
-        return s3_url
+        s3_url = build_s3_url(s3_key)
+        app.logger.debug(f'File uploaded to S3: {s3_url}')
+        return s3_url, 'uploaded'
 
     except (NoCredentialsError, ClientError, Exception) as e:
-        print(f'S3 upload failed: {str(e)}')
-        return None
+        app.logger.warning(f'S3 upload failed: {str(e)}', extra={'file_name': filename})
+        return None, None
 
-def extract_text_from_docx(file_path):
-    """Extract text from Word documents"""
+def download_from_s3(s3_key, destination, hasher=None):
+    """Stream an S3 object into an open binary file in chunks, optionally hashing it. Returns bytes written."""
+    response = s3_client.get_object(Bucket=AWS_S3_BUCKET, Key=s3_key)
+    body = response['Body']
+    written = 0
     try:
-        doc = Document(file_path)
-        text = ""
-
-        # Extract paragraphs
-        for paragraph in doc.paragraphs:
-            text += paragraph.text + "\n"
-
-        # Extract tables
-        for table in doc.tables:
-            for row in table.rows:
-                for cell in row.cells:
-                    text += cell.text + " "
-                text += "\n"
+        for chunk in body.iter_chunks(chunk_size=S3_DOWNLOAD_CHUNK_SIZE):
+            destination.write(chunk)
+            if hasher is not None:
+                hasher.update(chunk)
+            written += len(chunk)
+    finally:
+        body.close()
+    destination.flush()
+    return written
 
-        return text.strip()
+def extract_text_from_docx(file_path):
+    """Extract text from Word documents (streamed, tables serialized compactly)"""
+    try:
+        return extract_docx_text(file_path, table_formatter=serialize_table).strip()
     except Exception as e:
         raise Exception(f"Failed to extract text from Word document: {str(e)}")
 
-def extract_text_from_xlsx(file_path):
-    """Extract text from Excel files"""
+def read_xlsx_sheets(file_path):
+    """Serialize and classify every non-empty sheet of an Excel file"""
     try:
-        workbook = openpyxl.load_workbook(file_path, data_only=True)
-        text = ""
-
-        for sheet_name in workbook.sheetnames:
-            worksheet = workbook[sheet_name]
-            text += f"Sheet: {sheet_name}\n"
-
-            for row in worksheet.iter_rows():
-                row_text = []
-                for cell in row:
-                    if cell.value is not None:
-                        row_text.append(str(cell.value))
-                if row_text:
-                    text += " ".join(row_text) + "\n"
-
-        return text.strip()
+        return read_workbook_sheets(file_path)
     except Exception as e:
         raise Exception(f"Failed to extract text from Excel file: {str(e)}")
 
+def extract_text_from_xlsx(file_path):
+    """Extract text from Excel files as one compact table per non-empty sheet"""
+    return sheets_to_text(read_xlsx_sheets(file_path))
+
 def calculate_match_status(extracted_hours, claimed_hours, confidence_score):
     """Calculate match status based on variance and confidence"""
-    if confidence_score < 0.7:
+    if confidence_score < Config.MIN_CONFIDENCE:
         return "Low Confidence"
 
     variance = abs(extracted_hours - claimed_hours)
 
-    if variance <= 0.5:
+    if variance <= Config.MATCH_TOLERANCE_HOURS:
         return "Match"
-    elif variance <= 2.0:
+    elif variance <= Config.MINOR_MISMATCH_HOURS:
         return "Minor Mismatch"
     else:
         return "Mismatch"
 
+def read_source_text(file_path, file_extension, file_bytes=None):
+    """
+    Serialized text of a DOCX, XLSX or text-layer PDF, for diffing against earlier versions
+
+    Returns:
+        tuple: (text or None, xlsx sheets or None) - workbooks extracted sheet by sheet have no single text
+    """
+    try:
+        if file_extension == 'docx':
+            return extract_text_from_docx(file_path), None
+        if file_extension == 'xlsx':
+            sheets = read_xlsx_sheets(file_path)
+            if XLSX_SHEET_MODE == 'parallel' and should_split(sheets):
+                return None, sheets
+            return sheets_to_text(sheets), sheets
+        if file_extension == 'pdf':
+            if file_bytes is None:
+                with open(file_path, 'rb') as f:
+                    file_bytes = f.read()
+            return pdf_text_layer(file_bytes, REVISION_MAX_PDF_PAGES), None
+    except Exception as e:
+        app.logger.warning(f'Reading document text for revision lookup failed: {str(e)}')
+    return None, None
+
+def extract_revision(claude_service, revision, rows):
+    """
+    Extract a revised timesheet from its earlier version, re-extracting only the changed rows
+
+    Returns:
+        dict: merged result with changed_days and revision_of, or None when the whole
+        document must be extracted (metadata rows changed or a partial extraction failed)
+    """
+    previous = revision['result']
+    daily_breakdown = previous.get('daily_breakdown') or []
+    diff = RevisionDiff(revision['rows'], rows, {entry.get('date') for entry in daily_breakdown})
+    if diff.metadata_changed:
+        return None
+
+    updates = diff.apply_numeric_locally(daily_breakdown)
+    partial = None
+    if diff.redo_rows():
+        text = revised_rows_text(diff, previous)
+        claude_service.timer.input_tokens_estimate = estimate_request_tokens('text', text=text)
+        partial = claude_service.extract_from_text(text)
+        if extraction_outcome(partial) != 'success':
+            return None
+
+    result = merge_revision(previous, diff, updates, partial)
+    if result is None:
+        return None
+    mode = 'partial' if partial is not None else 'local' if result['changed_days'] else 'unchanged'
+    result['revision_of'] = {
+        'file_hash': revision['file_hash'],
+        'file_name': revision['file_name'],
+        'uploaded_at': datetime.utcfromtimestamp(revision['created_at']).isoformat(),
+        'similarity': round(revision['similarity'], 3),
+        'mode': mode
+    }
+    return result
+
+def extract_with_claude(claude_service, file_path, file_extension, file_bytes=None, text=None, sheets=None):
+    """Run the Claude extraction pipeline for a file already written to disk (text/sheets if already read)"""
+    if file_extension in ['pdf', 'png', 'jpg', 'jpeg']:
+        # Send file bytes directly to Claude
+        if file_bytes is None:
+            with open(file_path, 'rb') as f:
+                file_bytes = f.read()
+        claude_service.timer.input_tokens_estimate = estimate_request_tokens(file_extension, file_bytes=file_bytes)
+        return claude_service.extract_timesheet_data(file_bytes, file_extension)
+
+    elif file_extension == 'docx':
+        # Extract text from Word document and send to Claude
+        try:
+            extracted_text = text
+            if extracted_text is None:
+                with claude_service.timer.span('extract'):
+                    extracted_text = extract_text_from_docx(file_path)
+            claude_service.timer.input_tokens_estimate = estimate_request_tokens(file_extension, text=extracted_text)
+            return claude_service.extract_from_text(extracted_text)
+        except Exception as e:
+            return {
+                'extracted_hours': 0,
+                'confidence_score': 0.0,
+                'summary': f'Error extracting from Word document: {str(e)}',
+                'daily_breakdown': [],
+                'anomalies': ['Word document processing failed']
+            }
+
+    elif file_extension == 'xlsx':
+        # Extract text from Excel file and send to Claude
+        try:
+            if sheets is None:
+                with claude_service.timer.span('extract'):
+                    sheets = read_xlsx_sheets(file_path)
+
+            # Workbooks with several timesheet sheets get one concurrent Claude call per sheet
+            if XLSX_SHEET_MODE == 'parallel' and should_split(sheets):
+                claude_service.timer.input_tokens_estimate = sum(
+                    estimate_request_tokens(file_extension, text=sheet.text)
+                    for sheet in sheets if sheet.kind == 'timesheet'
+                )
+                workbook_service = WorkbookService(claude_service, SHEET_MAX_WORKERS, MAX_TIMESHEET_SHEETS)
+                return workbook_service.extract(sheets)
+
+            extracted_text = sheets_to_text(sheets)
+            claude_service.timer.input_tokens_estimate = estimate_request_tokens(file_extension, text=extracted_text)
+            return claude_service.extract_from_text(extracted_text)
+        except Exception as e:
+            return {
+                'extracted_hours': 0,
+                'confidence_score': 0.0,
+                'summary': f'Error extracting from Excel file: {str(e)}',
+                'daily_breakdown': [],
+                'anomalies': ['Excel file processing failed']
+            }
+
+    return None
+
+def extract_timesheet(claude_service, file_path, file_extension, file_bytes=None, file_hash=None, filename=None):
+    """
+    Extract a timesheet, building on earlier submissions where possible
+
+    The extraction of an earlier near-duplicate scan or photo is reused or flagged, and a
+    revised version of an earlier text-based timesheet only has its changed rows extracted.
+    """
+    fingerprint = None
+    match = None
+    if near_duplicates is not None and file_extension in ('pdf', 'png', 'jpg', 'jpeg'):
+        with claude_service.timer.span('phash'):
+            fingerprint = fingerprint_file(file_path, file_extension)
+            if fingerprint is not None:
+                match = near_duplicates.safe_find(fingerprint)
+
+    if match is not None:
+        duplicate_of = {
+            'file_hash': match['file_hash'],
+            'file_name': match['file_name'],
+            'uploaded_at': datetime.utcfromtimestamp(match['created_at']).isoformat(),
+            'distance': match['distance'],
+            'reused': NEAR_DUPLICATE_POLICY == 'reuse'
+        }
+        if duplicate_of['reused']:
+            claude_result = dict(match['result'])
+            claude_result['near_duplicate_of'] = duplicate_of
+            return claude_result
+
+    text, sheets, rows = None, None, []
+    if revisions is not None and file_extension in ('docx', 'xlsx', 'pdf'):
+        with claude_service.timer.span('extract'):
+            text, sheets = read_source_text(file_path, file_extension, file_bytes)
+        rows = source_rows(text)
+        revision = None
+        if rows:
+            with claude_service.timer.span('revision'):
+                revision = revisions.safe_find(rows, file_extension, file_hash)
+        if revision is not None:
+            claude_result = extract_revision(claude_service, revision, rows)
+            metrics.inc('timesheet_incremental_extractions_total',
+                        labels={'mode': claude_result['revision_of']['mode'] if claude_result else 'full'})
+            if claude_result is not None:
+                if file_hash:
+                    revisions.safe_add(file_hash, filename, file_extension, rows, claude_result,
+                                       supersedes=revision['file_hash'])
+                return claude_result
+
+    claude_result = extract_with_claude(claude_service, file_path, file_extension, file_bytes,
+                                        text=text if file_extension != 'pdf' else None, sheets=sheets)
+    if claude_result is None:
+        return None
+    if rows and file_hash and extraction_outcome(claude_result) == 'success':
+        revisions.safe_add(file_hash, filename, file_extension, rows, claude_result)
+
+    # The same template filled in for another week hashes alike - only flag if the content agrees too
+    if match is not None and confirms_duplicate(match['result'], claude_result):
+        claude_result['anomalies'] = list(claude_result['anomalies']) + [
+            f"Possible duplicate submission: matches {match['file_name']} "
+            f"uploaded {duplicate_of['uploaded_at'][:10]}"
+        ]
+        claude_result['near_duplicate_of'] = duplicate_of
+    elif fingerprint is not None and file_hash and extraction_outcome(claude_result) == 'success':
+        near_duplicates.safe_add(fingerprint, file_hash, filename, claude_result)
+    return claude_result
+
+def extraction_outcome(claude_result):
+    """Metrics outcome label - failed extractions come back with a 0.0 confidence score"""
+    if claude_result.get('near_duplicate_of', {}).get('reused'):
+        return 'near_duplicate'
+    return 'success' if claude_result['confidence_score'] > 0 else 'extraction_failed'
+
+def build_extraction_response(filename, file_size, claude_result, s3_url, claimed_hours=None,
+                              input_tokens_estimate=None, s3_status=None):
+    """Build the JSON body returned to Salesforce for a processed timesheet"""
+    response_data = {
+        'success': True,
+        'file_name': filename,
+        'file_type': get_file_type(filename),
+        'file_size_bytes': file_size,
+        'extracted_hours': claude_result['extracted_hours'],
+        'confidence_score': claude_result['confidence_score'],
+        'summary': claude_result['summary'],
+        'daily_breakdown': claude_result['daily_breakdown'],
+        'anomalies': claude_result['anomalies'],
+        'approval_status': claude_result.get('approval_status'),
+        'approver_name': claude_result.get('approver_name'),
+        'resource_name': claude_result.get('resource_name'),
+        'period': claude_result.get('period'),
+        's3_url': s3_url,
+        's3_uploaded': s3_url is not None,
+        's3_status': s3_status,
+        'input_tokens_estimate': input_tokens_estimate,
+        'model': claude_result.get('model'),
+        'escalated': bool(claude_result.get('escalated_from'))
+    }
+
+    # Earlier submission of the same scan or photo
+    if claude_result.get('near_duplicate_of'):
+        response_data['near_duplicate_of'] = claude_result['near_duplicate_of']
+
+    # Revision of an earlier text-based timesheet - only the listed days were extracted again
+    if claude_result.get('revision_of'):
+        response_data['revision_of'] = claude_result['revision_of']
+        response_data['changed_days'] = claude_result['changed_days']
+
+    # Per-sheet sub-results for workbooks extracted sheet by sheet
+    if claude_result.get('sheets'):
+        response_data['sheets'] = claude_result['sheets']
+        response_data['skipped_sheets'] = claude_result.get('skipped_sheets', [])
+
+    # Add match status if claimed_hours provided
+    if claimed_hours is not None:
+        match_status = calculate_match_status(
+            claude_result['extracted_hours'],
+            claimed_hours,
+            claude_result['confidence_score']
+        )
+        variance = abs(claude_result['extracted_hours'] - claimed_hours)
+
+        response_data.update({
+            'claimed_hours': claimed_hours,
+            'match_status': match_status,
+            'variance': variance
+        })
+
+    return response_data
+
+def persist_extraction(response_data, file_hash):
+    """Store a successful extraction response and tag it with its timesheet_id; never fails the request"""
+    # Failed extractions (confidence 0, no hours) are not records, and must not replace a good one
+    if result_store is None or not file_hash or response_data['confidence_score'] <= 0:
+        return
+    try:
+        # A revision replaces the earlier version in the rollups instead of counting alongside it
+        supersedes = (response_data.get('revision_of') or {}).get('file_hash')
+        with g.timer.span('store'):
+            response_data['timesheet_id'] = result_store.save(response_data, file_hash, g.request_id,
+                                                              supersedes=supersedes)
+    except Exception as e:
+        app.logger.warning(f'Failed to store extraction result: {str(e)}', extra={'file_hash': file_hash})
+
+def coalescing_key(*parts):
+    """Fingerprint of everything that determines an extraction response"""
+    return hashlib.sha256('\x1f'.join('' if part is None else str(part) for part in parts).encode()).hexdigest()
+
+def run_single_flight(key, compute, idempotency_key=None):
+    """
+    Run compute() once per key across workers and turn its result into a response
+
+    compute returns (body, status, cacheable). Concurrent duplicates wait for the
+    first request's result; with an Idempotency-Key, cacheable results are also
+    replayed to later retries for IDEMPOTENCY_REPLAY_TTL seconds.
+    """
+    if coalescer is None:
+        body, status, _ = compute()
+        return jsonify(body), status
+
+    started = time.perf_counter()
+    try:
+        body, status, role = coalescer.run(key, compute, idempotent=bool(idempotency_key),
+                                           started_at=time.time() - g.timer.elapsed())
+    except CoalesceTimeout:
+        response = jsonify({
+            'success': False,
+            'error': 'Request in progress',
+            'message': 'An identical request is still being processed, retry later',
+            's3_url': None,
+            's3_uploaded': False
+        })
+        response.status_code = 409
+        response.headers['Retry-After'] = '5'
+        return response
+
+    if role != 'leader':
+        g.timer.add_span('coalesce', time.perf_counter() - started)
+        g.outcome = 'coalesced' if role == 'follower' else 'replayed'
+    response = jsonify(body)
+    response.status_code = status
+    response.headers['X-Single-Flight'] = role
+    return response
+
+def internal_error_response(e):
+    """Standard 500 body for failures inside the extraction endpoints"""
+    app.logger.error('Unhandled error during file processing', exc_info=e)
+    return jsonify({
+        'success': False,
+        'error': 'Internal server error',
+        'message': 'An unexpected error occurred during file processing',
+        'details': str(e) if os.getenv('FLASK_ENV') == 'development' else 'Contact support',
+        'extracted_hours': 0,
+        'confidence_score': 0,
+        'daily_breakdown': [],
+        'match_status': 'Error',
+        's3_url': None,
+        's3_uploaded': False
+    }), 500
+
 @app.route('/api/upload', methods=['POST'])
 def upload_file():
     """Handle file upload and process with Claude AI"""
     try:
+        # Parse the multipart body up front so its cost lands in the read span
+        with g.timer.span('read'):
+            files = request.files
+
         # Check if file is present in request
-        if 'file' not in request.files:
+        if 'file' not in files:
             return jsonify({
                 'success': False,
                 'error': 'No file provided',
@@ -192,7 +725,7 @@ def upload_file():
                 's3_uploaded': False
             }), 400
 
-        file = request.files['file']
+        file = files['file']
 
         # Check if file was actually selected
         if file.filename == '':
@@ -232,135 +765,273 @@ def upload_file():
 
         # Secure the filename
         filename = secure_filename(file.filename)
-        detected_file_type = get_file_type(filename)
         file_extension = filename.rsplit('.', 1)[1].lower()
+        g.file_type = get_file_type(filename)
 
         # Read file bytes once - reused for both AI extraction and S3 upload
-        file_bytes = file.read()
+        with g.timer.span('read'):
+            file_bytes = file.read()
+        g.file_hash = hashlib.sha256(file_bytes).hexdigest()
+        g.file_size = len(file_bytes)
 
-        # Initialize Claude service
-        claude_service = ClaudeService()
+        def process():
+            # Initialize Claude service
+            claude_service = ClaudeService(timer=g.timer, router=model_router, output_format=CLAUDE_OUTPUT_FORMAT)
 
-        # Create temporary file for processing
-        with tempfile.NamedTemporaryFile(delete=False, suffix=f'_{filename}') as tmp_file:
-            try:
-                # Write file bytes to temp file
-                tmp_file.write(file_bytes)
-                tmp_file.flush()
-                file_size = len(file_bytes)
+            # Create temporary file for processing
+            with tempfile.NamedTemporaryFile(delete=False, suffix=f'_{filename}') as tmp_file:
+                try:
+                    # Write file bytes to temp file
+                    tmp_file.write(file_bytes)
+                    tmp_file.flush()
+                    file_size = len(file_bytes)
 
-                # Process file based on type
-                claude_result = None
+                    # Process file based on type
+                    claude_result = extract_timesheet(claude_service, tmp_file.name, file_extension, file_bytes,
+                                                      g.file_hash, filename)
+                    g.outcome = extraction_outcome(claude_result)
 
-                if file_extension in ['pdf', 'png', 'jpg', 'jpeg']:
-                    # Send file bytes directly to Claude
-                    claude_result = claude_service.extract_timesheet_data(file_bytes, file_extension)
+                    # ---- S3 UPLOAD ----
+                    with g.timer.span('s3'):
+                        s3_url, s3_status = upload_to_s3(file_bytes, filename, file_hash=g.file_hash)
 
-                elif file_extension == 'docx':
-                    # Extract text from Word document and send to Claude
-                    try:
-                        extracted_text = extract_text_from_docx(tmp_file.name)
-                        claude_result = claude_service.extract_from_text(extracted_text)
-                    except Exception as e:
-                        claude_result = {
-                            'extracted_hours': 0,
-                            'confidence_score': 0.0,
-                            'summary': f'Error extracting from Word document: {str(e)}',
-                            'daily_breakdown': [],
-                            'anomalies': ['Word document processing failed']
-                        }
-
-                elif file_extension == 'xlsx':
-                    # Extract text from Excel file and send to Claude
+                    response_data = build_extraction_response(filename, file_size, claude_result, s3_url,
+                                                              claimed_hours, g.timer.input_tokens_estimate,
+                                                              s3_status)
+                    persist_extraction(response_data, g.file_hash)
+                    return response_data, 200, g.outcome != 'extraction_failed'
+
+                finally:
+                    # Clean up temporary file
                     try:
-                        extracted_text = extract_text_from_xlsx(tmp_file.name)
-                        claude_result = claude_service.extract_from_text(extracted_text)
-                    except Exception as e:
-                        claude_result = {
-                            'extracted_hours': 0,
-                            'confidence_score': 0.0,
-                            'summary': f'Error extracting from Excel file: {str(e)}',
-                            'daily_breakdown': [],
-                            'anomalies': ['Excel file processing failed']
-                        }
-
-                # ---- S3 UPLOAD ----
-                s3_url = upload_to_s3(file_bytes, filename)
-
-                # Build response data
-                response_data = {
-                    'success': True,
-                    'file_name': filename,
-                    'file_type': detected_file_type,
-                    'file_size_bytes': file_size,
-                    'extracted_hours': claude_result['extracted_hours'],
-                    'confidence_score': claude_result['confidence_score'],
-                    'summary': claude_result['summary'],
-                    'daily_breakdown': claude_result['daily_breakdown'],
-                    'anomalies': claude_result['anomalies'],
-                    'approval_status': claude_result.get('approval_status'),
-                    'approver_name': claude_result.get('approver_name'),
-                    'resource_name': claude_result.get('resource_name'),
-                    'period': claude_result.get('period'),
-                    's3_url': s3_url,
-                    's3_uploaded': s3_url is not None
-                }
-
-                # Add match status if claimed_hours provided
-                if claimed_hours is not None:
-                    match_status = calculate_match_status(
-                        claude_result['extracted_hours'],
-                        claimed_hours,
-                        claude_result['confidence_score']
-                    )
-                    variance = abs(claude_result['extracted_hours'] - claimed_hours)
-
-                    response_data.update({
-                        'claimed_hours': claimed_hours,
-                        'match_status': match_status,
-                        'variance': variance
-                    })
-
-                return jsonify(response_data), 200
-
-            finally:
-                # Clean up temporary file
-                try:
-                    os.unlink(tmp_file.name)
-                except OSError:
-                    pass  # File might already be deleted
+                        os.unlink(tmp_file.name)
+                    except OSError:
+                        pass  # File might already be deleted
+
+        # Salesforce retries a timed-out callout while the first attempt is still running
+        idempotency_key = request.headers.get('Idempotency-Key')
+        key = coalescing_key('upload', g.file_hash, filename, claimed_hours, idempotency_key)
+        return run_single_flight(key, process, idempotency_key)
 
     except Exception as e:
+        return internal_error_response(e)
+
+@app.route('/api/presign', methods=['POST'])
+def presign_upload():
+    """Issue a presigned PUT URL and POST policy so clients can upload straight to S3"""
+    if not s3_enabled or not s3_client:
         return jsonify({
             'success': False,
-            'error': 'Internal server error',
-            'message': 'An unexpected error occurred during file processing',
-            'details': str(e) if os.getenv('FLASK_ENV') == 'development' else 'Contact support',
-            'extracted_hours': 0,
-            'confidence_score': 0,
-            'daily_breakdown': [],
-            'match_status': 'Error',
-            's3_url': None,
-            's3_uploaded': False
+            'error': 'S3 not configured',
+            'message': 'Direct uploads require S3 credentials on the server'
+        }), 503
+
+    payload = request.get_json(silent=True) or {}
+    filename = payload.get('filename')
+    if not filename:
+        return jsonify({
+            'success': False,
+            'error': 'No filename provided',
+            'message': 'Please provide the name of the file to upload'
+        }), 400
+
+    if not allowed_file(filename):
+        return jsonify({
+            'success': False,
+            'error': 'Unsupported file type',
+            'message': f'Allowed types: {", ".join(ALLOWED_EXTENSIONS)}',
+            'filename': filename
+        }), 415
+
+    # The signed type always follows the extension, so a .pdf key cannot be stored as e.g. text/html
+    content_type = guess_content_type(filename)
+    if payload.get('content_type') and payload['content_type'] != content_type:
+        return jsonify({
+            'success': False,
+            'error': 'Content type mismatch',
+            'message': f'{filename} must be uploaded as {content_type}',
+            'filename': filename
+        }), 400
+
+    s3_key = build_s3_key(filename)
+
+    try:
+        put_url = s3_client.generate_presigned_url(
+            'put_object',
+            Params={'Bucket': AWS_S3_BUCKET, 'Key': s3_key, 'ContentType': content_type},
+            ExpiresIn=PRESIGNED_URL_EXPIRY
+        )
+        # POST policy enforces the size limit server-side; a presigned PUT cannot
+        post_policy = s3_client.generate_presigned_post(
+            Bucket=AWS_S3_BUCKET,
+            Key=s3_key,
+            Fields={'Content-Type': content_type},
+            Conditions=[
+                {'Content-Type': content_type},
+                ['content-length-range', 1, MAX_DIRECT_UPLOAD_SIZE]
+            ],
+            ExpiresIn=PRESIGNED_URL_EXPIRY
+        )
+    except (NoCredentialsError, ClientError) as e:
+        return jsonify({
+            'success': False,
+            'error': 'Presign failed',
+            'message': str(e)
         }), 500
 
+    return jsonify({
+        'success': True,
+        's3_key': s3_key,
+        's3_url': build_s3_url(s3_key),
+        'content_type': content_type,
+        'expires_in': PRESIGNED_URL_EXPIRY,
+        'max_size_bytes': MAX_DIRECT_UPLOAD_SIZE,
+        'put': {
+            'url': put_url,
+            'method': 'PUT',
+            'headers': {'Content-Type': content_type}
+        },
+        'post': {
+            'url': post_policy['url'],
+            'fields': post_policy['fields']
+        }
+    }), 200
+
+@app.route('/api/process', methods=['POST'])
+def process_from_s3():
+    """Run the extraction pipeline on a file the client already uploaded to S3"""
+    try:
+        if not s3_enabled or not s3_client:
+            return jsonify({
+                'success': False,
+                'error': 'S3 not configured',
+                'message': 'Processing from S3 requires S3 credentials on the server',
+                's3_url': None,
+                's3_uploaded': False
+            }), 503
+
+        payload = request.get_json(silent=True) or {}
+        s3_key = payload.get('s3_key') or ''
+
+        # Only objects under our own prefix may be processed
+        if not s3_key.startswith(S3_KEY_PREFIX) or '..' in s3_key:
+            return jsonify({
+                'success': False,
+                'error': 'Invalid s3_key',
+                'message': f's3_key must be a key issued by /api/presign (prefix {S3_KEY_PREFIX})',
+                's3_url': None,
+                's3_uploaded': False
+            }), 400
+
+        claimed_hours = None
+        if payload.get('claimed_hours') not in (None, ''):
+            try:
+                claimed_hours = float(payload['claimed_hours'])
+            except (TypeError, ValueError):
+                return jsonify({
+                    'success': False,
+                    'error': 'Invalid claimed_hours',
+                    'message': 'claimed_hours must be a valid number',
+                    's3_url': None,
+                    's3_uploaded': False
+                }), 400
+
+        filename = s3_key.rsplit('/', 1)[-1]
+        if not allowed_file(filename):
+            return jsonify({
+                'success': False,
+                'error': 'Unsupported file type',
+                'message': f'Allowed types: {", ".join(ALLOWED_EXTENSIONS)}',
+                'filename': filename,
+                's3_url': None,
+                's3_uploaded': False
+            }), 415
+
+        s3_url = build_s3_url(s3_key)
+
+        try:
+            head = s3_client.head_object(Bucket=AWS_S3_BUCKET, Key=s3_key)
+        except ClientError as e:
+            if e.response.get('Error', {}).get('Code') in ('404', 'NoSuchKey', 'NotFound'):
+                return jsonify({
+                    'success': False,
+                    'error': 'File not found',
+                    'message': f'No object found for s3_key {s3_key}',
+                    's3_url': None,
+                    's3_uploaded': False
+                }), 404
+            raise
+
+        if head.get('ContentLength', 0) > MAX_DIRECT_UPLOAD_SIZE:
+            return jsonify({
+                'success': False,
+                'error': 'File too large',
+                'message': f'File size exceeds the maximum limit of {MAX_DIRECT_UPLOAD_SIZE // (1024 * 1024)}MB',
+                's3_url': s3_url,
+                's3_uploaded': True
+            }), 413
+
+        file_extension = filename.rsplit('.', 1)[1].lower()
+        g.file_type = get_file_type(filename)
+
+        def process():
+            claude_service = ClaudeService(timer=g.timer, router=model_router, output_format=CLAUDE_OUTPUT_FORMAT)
+
+            # Stream the object to a temp file rather than buffering it in memory
+            with tempfile.NamedTemporaryFile(delete=False, suffix=f'_{secure_filename(filename)}') as tmp_file:
+                try:
+                    hasher = hashlib.sha256()
+                    with g.timer.span('read'):
+                        file_size = download_from_s3(s3_key, tmp_file, hasher)
+                    g.file_size = file_size
+                    g.file_hash = hasher.hexdigest()
+                    claude_result = extract_timesheet(claude_service, tmp_file.name, file_extension,
+                                                      file_hash=g.file_hash, filename=filename)
+                    g.outcome = extraction_outcome(claude_result)
+
+                    response_data = build_extraction_response(filename, file_size, claude_result, s3_url,
+                                                              claimed_hours, g.timer.input_tokens_estimate,
+                                                              'uploaded')
+                    persist_extraction(response_data, g.file_hash)
+                    return response_data, 200, g.outcome != 'extraction_failed'
+
+                finally:
+                    try:
+                        os.unlink(tmp_file.name)
+                    except OSError:
+                        pass
+
+        # The ETag pins the object version, so duplicates are detected before downloading
+        idempotency_key = request.headers.get('Idempotency-Key')
+        key = coalescing_key('process', s3_key, head.get('ETag'), claimed_hours, idempotency_key)
+        return run_single_flight(key, process, idempotency_key)
+
+    except Exception as e:
+        return internal_error_response(e)
+
 @app.route('/api/s3-upload', methods=['POST'])
 def s3_upload_only():
     """Upload a file to S3 without AI processing - useful for evidence files"""
     try:
-        file = request.files.get('file')
+        with g.timer.span('read'):
+            file = request.files.get('file')
         if not file:
             return jsonify({'success': False, 'error': 'No file provided'}), 400
 
-        file_bytes = file.read()
+        with g.timer.span('read'):
+            file_bytes = file.read()
         filename = file.filename
+        g.file_size = len(file_bytes)
+        g.file_type = get_file_type(filename)
 
-        s3_url = upload_to_s3(file_bytes, filename)
+        with g.timer.span('s3'):
+            s3_url, s3_status = upload_to_s3(file_bytes, filename)
 
         if s3_url:
             return jsonify({
                 'success': True,
                 's3_url': s3_url,
+                's3_status': s3_status,
                 'filename': filename,
                 'size': len(file_bytes)
             }), 200
@@ -372,6 +1043,166 @@ def s3_upload_only():
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
+@app.route('/api/s3-status', methods=['GET'])
+def s3_upload_status():
+    """Outbox status of files accepted for S3, by s3_key, s3_url or file_hash"""
+    if s3_outbox is None:
+        return jsonify({
+            'success': False,
+            'error': 'S3 outbox disabled',
+            'message': 'Files are uploaded inline; set S3_OUTBOX=true and configure S3 to track uploads'
+        }), 503
+
+    s3_key = request.args.get('s3_key')
+    s3_url = request.args.get('s3_url')
+    file_hash = request.args.get('file_hash')
+    if s3_url and not s3_key:
+        prefix = build_s3_url('')
+        s3_key = s3_url[len(prefix):] if s3_url.startswith(prefix) else None
+    if not s3_key and not file_hash:
+        return jsonify({
+            'success': False,
+            'error': 'Missing parameter',
+            'message': 'Provide s3_key, s3_url (of this bucket) or file_hash'
+        }), 400
+
+    if s3_key:
+        status = s3_outbox.status(s3_key)
+        uploads = [status] if status else []
+    else:
+        uploads = s3_outbox.status_by_file_hash(file_hash)
+    if not uploads:
+        return jsonify({'success': False, 'error': 'Not found', 'message': 'No upload recorded for this file'}), 404
+    for upload in uploads:
+        upload['s3_url'] = build_s3_url(upload['s3_key'])
+    return jsonify({'success': True, 'uploads': uploads})
+
+def store_unavailable_response():
+    return jsonify({
+        'success': False,
+        'error': 'Result store disabled',
+        'message': 'Set STORE_RESULTS=true to keep extraction results'
+    }), 503
+
+@app.route('/api/timesheets', methods=['GET'])
+def list_timesheets():
+    """Query stored extractions by resource, period, month, approval status, file hash or upload time"""
+    if result_store is None:
+        return store_unavailable_response()
+
+    args = request.args
+    try:
+        limit = min(int(args.get('limit', TIMESHEETS_PAGE_SIZE)), TIMESHEETS_MAX_PAGE_SIZE)
+        cursor = int(args['cursor']) if args.get('cursor') else None
+    except ValueError:
+        return jsonify({
+            'success': False,
+            'error': 'Invalid pagination',
+            'message': 'limit and cursor must be integers'
+        }), 400
+
+    timesheets, next_cursor = result_store.query(
+        resource=args.get('resource'),
+        period=args.get('period'),
+        month=args.get('month'),
+        approval_status=args.get('approval_status'),
+        file_hash=args.get('file_hash'),
+        uploaded_from=args.get('uploaded_from'),
+        uploaded_to=args.get('uploaded_to'),
+        include_duplicates=args.get('include_duplicates', 'true').lower() == 'true',
+        cursor=cursor,
+        limit=max(limit, 1)
+    )
+    return jsonify({
+        'success': True,
+        'timesheets': timesheets,
+        'count': len(timesheets),
+        'next_cursor': next_cursor
+    }), 200
+
+@app.route('/api/timesheets/<int:timesheet_id>', methods=['GET'])
+def get_timesheet(timesheet_id):
+    """A stored extraction including its daily breakdown"""
+    if result_store is None:
+        return store_unavailable_response()
+
+    timesheet = result_store.get(timesheet_id)
+    if timesheet is None:
+        return jsonify({
+            'success': False,
+            'error': 'Timesheet not found',
+            'message': f'No stored extraction with id {timesheet_id}'
+        }), 404
+    return jsonify({'success': True, 'timesheet': timesheet}), 200
+
+@app.route('/api/timesheets/hours-by-month', methods=['GET'])
+def hours_by_month():
+    """Hours per resource per calendar month across all stored extractions"""
+    if result_store is None:
+        return store_unavailable_response()
+
+    rows = result_store.hours_by_resource_month(
+        resource=request.args.get('resource'),
+        month_from=request.args.get('from'),
+        month_to=request.args.get('to')
+    )
+    return jsonify({'success': True, 'rows': rows, 'count': len(rows)}), 200
+
+@app.route('/api/reconcile', methods=['POST'])
+def reconcile_claims():
+    """
+    Reconcile a batch of claimed hours against stored extractions
+
+    Accepts a CSV (multipart 'file' or text/csv body) or JSON ({"claims": [...]} or a list)
+    with resource, period or date, and claimed_hours per row. Streams one NDJSON line per
+    resource/month followed by a summary line.
+    """
+    if result_store is None:
+        return store_unavailable_response()
+
+    try:
+        if 'file' in request.files:
+            rows = parse_claims_csv(request.files['file'].read().decode('utf-8-sig'))
+        elif request.is_json:
+            payload = request.get_json(silent=True)
+            rows = payload.get('claims') if isinstance(payload, dict) else payload
+        else:
+            rows = parse_claims_csv(request.get_data(as_text=True))
+        if not isinstance(rows, list) or not rows:
+            raise ClaimsError([{'row': None, 'error': 'No claims provided'}])
+        claims, day_claims = normalize_claims(rows)
+    except ClaimsError as e:
+        return jsonify({
+            'success': False,
+            'error': 'Invalid claims',
+            'message': str(e),
+            'errors': e.errors[:50]
+        }), 400
+    except (UnicodeDecodeError, csv.Error) as e:
+        return jsonify({
+            'success': False,
+            'error': 'Invalid claims',
+            'message': f'Could not read claims: {str(e)}'
+        }), 400
+
+    thresholds = {
+        'match_tolerance': Config.MATCH_TOLERANCE_HOURS,
+        'minor_mismatch': Config.MINOR_MISMATCH_HOURS,
+        'min_confidence': Config.MIN_CONFIDENCE
+    }
+
+    # reconcile() reads on its own connection, so a fresh store needs its tables first
+    result_store.ensure_schema()
+
+    def generate():
+        totals = {}
+        for result in reconcile(result_store.db_path, claims, day_claims, thresholds):
+            totals[result['match_status']] = totals.get(result['match_status'], 0) + 1
+            yield json_dumps(result) + '\n'
+        yield json_dumps({'summary': {'rows': len(claims), 'match_status': totals}}) + '\n'
+
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
 @app.route('/')
 def health():
     """Health check endpoint"""
@@ -407,9 +1238,15 @@ def api_status():
         'version': '1.0.0',
         'status': 'operational',
         'supported_formats': list(ALLOWED_EXTENSIONS),
-        's3_enabled': s3_enabled
+        's3_enabled': s3_enabled,
+        's3_outbox': s3_outbox.stats() if s3_outbox is not None else None
     })
 
+@app.route('/metrics')
+def prometheus_metrics():
+    """Prometheus scrape endpoint for per-stage latency histograms and token counters"""
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
 @app.errorhandler(413)
 def too_large(error):
     """Handle file too large error"""
@@ -428,7 +1265,10 @@ def not_found(error):
         'success': False,
         'error': 'Not Found',
         'message': 'The requested endpoint does not exist',
-        'available_endpoints': ['/', '/health', '/api/status', '/api/upload (POST)', '/api/s3-upload (POST)']
+        'available_endpoints': ['/', '/health', '/api/status', '/api/upload (POST)', '/api/s3-upload (POST)', '/api/s3-status',
+                                '/api/presign (POST)', '/api/process (POST)', '/api/timesheets',
+                                '/api/timesheets/<id>', '/api/timesheets/hours-by-month', '/api/reconcile (POST)',
+                                '/metrics']
     }), 404
 
 @app.errorhandler(405)
@@ -0,0 +1,80 @@
+"""
+DOCX extraction: python-docx object model vs the streaming extractor.
+
+Times both extractors on synthetic timesheet templates with merged header,
+total and per-week cells, and compares output size (the text sent to Claude).
+
+    python -m benchmarks.bench_docx --repeat 20
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+from docx import Document
+
+from benchmarks.corpus import make_docx
+from services.docx_extractor import extract_docx_text
+
+TEMPLATES = {
+    'month, merged header/total': {'days': 22},
+    'month, weekly merged notes': {'days': 22, 'week_merge': 1},
+    'half year, merged header/total': {'days': 120},
+    'half year, weekly merged notes': {'days': 120, 'week_merge': 1},
+}
+
+
+def legacy_extract(file_path):
+    """The previous app.extract_text_from_docx implementation"""
+    doc = Document(file_path)
+    text = ""
+    for paragraph in doc.paragraphs:
+        text += paragraph.text + "\n"
+    for table in doc.tables:
+        for row in table.rows:
+            for cell in row.cells:
+                text += cell.text + " "
+            text += "\n"
+    return text.strip()
+
+
+def time_call(func, path, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        output = func(path)
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples), output
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0].strip())
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--file', action='append', help='Also benchmark a real .docx template (repeatable)')
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cases = []
+        for name, size in TEMPLATES.items():
+            path = os.path.join(tmp, f'{len(cases)}.docx')
+            with open(path, 'wb') as f:
+                f.write(make_docx(**size))
+            cases.append((name, path))
+        for path in args.file or []:
+            cases.append((os.path.basename(path), path))
+
+        print(f"{'template':<34}{'legacy ms':>11}{'stream ms':>11}{'speedup':>9}"
+              f"{'legacy chars':>14}{'stream chars':>14}{'saved':>8}")
+        for name, path in cases:
+            legacy_time, legacy_text = time_call(legacy_extract, path, args.repeat)
+            stream_time, stream_text = time_call(extract_docx_text, path, args.repeat)
+            saved = 1 - len(stream_text) / len(legacy_text) if legacy_text else 0.0
+            print(f'{name:<34}{legacy_time * 1000:>11.2f}{stream_time * 1000:>11.2f}'
+                  f'{legacy_time / stream_time:>8.1f}x{len(legacy_text):>14}{len(stream_text):>14}{saved:>8.0%}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,83 @@
+"""
+Response serialization: stdlib json vs orjson, and bytes on the wire.
+
+Serializes a typical /api/upload response, a 500-row /api/timesheets page and a
+6,000-row reconciliation batch with the stdlib encoder (Flask's default
+provider) and with orjson, times parsing a Claude reply, and reports body
+size uncompressed, gzipped and (when installed) brotli-compressed.
+
+    python -m benchmarks.bench_json --repeat 200
+"""
+import argparse
+import json
+import sys
+import time
+
+from benchmarks.fakes import fake_timesheet_result
+from services.compression import available_encodings, compress
+from services.fast_json import orjson
+
+
+def upload_response(days):
+    result = fake_timesheet_result(days)
+    return dict(result, success=True, file_name='timesheet.xlsx', file_type='xlsx', file_size_bytes=48213,
+                s3_url='https://bucket.s3.ap-southeast-2.amazonaws.com/timesheets/x.xlsx', s3_uploaded=True,
+                input_tokens_estimate=2400, model='claude-haiku-4-5', escalated=False,
+                claimed_hours=176.0, match_status='Match', variance=0.0)
+
+
+def payloads():
+    timesheets = [dict(upload_response(22), id=number, request_id=f'{number:032x}') for number in range(500)]
+    reconcile = [{'resource_name': f'Resource {number % 900}', 'month': f'2026-{number % 12 + 1:02d}',
+                  'claimed_hours': 160.0, 'extracted_hours': 158.5, 'confidence_score': 0.92, 'timesheets': 1,
+                  'approval_status': 'Approved', 'variance': 1.5, 'match_status': 'Minor Mismatch'}
+                 for number in range(6000)]
+    return {
+        'upload, 22 days': upload_response(22),
+        'upload, 120 days': upload_response(120),
+        'timesheets page, 500': {'success': True, 'timesheets': timesheets, 'next_cursor': 'abc'},
+        'reconcile batch, 6000': {'results': reconcile},
+    }
+
+
+def best_of(func, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0].strip())
+    parser.add_argument('--repeat', type=int, default=200)
+    args = parser.parse_args(argv)
+    if orjson is None:
+        print('orjson is not installed - only the stdlib encoder is timed')
+
+    encodings = available_encodings()
+    print(f"{'payload':<24}{'stdlib ms':>11}{'orjson ms':>11}{'bytes':>10}" +
+          ''.join(f'{encoding + " bytes":>12}{encoding + " ms":>9}' for encoding in encodings))
+    for name, payload in payloads().items():
+        repeat = max(5, args.repeat // (50 if len(json.dumps(payload)) > 1_000_000 else 1))
+        # Flask's DefaultJSONProvider in production: sorted keys, compact separators
+        stdlib = best_of(lambda: json.dumps(payload, sort_keys=True, separators=(',', ':')), repeat)
+        fast = best_of(lambda: orjson.dumps(payload, option=orjson.OPT_SORT_KEYS), repeat) if orjson else None
+        body = json.dumps(payload, sort_keys=True, separators=(',', ':')).encode()
+        line = f"{name:<24}{stdlib * 1000:>11.3f}{(fast * 1000 if fast else float('nan')):>11.3f}{len(body):>10}"
+        for encoding in encodings:
+            size = len(compress(body, encoding))
+            seconds = best_of(lambda: compress(body, encoding), max(3, repeat // 10))
+            line += f'{size:>12}{seconds * 1000:>9.2f}'
+        print(line)
+
+    reply = json.dumps(fake_timesheet_result(120), indent=4)
+    stdlib = best_of(lambda: json.loads(reply), args.repeat)
+    print(f"\nparse 120-day Claude reply: stdlib {stdlib * 1000:.3f} ms", end='')
+    print(f", orjson {best_of(lambda: orjson.loads(reply), args.repeat) * 1000:.3f} ms" if orjson else '')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
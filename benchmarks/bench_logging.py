@@ -0,0 +1,114 @@
+"""
+Per-request logging overhead, measured in the calling (request) thread.
+
+Compares the old synchronous print() calls, a synchronous JSON StreamHandler,
+and the queue-based handler from config.setup_logging with and without success
+sampling. Output goes to a real file so the synchronous variants pay genuine
+write costs.
+
+    python -m benchmarks.bench_logging --records 20000
+"""
+import argparse
+import logging
+import os
+import queue
+import sys
+import tempfile
+import time
+from logging.handlers import QueueListener
+
+from benchmarks.run_benchmarks import percentile
+from config import JsonFormatter, NonBlockingQueueHandler, RequestContextFilter, SuccessSampler
+
+# Shape of the per-request summary record logged by app.record_request_timings
+REQUEST_FIELDS = {
+    'endpoint': 'upload_file',
+    'status': 200,
+    'outcome': 'success',
+    'file_type': 'excel',
+    'file_hash': 'a69081bec5f0451aeebfd457cfb0bfe38f04832fbb93d4b0cadf2218a2e559f8',
+    'file_size_bytes': 48213,
+    'duration_ms': 5321.4,
+    'stages_ms': {'read': 1.5, 'extract': 14.7, 'claude': 5280.2, 'parse': 0.4, 's3': 24.6},
+    'token_usage': {'input_tokens': 2412, 'output_tokens': 1630},
+    'request_id': 'c0f8f8d2902143098db99c3b9d106c5e',
+    'sample': True,
+}
+
+
+def _time_calls(emit, records):
+    samples = []
+    for _ in range(records):
+        start = time.perf_counter()
+        emit()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def bench_print(path, records):
+    with open(path, 'w') as out:
+        def emit():
+            print(f'File uploaded to S3: https://bucket.s3.amazonaws.com/timesheets/{REQUEST_FIELDS["file_hash"]}',
+                  file=out, flush=True)
+        return _time_calls(emit, records)
+
+
+def _logger(name, handler):
+    logger = logging.getLogger(f'bench.{name}')
+    logger.handlers[:] = [handler]
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+    return logger
+
+
+def bench_sync_json(path, records):
+    with open(path, 'w') as out:
+        handler = logging.StreamHandler(out)
+        handler.setFormatter(JsonFormatter())
+        logger = _logger('sync', handler)
+        return _time_calls(lambda: logger.info('request completed', extra=REQUEST_FIELDS), records)
+
+
+def bench_queue_json(path, records, sample_rate):
+    with open(path, 'w') as out:
+        stream = logging.StreamHandler(out)
+        stream.setFormatter(JsonFormatter())
+        log_queue = queue.Queue(maxsize=records + 1)
+        handler = NonBlockingQueueHandler(log_queue)
+        handler.addFilter(SuccessSampler(sample_rate))
+        handler.addFilter(RequestContextFilter())
+        listener = QueueListener(log_queue, stream)
+        listener.start()
+        logger = _logger(f'queue{sample_rate}', handler)
+        samples = _time_calls(lambda: logger.info('request completed', extra=REQUEST_FIELDS), records)
+        drain_start = time.perf_counter()
+        listener.stop()
+        return samples, time.perf_counter() - drain_start
+
+
+def report(label, samples, extra=''):
+    us = lambda pct: percentile(samples, pct) * 1e6
+    print(f'  {label:<28}{us(50):>9.1f}{us(95):>9.1f}{us(99):>9.1f}{sum(samples) / len(samples) * 1e6:>10.1f}  {extra}')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0].strip())
+    parser.add_argument('--records', type=int, default=20000)
+    parser.add_argument('--sample-rate', type=float, default=0.1)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'bench.log')
+        print(f'Caller-thread cost per log call over {args.records} records (microseconds)')
+        print(f"  {'handler':<28}{'p50':>9}{'p95':>9}{'p99':>9}{'mean':>10}")
+        report('print() to file', bench_print(path, args.records))
+        report('sync JSON StreamHandler', bench_sync_json(path, args.records))
+        samples, drain = bench_queue_json(path, args.records, 1.0)
+        report('queue JSON', samples, f'listener drained backlog in {drain * 1000:.0f} ms')
+        samples, drain = bench_queue_json(path, args.records, args.sample_rate)
+        report(f'queue JSON, sample {args.sample_rate:g}', samples, f'drain {drain * 1000:.0f} ms')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
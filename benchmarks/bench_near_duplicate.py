@@ -0,0 +1,114 @@
+"""
+Near-duplicate index: lookup latency as the index grows.
+
+Fills a fresh SQLite index with random page hashes, then times lookups of
+near copies (a few bits flipped) and of unseen hashes, comparing the banded
+multi-index query with a full-table Hamming scan. Also times fingerprinting
+of the synthetic scan (and a rendered PDF when pdfplumber is installed).
+
+    python -m benchmarks.bench_near_duplicate --sizes 10000,100000,300000
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+from benchmarks.corpus import make_pdf, make_png
+from services.near_duplicate import Fingerprint, NearDuplicateIndex, fingerprint_file, hamming, pdfplumber
+from services.sqlite_store import transaction
+
+RESULT = {'extracted_hours': 40.0, 'confidence_score': 0.9, 'daily_breakdown': [], 'anomalies': []}
+
+
+def fill(index, rng, count):
+    """Bulk-insert random single-page fingerprints"""
+    conn = index._conn()
+    rows = []
+    hashes = []
+    for number in range(count):
+        value = rng.getrandbits(64)
+        hashes.append(value)
+        fingerprint = Fingerprint([value], 1)
+        rows.append(fingerprint.bands() + [1, f'["{value:016x}"]', f'bench{number}', None, '{}', 0.0])
+    with transaction(conn):
+        conn.executemany(
+            'INSERT INTO perceptual_hashes (band0, band1, band2, band3, page_count, page_hashes, '
+            'file_hash, file_name, result, created_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)', rows)
+    return hashes
+
+
+def flip(value, bits, rng):
+    for bit in rng.sample(range(64), bits):
+        value ^= 1 << bit
+    return value
+
+
+def scan(index, fingerprint):
+    """Baseline: Hamming distance against every stored hash"""
+    best = None
+    for (page_hashes,) in index._conn().execute('SELECT page_hashes FROM perceptual_hashes'):
+        distance = hamming(int(page_hashes[2:18], 16), fingerprint.page_hashes[0])
+        if distance <= index.threshold and (best is None or distance < best):
+            best = distance
+    return best
+
+
+def time_lookups(func, fingerprints):
+    samples = []
+    for fingerprint in fingerprints:
+        start = time.perf_counter()
+        func(fingerprint)
+        samples.append(time.perf_counter() - start)
+    samples.sort()
+    return statistics.median(samples), samples[int(len(samples) * 0.99) - 1]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0].strip())
+    parser.add_argument('--sizes', default='10000,100000,300000', help='Comma-separated index sizes')
+    parser.add_argument('--lookups', type=int, default=200)
+    parser.add_argument('--scan-lookups', type=int, default=10, help='Lookups timed for the full-scan baseline')
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args(argv)
+    rng = random.Random(args.seed)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        png_path = os.path.join(tmp, 'scan.png')
+        with open(png_path, 'wb') as f:
+            f.write(make_png())
+        start = time.perf_counter()
+        fingerprint_file(png_path, 'png')
+        print(f'fingerprint 1240x1754 PNG: {(time.perf_counter() - start) * 1000:.1f} ms')
+        if pdfplumber is not None:
+            pdf_path = os.path.join(tmp, 'scan.pdf')
+            with open(pdf_path, 'wb') as f:
+                f.write(make_pdf(pages=3))
+            start = time.perf_counter()
+            fingerprint_file(pdf_path, 'pdf')
+            print(f'fingerprint 3-page PDF:    {(time.perf_counter() - start) * 1000:.1f} ms')
+        print()
+
+        print(f"{'entries':>9}{'hit p50 ms':>12}{'hit p99 ms':>12}{'miss p50 ms':>13}{'miss p99 ms':>13}"
+              f"{'scan p50 ms':>13}{'recall':>8}")
+        index = NearDuplicateIndex(os.path.join(tmp, 'index.db'))
+        stored = []
+        for size in [int(value) for value in args.sizes.split(',')]:
+            stored += fill(index, rng, size - len(stored))
+            near = [Fingerprint([flip(rng.choice(stored), rng.randint(0, index.threshold), rng)], 1)
+                    for _ in range(args.lookups)]
+            unseen = [Fingerprint([rng.getrandbits(64)], 1) for _ in range(args.lookups)]
+
+            hit_p50, hit_p99 = time_lookups(index.find, near)
+            miss_p50, miss_p99 = time_lookups(index.find, unseen)
+            scan_p50, _ = time_lookups(lambda fp: scan(index, fp), near[:args.scan_lookups])
+            recall = sum(1 for fingerprint in near if index.find(fingerprint)) / len(near)
+            print(f'{size:>9}{hit_p50 * 1000:>12.3f}{hit_p99 * 1000:>12.3f}{miss_p50 * 1000:>13.3f}'
+                  f'{miss_p99 * 1000:>13.3f}{scan_p50 * 1000:>13.1f}{recall:>8.0%}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
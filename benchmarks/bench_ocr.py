@@ -0,0 +1,97 @@
+"""
+Local OCR throughput: page-parallel tesseract on a persistent process pool.
+
+OCRs synthetic multi-page scans (image-only PDFs) with OCREngine at several
+pool sizes and reports pages/s, pages/s per worker and per-page latency, plus
+the one-off cost of starting the pool. The baseline row approximates the old
+OCRService path: pages rasterized and OCRed serially, loading the language
+model for every page as each pytesseract call does (minus the process spawn).
+Needs tesserocr (or pytesseract and the tesseract CLI) and language data; set
+TESSDATA_PREFIX if it is not installed system-wide.
+
+    python -m benchmarks.bench_ocr --pages 8 --workers 1,2,4 --dpi 200
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+from benchmarks.corpus import make_scanned_pdf
+from services import ocr_engine
+from services.ocr_engine import OCREngine
+
+
+def serial_baseline(paths, dpi, tessdata):
+    """Pages/s OCRing one page at a time with a fresh tesseract instance per page"""
+    import tesserocr  # here, not at module level, so spawned pool workers do not load it early
+
+    pages = 0
+    start = time.perf_counter()
+    for path in paths:
+        pdf = ocr_engine.pypdfium2.PdfDocument(path)
+        for page in pdf:
+            image = page.render(scale=dpi / 72, grayscale=True).to_pil()
+            kwargs = {'path': tessdata} if tessdata else {}
+            with tesserocr.PyTessBaseAPI(**kwargs) as api:
+                api.SetImage(image)
+                api.GetUTF8Text()
+            pages += 1
+        pdf.close()
+    return pages / (time.perf_counter() - start)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0].strip())
+    parser.add_argument('--pages', type=int, default=8, help='Pages per scanned document')
+    parser.add_argument('--documents', type=int, default=3, help='Documents OCRed per pool size')
+    parser.add_argument('--workers', default=','.join(str(n) for n in sorted({1, 2, os.cpu_count() or 1})),
+                        help='Comma-separated pool sizes')
+    parser.add_argument('--dpi', type=int, default=200)
+    args = parser.parse_args(argv)
+
+    if not OCREngine.available():
+        print('OCR is unavailable: install Pillow and tesserocr (or pytesseract + tesseract)')
+        return 1
+
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = []
+        for seed in range(args.documents):
+            path = os.path.join(tmp, f'scan{seed}.pdf')
+            with open(path, 'wb') as f:
+                f.write(make_scanned_pdf(days=args.pages * 14, pages=args.pages, seed=seed))
+            paths.append(path)
+
+        print(f'{args.documents} documents x {args.pages} pages at {args.dpi} DPI, {os.cpu_count()} CPUs\n')
+        print(f"{'workers':>8}{'startup s':>11}{'doc p50 s':>11}{'pages/s':>9}{'pages/s/worker':>16}"
+              f"{'page p50 ms':>13}{'words/page':>12}")
+        if ocr_engine.HAVE_TESSEROCR:
+            throughput = serial_baseline(paths, args.dpi, os.environ.get('TESSDATA_PREFIX'))
+            print(f"{'baseline':>8}{'':>11}{args.pages / throughput:>11.2f}{throughput:>9.2f}{throughput:>16.2f}")
+        for workers in [int(value) for value in args.workers.split(',')]:
+            engine = OCREngine(workers=workers, dpi=args.dpi, max_pages=args.pages)
+            try:
+                start = time.perf_counter()
+                engine.warm_up()
+                startup = time.perf_counter() - start
+
+                documents = []
+                pages = []
+                for path in paths:
+                    start = time.perf_counter()
+                    result = engine.ocr_pdf(path)
+                    documents.append(time.perf_counter() - start)
+                    pages.extend(result.pages)
+            finally:
+                engine.close()
+
+            throughput = len(pages) / sum(documents)
+            print(f'{workers:>8}{startup:>11.2f}{statistics.median(documents):>11.2f}{throughput:>9.2f}'
+                  f'{throughput / workers:>16.2f}{statistics.median(p.seconds for p in pages) * 1000:>13.0f}'
+                  f'{statistics.mean(len(p.words) for p in pages):>12.0f}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
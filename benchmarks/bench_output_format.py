@@ -0,0 +1,75 @@
+"""
+Claude output format: free-form JSON reply vs compact record_timesheet tool call.
+
+Sends DOCX timesheets of growing length through ClaudeService against the stub
+Claude server in both output formats, and reports output tokens, Claude call
+latency and the parse-failure rate. The stub charges --per-output-token seconds
+per output token (default is ~50x faster than real decoding) and malforms plain
+JSON replies at --malformed-rate; tool input is returned already parsed, as the
+API does.
+
+    python -m benchmarks.bench_output_format --days 22,60,120 --requests 30
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+
+from benchmarks.corpus import make_docx
+from benchmarks.fakes import FakeClaudeServer
+from services.claude_service import ClaudeService
+from services.docx_extractor import extract_docx_text
+from services.metrics import RequestTimer
+from services.model_router import FAILED_SUMMARY_PREFIXES
+
+
+def docx_text(days, tmp):
+    path = os.path.join(tmp, f'timesheet_{days}.docx')
+    with open(path, 'wb') as f:
+        f.write(make_docx(days=days))
+    return extract_docx_text(path)
+
+
+def run(output_format, text, requests):
+    """Per-request (output_tokens, claude_seconds, failed)"""
+    samples = []
+    for _ in range(requests):
+        timer = RequestTimer()
+        service = ClaudeService(api_key='bench-key', timer=timer, output_format=output_format)
+        result = service.extract_from_text(text)
+        failed = str(result['summary']).startswith(FAILED_SUMMARY_PREFIXES)
+        samples.append((timer.usage['output_tokens'], timer.spans.get('claude', 0.0), failed))
+    return samples
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0].strip())
+    parser.add_argument('--days', default='22,60,120', help='Comma-separated daily entries per timesheet')
+    parser.add_argument('--requests', type=int, default=30, help='Requests per format and size')
+    parser.add_argument('--latency', default='0.05', help="Stub base latency 'median[:sigma]' in seconds")
+    parser.add_argument('--per-output-token', type=float, default=0.0002)
+    parser.add_argument('--malformed-rate', type=float, default=0.02)
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args(argv)
+
+    with FakeClaudeServer(latency=args.latency, per_output_token=args.per_output_token,
+                          malformed_rate=args.malformed_rate, seed=args.seed) as claude, \
+            tempfile.TemporaryDirectory() as tmp:
+        os.environ['ANTHROPIC_BASE_URL'] = claude.url
+
+        print(f"{'days':>5}{'format':>8}{'out tokens':>12}{'claude p50 ms':>15}{'claude p95 ms':>15}{'failed':>8}")
+        for days in [int(value) for value in args.days.split(',')]:
+            text = docx_text(days, tmp)
+            for output_format in ('json', 'tool'):
+                samples = run(output_format, text, args.requests)
+                latencies = sorted(seconds for _, seconds, _ in samples)
+                tokens = statistics.median(tokens for tokens, _, _ in samples)
+                failed = sum(1 for _, _, bad in samples if bad) / len(samples)
+                print(f'{days:>5}{output_format:>8}{tokens:>12.0f}{statistics.median(latencies) * 1000:>15.1f}'
+                      f'{latencies[int(len(latencies) * 0.95) - 1] * 1000:>15.1f}{failed:>8.1%}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
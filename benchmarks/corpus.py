@@ -0,0 +1,220 @@
+"""
+Synthetic timesheet corpus for offline benchmarks.
+
+Every generator returns raw file bytes so cases can be built in memory and
+posted straight to the Flask test client. Sizes are controlled by the number of
+days, sheets and pages rather than bytes, so the same case means the same
+amount of work across runs.
+"""
+import io
+import random
+import struct
+import zlib
+from datetime import date, datetime, time, timedelta
+
+import openpyxl
+from docx import Document
+
+RESOURCES = ['Priya Sharma', 'Liam Walker', 'Mei Chen', 'Oliver Smith', 'Aisha Khan']
+PROJECTS = ['Salesforce CPQ rollout', 'Data migration', 'UAT support', 'Integration build', 'Reporting']
+
+
+def _days(count, seed, start=date(2026, 1, 5)):
+    """Yield (date, start, end, hours, notes) rows for consecutive weekdays"""
+    rng = random.Random(seed)
+    current = start
+    produced = 0
+    while produced < count:
+        if current.weekday() < 5:
+            start_hour = rng.choice([8, 8, 9, 9, 10])
+            hours = rng.choice([7.5, 8, 8, 8, 8.5, 9])
+            end = datetime.combine(current, time(start_hour)) + timedelta(hours=hours + 0.5)
+            yield current, time(start_hour), end.time(), hours, rng.choice(PROJECTS)
+            produced += 1
+        current += timedelta(days=1)
+
+
+def make_xlsx(days=22, sheets=1, seed=0):
+    """Workbook with one timesheet per sheet plus a small summary sheet"""
+    workbook = openpyxl.Workbook()
+    workbook.remove(workbook.active)
+    resource = RESOURCES[seed % len(RESOURCES)]
+    totals = []
+
+    for index in range(sheets):
+        worksheet = workbook.create_sheet(f'Week {index + 1}' if sheets > 1 else 'Timesheet')
+        worksheet.append(['Consultant', resource])
+        worksheet.append(['Period', 'January 2026'])
+        worksheet.append([])
+        worksheet.append(['Date', 'Start', 'End', 'Hours', 'Notes'])
+        total = 0
+        # Each sheet continues where the previous one ended (one sheet per week/period)
+        sheet_start = date(2026, 1, 5) + timedelta(weeks=index * -(-days // 5))
+        for day, start, end, hours, notes in _days(days, seed + index, sheet_start):
+            worksheet.append([datetime.combine(day, time()), start, end, hours, notes])
+            total += hours
+        worksheet.append([])
+        worksheet.append(['Total', None, None, total, None])
+        worksheet.append(['Approved by', 'Manager Name'])
+        totals.append(total)
+
+    if sheets > 1:
+        summary = workbook.create_sheet('Summary')
+        summary.append(['Sheet', 'Hours'])
+        for index, total in enumerate(totals):
+            summary.append([f'Week {index + 1}', total])
+
+    buffer = io.BytesIO()
+    workbook.save(buffer)
+    return buffer.getvalue()
+
+
+def make_docx(days=22, seed=0, week_merge=0):
+    """Word timesheet with a merged header row and a merged total row
+
+    With week_merge=1 the Notes column is also merged vertically across each week,
+    as in templates that record one project per week.
+    """
+    document = Document()
+    resource = RESOURCES[seed % len(RESOURCES)]
+    document.add_paragraph(f'Timesheet - {resource}')
+    document.add_paragraph('Period: January 2026')
+
+    rows = list(_days(days, seed))
+    table = document.add_table(rows=len(rows) + 3, cols=5)
+    title = table.cell(0, 0).merge(table.cell(0, 4))
+    title.text = f'{resource} - January 2026'
+    for col, heading in enumerate(['Date', 'Start', 'End', 'Hours', 'Notes']):
+        table.cell(1, col).text = heading
+
+    total = 0
+    for offset, (day, start, end, hours, notes) in enumerate(rows, start=2):
+        values = [day.isoformat(), start.strftime('%H:%M'), end.strftime('%H:%M'), str(hours), notes]
+        for col, value in enumerate(values):
+            table.cell(offset, col).text = value
+        total += hours
+
+    if week_merge:
+        for first in range(2, len(rows) + 2, 5):
+            last = min(first + 4, len(rows) + 1)
+            if last > first:
+                notes = table.cell(first, 4).text
+                merged = table.cell(first, 4).merge(table.cell(last, 4))
+                merged.text = notes
+
+    total_label = table.cell(len(rows) + 2, 0).merge(table.cell(len(rows) + 2, 2))
+    total_label.text = 'Total hours'
+    table.cell(len(rows) + 2, 3).text = str(total)
+    document.add_paragraph('Approved by: Manager Name')
+
+    buffer = io.BytesIO()
+    document.save(buffer)
+    return buffer.getvalue()
+
+
+def _page_lines(days, pages, seed):
+    """Text lines of each page of a printed timesheet"""
+    rows = list(_days(days, seed))
+    resource = RESOURCES[seed % len(RESOURCES)]
+    per_page = max(1, -(-len(rows) // pages))
+    for page in range(pages):
+        lines = [f'Timesheet - {resource} - January 2026 (page {page + 1} of {pages})', 'Date Start End Hours Notes']
+        for day, start, end, hours, notes in rows[page * per_page:(page + 1) * per_page]:
+            lines.append(f'{day.isoformat()} {start.strftime("%H:%M")} {end.strftime("%H:%M")} {hours} {notes}')
+        if page == pages - 1:
+            lines.append(f'Total hours: {sum(r[3] for r in rows)}')
+        yield lines
+
+
+def make_pdf(days=22, pages=1, seed=0):
+    """Text-layer PDF with the day rows spread over the requested number of pages"""
+    streams = []
+    for lines in _page_lines(days, pages, seed):
+        text_ops = ['BT', '/F1 10 Tf', '50 800 Td', '14 TL']
+        for line in lines:
+            escaped = line.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)')
+            text_ops.append(f'({escaped}) Tj T*')
+        text_ops.append('ET')
+        streams.append('\n'.join(text_ops).encode('latin-1'))
+
+    # Objects: 1 catalog, 2 pages, 3 font, then (page, content) pairs
+    objects = [b'<< /Type /Catalog /Pages 2 0 R >>', None, b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>']
+    kids = []
+    for stream in streams:
+        page_id = len(objects) + 1
+        content_id = page_id + 1
+        kids.append(f'{page_id} 0 R')
+        objects.append(f'<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] '
+                       f'/Resources << /Font << /F1 3 0 R >> >> /Contents {content_id} 0 R >>'.encode())
+        objects.append(b'<< /Length ' + str(len(stream)).encode() + b' >>\nstream\n' + stream + b'\nendstream')
+    objects[1] = f'<< /Type /Pages /Kids [{" ".join(kids)}] /Count {len(kids)} >>'.encode()
+
+    out = io.BytesIO()
+    out.write(b'%PDF-1.4\n')
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(out.tell())
+        out.write(f'{number} 0 obj\n'.encode() + body + b'\nendobj\n')
+    xref = out.tell()
+    out.write(f'xref\n0 {len(objects) + 1}\n0000000000 65535 f \n'.encode())
+    for offset in offsets:
+        out.write(f'{offset:010d} 00000 n \n'.encode())
+    out.write(f'trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n'.encode())
+    return out.getvalue()
+
+
+def make_scanned_pdf(days=22, pages=1, seed=0, dpi=150):
+    """Image-only PDF (no text layer) of the same pages as make_pdf, as a flatbed scan would produce"""
+    from PIL import Image, ImageDraw, ImageFont
+
+    rng = random.Random(seed)
+    font = ImageFont.load_default(size=round(10 * dpi / 72))
+    images = []
+    for lines in _page_lines(days, pages, seed):
+        width, height = round(595 * dpi / 72), round(842 * dpi / 72)
+        image = Image.new('L', (width, height), 245)
+        draw = ImageDraw.Draw(image)
+        for _ in range(width * height // 2000):  # paper speckle
+            draw.point((rng.randrange(width), rng.randrange(height)), fill=rng.randint(150, 220))
+        y = round(42 * dpi / 72)
+        for line in lines:
+            draw.text((round(50 * dpi / 72), y), line, fill=20, font=font)
+            y += round(14 * dpi / 72)
+        images.append(image.rotate(rng.uniform(-0.6, 0.6), fillcolor=245))
+    buffer = io.BytesIO()
+    images[0].save(buffer, format='PDF', save_all=True, append_images=images[1:], resolution=dpi)
+    return buffer.getvalue()
+
+
+def make_png(width=1240, height=1754, seed=0):
+    """Grayscale 'scan' with noisy ruled rows - roughly an A4 page at 150 DPI"""
+    rng = random.Random(seed)
+    # Map random bytes onto light-grey paper tones so the image compresses like a real scan
+    paper = bytes(230 + (value % 26) for value in range(256))
+    raw = bytearray()
+    for y in range(height):
+        raw.append(0)  # filter type: none
+        if y % 40 < 2:
+            raw.extend(b'\x40' * width)
+        else:
+            raw.extend(rng.randbytes(width).translate(paper))
+
+    def chunk(kind, data):
+        return struct.pack('>I', len(data)) + kind + data + struct.pack('>I', zlib.crc32(kind + data) & 0xffffffff)
+
+    header = struct.pack('>IIBBBBB', width, height, 8, 0, 0, 0, 0)
+    return (b'\x89PNG\r\n\x1a\n' + chunk(b'IHDR', header) +
+            chunk(b'IDAT', zlib.compress(bytes(raw), 6)) + chunk(b'IEND', b''))
+
+
+GENERATORS = {
+    'xlsx': make_xlsx,
+    'docx': make_docx,
+    'pdf': make_pdf,
+    'png': make_png,
+}
+
+
+def build_file(file_type, **size):
+    """Generate a single synthetic file of the given type"""
+    return GENERATORS[file_type](**size)
@@ -0,0 +1,335 @@
+"""
+Stub Claude and S3 HTTP servers for offline benchmarks.
+
+The app talks to these through its normal clients: the Anthropic SDK honours
+ANTHROPIC_BASE_URL and boto3 is pointed at AWS_S3_ENDPOINT_URL. Each server
+sleeps for a configurable latency so benchmark numbers include realistic
+backend wait without any network access or API spend.
+"""
+import json
+import random
+import re
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class LatencyModel:
+    """Log-normal latency with a given median, clipped to [minimum, maximum] seconds"""
+
+    def __init__(self, median=0.0, sigma=0.0, minimum=0.0, maximum=None, seed=None):
+        self.median = median
+        self.sigma = sigma
+        self.minimum = minimum
+        self.maximum = maximum
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def sample(self):
+        if self.median <= 0:
+            return 0.0
+        with self._lock:
+            value = self.median * self._rng.lognormvariate(0, self.sigma) if self.sigma else self.median
+        value = max(self.minimum, value)
+        if self.maximum is not None:
+            value = min(self.maximum, value)
+        return value
+
+    @classmethod
+    def parse(cls, spec, seed=None):
+        """Build from 'median[:sigma]' strings used on the benchmark command lines"""
+        if isinstance(spec, cls):
+            return spec
+        parts = str(spec).split(':')
+        median = float(parts[0])
+        sigma = float(parts[1]) if len(parts) > 1 else 0.0
+        return cls(median=median, sigma=sigma, seed=seed)
+
+
+def fake_timesheet_result(days=22, dates=None):
+    """A plausible extraction result with the given number of daily entries (or the given dates)"""
+    if dates:
+        days = len(dates)
+    breakdown = []
+    for index in range(days):
+        breakdown.append({
+            'date': dates[index] if dates else f'2026-01-{(index % 28) + 1:02d}',
+            'start_time': '09:00',
+            'end_time': '17:30',
+            'hours': 8.0,
+            'notes': 'Integration build'
+        })
+    return {
+        'extracted_hours': 8.0 * days,
+        'confidence_score': 0.92,
+        'summary': f'Timesheet with {days} daily entries',
+        'daily_breakdown': breakdown,
+        'anomalies': [],
+        'approval_status': 'Approved',
+        'approver_name': 'Manager Name',
+        'resource_name': 'Priya Sharma',
+        'period': 'January 2026'
+    }
+
+
+def compact_tool_input(result):
+    """record_timesheet tool input for a result: positional day rows, trailing/optional nulls left off"""
+    tool_input = {key: value for key, value in result.items()
+                  if key != 'daily_breakdown' and value not in (None, [])}
+    tool_input['days'] = []
+    for entry in result['daily_breakdown']:
+        row = [entry['date'], entry['hours'], entry['start_time'], entry['end_time'], entry['notes']]
+        while row and row[-1] in (None, ''):
+            row.pop()
+        tool_input['days'].append(row)
+    return tool_input
+
+
+def malform(text, rng):
+    """Free-form JSON failure modes seen in practice: prose wrappers, truncation, trailing commas"""
+    mode = rng.randrange(3)
+    if mode == 0:
+        return 'Here is the extracted timesheet data:\n\n```json\n' + text + '\n```'
+    if mode == 1:
+        return text[:rng.randint(len(text) // 2, len(text) - 2)]
+    return text.replace('}\n', '},\n', 1)
+
+
+_DATE_PATTERN = re.compile(r'(?<!\d)20\d\d-\d\d-\d\d(?!\d)')
+
+
+class _ClaudeHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        body = json.loads(self.rfile.read(length) or b'{}')
+        server = self.server
+
+        # Mirror the number of days visible in text prompts so output size scales with input
+        prompt = json.dumps(body.get('messages', []))
+        dates = sorted(set(_DATE_PATTERN.findall(prompt)))
+        result = fake_timesheet_result(server.default_days, dates)
+        model = body.get('model', 'claude-bench')
+        profile = server.profile_for(model)
+        if 'confidence' in profile:
+            result['confidence_score'] = profile['confidence']
+
+        if body.get('tools'):
+            tool_input = compact_tool_input(result)
+            text = json.dumps(tool_input, separators=(',', ':'))
+            content = [{'type': 'tool_use', 'id': f'toolu_bench_{threading.get_ident()}',
+                        'name': body['tools'][0]['name'], 'input': tool_input}]
+            stop_reason = 'tool_use'
+        else:
+            text = json.dumps(result, indent=4)
+            with server.stats_lock:
+                if server.malformed_rate and server.rng.random() < server.malformed_rate:
+                    text = malform(text, server.rng)
+            content = [{'type': 'text', 'text': text}]
+            stop_reason = 'end_turn'
+
+        output_tokens = max(1, len(text) // 4)
+        latency = profile.get('latency', server.latency)
+        time.sleep(latency.sample() + output_tokens * profile.get('per_output_token', server.per_output_token))
+
+        payload = json.dumps({
+            'id': f'msg_bench_{threading.get_ident()}',
+            'type': 'message',
+            'role': 'assistant',
+            'model': model,
+            'content': content,
+            'stop_reason': stop_reason,
+            'stop_sequence': None,
+            'usage': {
+                'input_tokens': max(1, len(prompt) // 4),
+                'output_tokens': output_tokens,
+                'cache_creation_input_tokens': 0,
+                'cache_read_input_tokens': 0
+            }
+        }).encode()
+
+        with server.stats_lock:
+            server.calls += 1
+            server.model_calls[model] = server.model_calls.get(model, 0) + 1
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+
+class _S3Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def _key(self):
+        # Accept both path-style (/bucket/key) and virtual-host-style (/key) requests
+        path = self.path.split('?', 1)[0].lstrip('/')
+        bucket = self.server.bucket
+        if path.startswith(bucket + '/'):
+            path = path[len(bucket) + 1:]
+        return path
+
+    def _reply(self, status, body=b'', headers=None):
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        if self.command != 'HEAD':
+            self.wfile.write(body)
+
+    def do_PUT(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        data = self.rfile.read(length)
+        time.sleep(self.server.latency.sample())
+        with self.server.stats_lock:
+            failing = self.server.error_rate and self.server.rng.random() < self.server.error_rate
+        if failing:
+            self._reply(503, b'<Error><Code>SlowDown</Code></Error>', {'Content-Type': 'application/xml'})
+            return
+        with self.server.stats_lock:
+            self.server.objects[self._key()] = data
+        self._reply(200, headers={'ETag': '"bench"'})
+
+    def do_GET(self):
+        time.sleep(self.server.latency.sample())
+        data = self.server.objects.get(self._key())
+        if data is None:
+            self._reply(404, b'<Error><Code>NoSuchKey</Code></Error>', {'Content-Type': 'application/xml'})
+        else:
+            self._reply(200, data, {'Content-Type': 'application/octet-stream'})
+
+    def do_HEAD(self):
+        data = self.server.objects.get(self._key())
+        if data is None:
+            self._reply(404)
+        else:
+            self.send_response(200)
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+
+
+class _StubServer:
+    handler = None
+    server_class = ThreadingHTTPServer
+
+    def __init__(self, latency=None, host='127.0.0.1', port=0):
+        self.httpd = self.server_class((host, port), self.handler)
+        self.httpd.daemon_threads = True
+        self.httpd.latency = LatencyModel.parse(latency or 0)
+        self.httpd.stats_lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+class _ClaudeHTTPServer(ThreadingHTTPServer):
+    def profile_for(self, model):
+        """Overrides for the first profile whose key is a substring of the model name"""
+        for name, profile in self.model_profiles.items():
+            if name in model:
+                return profile
+        return {}
+
+
+class FakeClaudeServer(_StubServer):
+    """
+    Answers POST /v1/messages with a canned timesheet extraction
+
+    model_profiles maps a model-name substring (e.g. 'haiku') to overrides of
+    latency ('median[:sigma]'), per_output_token and confidence for that model.
+    Requests with tools get a compact record_timesheet tool_use block; plain
+    JSON replies are malformed at malformed_rate.
+    """
+    handler = _ClaudeHandler
+    server_class = _ClaudeHTTPServer
+
+    def __init__(self, latency=None, per_output_token=0.0, default_days=22, model_profiles=None,
+                 malformed_rate=0.0, seed=None, **kwargs):
+        super().__init__(latency, **kwargs)
+        self.httpd.malformed_rate = malformed_rate
+        self.httpd.rng = random.Random(seed)
+        self.httpd.per_output_token = per_output_token
+        self.httpd.default_days = default_days
+        self.httpd.model_profiles = {}
+        for name, profile in (model_profiles or {}).items():
+            profile = dict(profile)
+            if 'latency' in profile:
+                profile['latency'] = LatencyModel.parse(profile['latency'])
+            self.httpd.model_profiles[name] = profile
+        self.httpd.calls = 0
+        self.httpd.model_calls = {}
+
+    @property
+    def calls(self):
+        return self.httpd.calls
+
+    @property
+    def model_calls(self):
+        return dict(self.httpd.model_calls)
+
+
+class FakeS3Server(_StubServer):
+    """In-memory bucket supporting PUT, GET and HEAD of single objects; PUTs fail with 503 at error_rate"""
+    handler = _S3Handler
+
+    def __init__(self, latency=None, bucket='bench-bucket', error_rate=0.0, seed=None, **kwargs):
+        super().__init__(latency, **kwargs)
+        self.httpd.bucket = bucket
+        self.httpd.error_rate = error_rate
+        self.httpd.rng = random.Random(seed)
+        self.httpd.objects = {}
+
+    @property
+    def objects(self):
+        return self.httpd.objects
+
+
+def backend_env(claude, s3, data_dir=None):
+    """
+    Environment variables that point the app at the given stub servers
+
+    Features that answer repeated identical uploads from local state (coalescing, stored
+    results, revisions, near-duplicates) are off and DATA_DIR is a fresh temp directory,
+    so every benchmark request measures a full extraction.
+    """
+    return {
+        'ANTHROPIC_API_KEY': 'bench-key',
+        'ANTHROPIC_BASE_URL': claude.url,
+        'AWS_ACCESS_KEY_ID': 'bench',
+        'AWS_SECRET_ACCESS_KEY': 'bench',
+        'AWS_S3_BUCKET': s3.httpd.bucket,
+        'AWS_S3_ENDPOINT_URL': s3.url,
+        'LOG_FILE': '',
+        'DATA_DIR': data_dir or tempfile.mkdtemp(prefix='timesheet-bench-'),
+        'COALESCE_REQUESTS': 'false',
+        'STORE_RESULTS': 'false',
+        'INCREMENTAL_EXTRACTION': 'false',
+        'NEAR_DUPLICATE_POLICY': 'off',
+    }
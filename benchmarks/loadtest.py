@@ -0,0 +1,361 @@
+"""
+Concurrent load test and replay harness for the HTTP API.
+
+Replays a weighted request mix (file type, size, claimed_hours presence and
+endpoint) against a running server, or against gunicorn processes started here
+with stub Claude/S3 backends. Each load step reports achieved throughput,
+latency percentiles, error rate and queueing latency (client-observed latency
+minus the server's own Server-Timing total), giving a saturation curve per
+worker/thread configuration.
+
+    # Sweep concurrency against two gunicorn configurations with a slow mock Claude
+    python -m benchmarks.loadtest --spawn --gunicorn 1x1,2x4 --concurrency 1,2,4,8,16 \\
+        --claude-latency 3:0.5 --mix benchmarks/sample_mix.jsonl
+
+    # Open-loop target RPS against an existing deployment
+    python -m benchmarks.loadtest --url http://localhost:5000 --rps 1,2,5 --duration 60
+
+Mix files are JSONL, one request shape per line:
+    {"endpoint": "/api/upload", "file_type": "xlsx", "days": 22, "sheets": 4,
+     "claimed_hours": true, "weight": 3}
+Captured request logs can be replayed directly as long as each line carries at
+least a file name or file_type; unknown keys are ignored.
+"""
+import argparse
+import http.client
+import json
+import os
+import random
+import signal
+import subprocess
+import sys
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+
+from benchmarks.corpus import GENERATORS, build_file
+from benchmarks.fakes import FakeClaudeServer, FakeS3Server, backend_env
+from benchmarks.run_benchmarks import parse_server_timing, percentile
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+DEFAULT_MIX = [
+    {'endpoint': '/api/upload', 'file_type': 'pdf', 'days': 22, 'pages': 1, 'claimed_hours': True, 'weight': 4},
+    {'endpoint': '/api/upload', 'file_type': 'xlsx', 'days': 22, 'sheets': 1, 'claimed_hours': True, 'weight': 3},
+    {'endpoint': '/api/upload', 'file_type': 'docx', 'days': 22, 'claimed_hours': False, 'weight': 2},
+    {'endpoint': '/api/upload', 'file_type': 'png', 'claimed_hours': True, 'weight': 2},
+    {'endpoint': '/api/s3-upload', 'file_type': 'pdf', 'days': 22, 'pages': 3, 'weight': 1},
+]
+
+# Size parameters understood by each corpus generator
+SIZE_PARAMS = {
+    'xlsx': ('days', 'sheets'),
+    'docx': ('days',),
+    'pdf': ('days', 'pages'),
+    'png': ('width', 'height'),
+}
+FILE_TYPE_ALIASES = {'jpg': 'png', 'jpeg': 'png', 'image': 'png', 'excel': 'xlsx', 'word': 'docx'}
+
+
+class PreparedRequest:
+    """A request body built once and replayed many times"""
+
+    def __init__(self, entry):
+        file_type = entry.get('file_type') or entry.get('file_name', '').rsplit('.', 1)[-1]
+        file_type = FILE_TYPE_ALIASES.get(file_type.lower(), file_type.lower())
+        if file_type not in GENERATORS:
+            raise ValueError(f'Unsupported file_type in mix entry: {entry}')
+
+        size = {name: int(entry[name]) for name in SIZE_PARAMS[file_type] if name in entry}
+        self.endpoint = entry.get('endpoint', '/api/upload')
+        self.weight = float(entry.get('weight', 1))
+        self.label = f'{self.endpoint} {file_type}' + (' +claimed' if entry.get('claimed_hours') else '')
+
+        fields = {}
+        if entry.get('claimed_hours') and self.endpoint == '/api/upload':
+            claimed = entry['claimed_hours']
+            fields['claimed_hours'] = str(160 if claimed is True else claimed)
+        file_bytes = build_file(file_type, **size)
+        self.body, self.content_type = encode_multipart(fields, f'loadtest.{file_type}', file_bytes)
+
+
+def encode_multipart(fields, filename, file_bytes):
+    """Encode form fields and one file as multipart/form-data"""
+    boundary = uuid.uuid4().hex
+    parts = []
+    for name, value in fields.items():
+        parts.append(f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'.encode())
+    parts.append(f'--{boundary}\r\nContent-Disposition: form-data; name="file"; filename="{filename}"\r\n'
+                 f'Content-Type: application/octet-stream\r\n\r\n'.encode())
+    parts.append(file_bytes)
+    parts.append(f'\r\n--{boundary}--\r\n'.encode())
+    return b''.join(parts), f'multipart/form-data; boundary={boundary}'
+
+
+def load_mix(path):
+    """Read a JSONL mix file, skipping blank lines and comments"""
+    entries = []
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            if line and not line.startswith('#'):
+                entries.append(json.loads(line))
+    return entries
+
+
+class Target:
+    """Issues requests to one base URL using a connection per thread"""
+
+    def __init__(self, base_url, timeout):
+        parsed = urlparse(base_url)
+        self.host = parsed.hostname
+        self.port = parsed.port or (443 if parsed.scheme == 'https' else 80)
+        self.https = parsed.scheme == 'https'
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            cls = http.client.HTTPSConnection if self.https else http.client.HTTPConnection
+            conn = cls(self.host, self.port, timeout=self.timeout)
+            self._local.conn = conn
+        return conn
+
+    def send(self, prepared):
+        """Return (status, server_total_seconds); status 0 means a transport error"""
+        try:
+            conn = self._connection()
+            conn.request('POST', prepared.endpoint, body=prepared.body,
+                         headers={'Content-Type': prepared.content_type})
+            response = conn.getresponse()
+            response.read()
+            timing = parse_server_timing(response.getheader('Server-Timing'))
+            if response.getheader('Connection', '').lower() == 'close':
+                self._reset()
+            return response.status, timing.get('total')
+        except (OSError, http.client.HTTPException):
+            self._reset()
+            return 0, None
+
+    def _reset(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+        self._local.conn = None
+
+
+class StepResult:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = []
+        self.queue_delays = []
+        self.server_queue = []
+        self.errors = 0
+        self.by_label = {}
+
+    def record(self, prepared, status, latency, server_total, queue_delay=0.0):
+        with self.lock:
+            self.latencies.append(latency)
+            self.queue_delays.append(queue_delay)
+            if server_total is not None:
+                self.server_queue.append(max(0.0, latency - server_total))
+            failed = not 200 <= status < 300
+            if failed:
+                self.errors += 1
+            label = self.by_label.setdefault(prepared.label, [0, 0])
+            label[0] += 1
+            label[1] += failed
+
+    def summary(self, offered, wall):
+        count = len(self.latencies)
+        ms = lambda values, pct: round(percentile(values, pct) * 1000, 1)
+        return {
+            'offered': offered,
+            'requests': count,
+            'throughput_rps': round(count / wall, 2) if wall else 0.0,
+            'error_rate': round(self.errors / count, 4) if count else 0.0,
+            'p50_ms': ms(self.latencies, 50),
+            'p95_ms': ms(self.latencies, 95),
+            'p99_ms': ms(self.latencies, 99),
+            # Client-side backlog when the open-loop schedule could not keep up
+            'client_queue_p95_ms': ms(self.queue_delays, 95),
+            # Latency not accounted for by the app itself: accept queue, network, WSGI overhead
+            'server_queue_p50_ms': ms(self.server_queue, 50),
+            'server_queue_p95_ms': ms(self.server_queue, 95),
+            'by_request': {label: {'count': c, 'errors': e} for label, (c, e) in sorted(self.by_label.items())},
+        }
+
+
+def _picker(prepared, seed):
+    rng = random.Random(seed)
+    weights = [p.weight for p in prepared]
+    lock = threading.Lock()
+
+    def pick():
+        with lock:
+            return rng.choices(prepared, weights)[0]
+    return pick
+
+
+def run_closed_loop(target, prepared, concurrency, duration, seed):
+    """Fixed number of clients sending back-to-back requests"""
+    result = StepResult()
+    pick = _picker(prepared, seed)
+    deadline = time.perf_counter() + duration
+
+    def client():
+        while time.perf_counter() < deadline:
+            request = pick()
+            start = time.perf_counter()
+            status, server_total = target.send(request)
+            result.record(request, status, time.perf_counter() - start, server_total)
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=client, daemon=True) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return result.summary(f'concurrency={concurrency}', time.perf_counter() - start)
+
+
+def run_open_loop(target, prepared, rps, duration, seed, max_in_flight):
+    """Poisson arrivals at a target rate, independent of how fast responses come back"""
+    result = StepResult()
+    pick = _picker(prepared, seed)
+    rng = random.Random(seed + 1)
+
+    def fire(request, scheduled):
+        started = time.perf_counter()
+        status, server_total = target.send(request)
+        result.record(request, status, time.perf_counter() - scheduled, server_total, started - scheduled)
+
+    start = time.perf_counter()
+    next_at = start
+    with ThreadPoolExecutor(max_workers=max_in_flight) as pool:
+        while next_at < start + duration:
+            delay = next_at - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            pool.submit(fire, pick(), next_at)
+            next_at += rng.expovariate(rps)
+    return result.summary(f'rps={rps}', time.perf_counter() - start)
+
+
+class GunicornServer:
+    """Runs the app under gunicorn with a given worker/thread layout"""
+
+    def __init__(self, workers, threads, env, port, timeout):
+        self.workers = workers
+        self.threads = threads
+        self.port = port
+        self.url = f'http://127.0.0.1:{port}'
+        command = [sys.executable, '-m', 'gunicorn', 'app:app',
+                   '--bind', f'127.0.0.1:{port}',
+                   '--workers', str(workers), '--threads', str(threads),
+                   '--timeout', str(timeout), '--log-level', 'warning']
+        self.process = subprocess.Popen(command, cwd=REPO_ROOT, env=dict(os.environ, **env),
+                                        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+    def wait_ready(self, timeout=30):
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            if self.process.poll() is not None:
+                raise RuntimeError(f'gunicorn exited with status {self.process.returncode}')
+            try:
+                conn = http.client.HTTPConnection('127.0.0.1', self.port, timeout=1)
+                conn.request('GET', '/health')
+                if conn.getresponse().status == 200:
+                    return
+            except OSError:
+                time.sleep(0.2)
+        raise RuntimeError('gunicorn did not become ready')
+
+    def stop(self):
+        self.process.send_signal(signal.SIGTERM)
+        try:
+            self.process.wait(timeout=15)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+
+
+def sweep(target, prepared, args):
+    steps = []
+    if args.rps:
+        levels = [('rps', float(v)) for v in args.rps.split(',')]
+    else:
+        levels = [('concurrency', int(v)) for v in args.concurrency.split(',')]
+
+    for mode, level in levels:
+        if mode == 'rps':
+            step = run_open_loop(target, prepared, level, args.duration, args.seed, args.max_in_flight)
+        else:
+            step = run_closed_loop(target, prepared, level, args.duration, args.seed)
+        steps.append(step)
+        print(f"  {step['offered']:<16}{step['throughput_rps']:>9.2f}{step['error_rate'] * 100:>8.1f}%"
+              f"{step['p50_ms']:>10.0f}{step['p95_ms']:>10.0f}{step['p99_ms']:>10.0f}"
+              f"{step['server_queue_p95_ms']:>12.0f}{step['client_queue_p95_ms']:>12.0f}")
+    return steps
+
+
+def print_header(title):
+    print(f'\n{title}')
+    print(f"  {'load':<16}{'rps':>9}{'errors':>9}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}"
+          f"{'srv queue':>12}{'cli queue':>12}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0].strip())
+    target_group = parser.add_mutually_exclusive_group(required=True)
+    target_group.add_argument('--url', help='Base URL of a running deployment')
+    target_group.add_argument('--spawn', action='store_true',
+                              help='Start gunicorn locally against stub Claude/S3 backends')
+    parser.add_argument('--gunicorn', default='1x1,2x4',
+                        help="Comma-separated WORKERSxTHREADS layouts to test with --spawn")
+    parser.add_argument('--port', type=int, default=5055)
+    parser.add_argument('--mix', help='JSONL request mix (defaults to a built-in mix)')
+    load_group = parser.add_mutually_exclusive_group()
+    load_group.add_argument('--concurrency', default='1,2,4,8,16', help='Closed-loop client counts to sweep')
+    load_group.add_argument('--rps', help='Open-loop request rates to sweep, e.g. 0.5,1,2,4')
+    parser.add_argument('--duration', type=float, default=30.0, help='Seconds per load step')
+    parser.add_argument('--max-in-flight', type=int, default=256, help='Cap on outstanding open-loop requests')
+    parser.add_argument('--timeout', type=float, default=120.0, help='Client and gunicorn request timeout')
+    parser.add_argument('--claude-latency', default='3:0.5',
+                        help="Stub Claude latency as 'median[:sigma]' seconds (log-normal)")
+    parser.add_argument('--s3-latency', default='0.05:0.3', help="Stub S3 latency as 'median[:sigma]' seconds")
+    parser.add_argument('--seed', type=int, default=7)
+    parser.add_argument('--output', help='Write saturation curves as JSON to this path')
+    args = parser.parse_args(argv)
+
+    mix = load_mix(args.mix) if args.mix else DEFAULT_MIX
+    prepared = [PreparedRequest(entry) for entry in mix]
+    report = {'mix': mix, 'runs': {}}
+
+    if args.url:
+        print_header(f'Target {args.url}')
+        report['runs'][args.url] = sweep(Target(args.url, args.timeout), prepared, args)
+    else:
+        with FakeClaudeServer(args.claude_latency) as claude, FakeS3Server(args.s3_latency) as s3:
+            env = backend_env(claude, s3)
+            for layout in args.gunicorn.split(','):
+                workers, threads = (int(v) for v in layout.lower().split('x'))
+                server = GunicornServer(workers, threads, env, args.port, int(args.timeout))
+                try:
+                    server.wait_ready()
+                    print_header(f'gunicorn workers={workers} threads={threads} '
+                                 f'(claude {args.claude_latency}s, s3 {args.s3_latency}s)')
+                    report['runs'][layout] = sweep(Target(server.url, args.timeout), prepared, args)
+                finally:
+                    server.stop()
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
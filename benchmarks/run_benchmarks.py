@@ -0,0 +1,246 @@
+"""
+Offline end-to-end benchmark for the /api/upload pipeline.
+
+Runs synthetic XLSX/DOCX/PDF/PNG timesheets through the real Flask app against
+stub Claude and S3 servers, and reports per-stage and end-to-end latency
+percentiles, throughput and peak RSS. Each case runs in a fresh process so its
+peak RSS is not inflated by earlier cases.
+
+    python -m benchmarks.run_benchmarks                       # run default cases
+    python -m benchmarks.run_benchmarks --save-baseline       # refresh benchmarks/baseline.json
+    python -m benchmarks.run_benchmarks --compare             # exit 1 on regression
+
+Baseline numbers are machine-specific; refresh them on the machine that runs
+the comparison.
+"""
+import argparse
+import io
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import sys
+import time
+
+from benchmarks.corpus import build_file
+from benchmarks.fakes import FakeClaudeServer, FakeS3Server, backend_env
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), 'baseline.json')
+
+DEFAULT_CASES = [
+    'xlsx:days=22',
+    'xlsx:days=22,sheets=8',
+    'docx:days=22',
+    'docx:days=120',
+    'pdf:days=22,pages=1',
+    'pdf:days=120,pages=10',
+    'png:width=1240,height=1754',
+]
+
+# Stages that measure our own code rather than stub backend latency
+LOCAL_STAGES = ('read', 'extract', 'parse')
+
+
+def parse_case(spec):
+    """'xlsx:days=22,sheets=4' -> ('xlsx', {'days': 22, 'sheets': 4})"""
+    file_type, _, params = spec.partition(':')
+    size = {}
+    for item in filter(None, params.split(',')):
+        name, _, value = item.partition('=')
+        size[name.strip()] = int(value)
+    return file_type.strip(), size
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of an unsorted list"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, int(round(pct / 100.0 * len(ordered) + 0.5)) - 1))
+    return ordered[rank]
+
+
+def summarize(samples, work_units=1):
+    """Latency percentiles (ms) and throughput for a list of durations in seconds"""
+    total = sum(samples)
+    return {
+        'count': len(samples),
+        'p50_ms': round(percentile(samples, 50) * 1000, 3),
+        'p95_ms': round(percentile(samples, 95) * 1000, 3),
+        'p99_ms': round(percentile(samples, 99) * 1000, 3),
+        'mean_ms': round(total / len(samples) * 1000, 3) if samples else 0.0,
+        'throughput_per_s': round(len(samples) * work_units / total, 3) if total else 0.0,
+    }
+
+
+def parse_server_timing(header):
+    """Server-Timing header -> {stage: seconds}"""
+    stages = {}
+    for entry in filter(None, (part.strip() for part in (header or '').split(','))):
+        fields = entry.split(';')
+        for field in fields[1:]:
+            if field.startswith('dur='):
+                stages[fields[0]] = float(field[4:]) / 1000.0
+    return stages
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MB"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KB, macOS reports bytes
+    return round(peak / (1024 * 1024 if platform.system() == 'Darwin' else 1024), 1)
+
+
+def _run_case(spec, env, iterations, warmup, results):
+    """Child-process entry point: import the app against the stub backends and time one case"""
+    os.environ.update(env)
+    import app as app_module
+
+    file_type, size = parse_case(spec)
+    file_bytes = build_file(file_type, **size)
+    filename = f'bench_timesheet.{file_type}'
+    client = app_module.app.test_client()
+    rss_before = peak_rss_mb()
+
+    end_to_end = []
+    stages = {}
+    failures = 0
+    for iteration in range(warmup + iterations):
+        start = time.perf_counter()
+        response = client.post('/api/upload', data={
+            'file': (io.BytesIO(file_bytes), filename),
+            'claimed_hours': '160'
+        })
+        elapsed = time.perf_counter() - start
+        if iteration < warmup:
+            continue
+        if response.status_code != 200 or not response.get_json().get('s3_uploaded'):
+            failures += 1
+        end_to_end.append(elapsed)
+        for stage, seconds in parse_server_timing(response.headers.get('Server-Timing')).items():
+            if stage != 'total':
+                stages.setdefault(stage, []).append(seconds)
+
+    megabytes = len(file_bytes) / (1024 * 1024)
+    results.put({
+        'case': spec,
+        'file_bytes': len(file_bytes),
+        'failures': failures,
+        'end_to_end': dict(summarize(end_to_end), mb_per_s=round(megabytes * len(end_to_end) / sum(end_to_end), 3)),
+        'stages': {stage: summarize(samples) for stage, samples in stages.items()},
+        'peak_rss_mb': peak_rss_mb(),
+        'import_rss_mb': rss_before,
+    })
+
+
+def run_cases(cases, iterations, warmup, claude_latency, s3_latency, per_output_token):
+    """Run every case in its own process against shared stub servers"""
+    context = multiprocessing.get_context('spawn')
+    report = {}
+    with FakeClaudeServer(claude_latency, per_output_token=per_output_token) as claude, \
+            FakeS3Server(s3_latency) as s3:
+        env = backend_env(claude, s3)
+        for spec in cases:
+            results = context.Queue()
+            process = context.Process(target=_run_case, args=(spec, env, iterations, warmup, results))
+            process.start()
+            result = results.get()
+            process.join()
+            report[spec] = result
+            print_case(result)
+    return report
+
+
+def print_case(result):
+    e2e = result['end_to_end']
+    print(f"\n{result['case']}  ({result['file_bytes'] / 1024:.1f} KB, peak RSS {result['peak_rss_mb']} MB"
+          f"{', %d failures' % result['failures'] if result['failures'] else ''})")
+    print(f"  {'stage':<12}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'ops/s':>10}")
+    for stage, stats in list(result['stages'].items()) + [('end_to_end', e2e)]:
+        print(f"  {stage:<12}{stats['p50_ms']:>10.2f}{stats['p95_ms']:>10.2f}"
+              f"{stats['p99_ms']:>10.2f}{stats['throughput_per_s']:>10.1f}")
+
+
+def compare(report, baseline, tolerance, floor_ms, rss_floor_mb):
+    """Return human-readable regressions of report against baseline"""
+    regressions = []
+
+    def check(label, current, previous, floor):
+        if previous and current > previous * (1 + tolerance) and current - previous > floor:
+            regressions.append(f'{label}: {previous} -> {current} (+{(current / previous - 1) * 100:.0f}%)')
+
+    for case, previous in baseline.get('cases', {}).items():
+        current = report.get(case)
+        if current is None:
+            continue
+        for metric in ('p50_ms', 'p95_ms'):
+            check(f'{case} end_to_end {metric}', current['end_to_end'][metric],
+                  previous['end_to_end'][metric], floor_ms)
+        for stage in LOCAL_STAGES:
+            if stage in previous['stages'] and stage in current['stages']:
+                check(f'{case} {stage} p50_ms', current['stages'][stage]['p50_ms'],
+                      previous['stages'][stage]['p50_ms'], floor_ms)
+        check(f'{case} peak_rss_mb', current['peak_rss_mb'], previous['peak_rss_mb'], rss_floor_mb)
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0].strip())
+    parser.add_argument('--case', action='append', dest='cases',
+                        help="Case spec such as 'xlsx:days=22,sheets=4' (repeatable)")
+    parser.add_argument('--iterations', type=int, default=10)
+    parser.add_argument('--warmup', type=int, default=2)
+    parser.add_argument('--claude-latency', default='0.05',
+                        help="Stub Claude latency as 'median[:sigma]' seconds (log-normal)")
+    parser.add_argument('--claude-token-latency', type=float, default=0.0,
+                        help='Extra stub Claude latency per output token, in seconds')
+    parser.add_argument('--s3-latency', default='0.01', help="Stub S3 latency as 'median[:sigma]' seconds")
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE)
+    parser.add_argument('--save-baseline', action='store_true', help='Write results to the baseline file')
+    parser.add_argument('--compare', action='store_true', help='Fail if results regress against the baseline')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='Allowed relative slowdown (0.25 = 25%%)')
+    parser.add_argument('--floor-ms', type=float, default=5.0, help='Ignore regressions smaller than this')
+    parser.add_argument('--rss-floor-mb', type=float, default=16.0)
+    parser.add_argument('--output', help='Write the full JSON report to this path')
+    args = parser.parse_args(argv)
+
+    cases = args.cases or DEFAULT_CASES
+    report = run_cases(cases, args.iterations, args.warmup, args.claude_latency,
+                       args.s3_latency, args.claude_token_latency)
+    document = {
+        'settings': {
+            'iterations': args.iterations,
+            'claude_latency': args.claude_latency,
+            'claude_token_latency': args.claude_token_latency,
+            's3_latency': args.s3_latency,
+            'python': platform.python_version(),
+        },
+        'cases': report,
+    }
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(document, f, indent=2)
+
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(document, f, indent=2)
+        print(f'\nBaseline written to {args.baseline}')
+
+    if args.compare:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.tolerance, args.floor_ms, args.rss_floor_mb)
+        if regressions:
+            print('\nRegressions against baseline:')
+            for line in regressions:
+                print(f'  {line}')
+            return 1
+        print('\nNo regressions against baseline')
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
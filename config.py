@@ -1,29 +1,162 @@
 import os
+import sys
+import json
+import queue
+import atexit
+import random
 import logging
-from logging.handlers import RotatingFileHandler
+from datetime import datetime, timezone
+from logging.handlers import RotatingFileHandler, QueueHandler, QueueListener
+from dotenv import load_dotenv
+from flask import g, has_request_context
+from services.metrics import metrics
+
+# Load environment variables from .env file before Config reads them
+load_dotenv()
 
 class Config:
     SECRET_KEY = os.environ.get('SECRET_KEY') or 'dev-secret-key-change-in-production'
     MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB max file size
     OPENAI_API_KEY = os.environ.get('OPENAI_API_KEY')
-    
+
     # Logging configuration
-    LOG_LEVEL = logging.INFO
-    LOG_FILE = 'timesheet_api.log'
+    LOG_LEVEL = getattr(logging, os.environ.get('LOG_LEVEL', 'INFO').upper(), logging.INFO)
+    LOG_FILE = os.environ.get('LOG_FILE', 'timesheet_api.log')
     LOG_MAX_BYTES = 10 * 1024 * 1024  # 10MB
     LOG_BACKUP_COUNT = 5
+    LOG_FORMAT = os.environ.get('LOG_FORMAT', 'json')  # 'json' or 'text'
+    LOG_QUEUE_SIZE = int(os.environ.get('LOG_QUEUE_SIZE', 10000))
+    # Fraction of routine success records kept; warnings and errors are never sampled
+    LOG_SUCCESS_SAMPLE_RATE = float(os.environ.get('LOG_SUCCESS_SAMPLE_RATE', 1.0))
+
+    # Claimed vs extracted hours - shared by per-upload match_status and /api/reconcile
+    MATCH_TOLERANCE_HOURS = float(os.environ.get('MATCH_TOLERANCE_HOURS', 0.5))
+    MINOR_MISMATCH_HOURS = float(os.environ.get('MINOR_MISMATCH_HOURS', 2.0))
+    MIN_CONFIDENCE = float(os.environ.get('MIN_CONFIDENCE', 0.7))
+
+    # Local tesseract OCR pool (services/ocr_engine.py)
+    OCR_WORKERS = int(os.environ.get('OCR_WORKERS', os.cpu_count() or 1))
+    OCR_DPI = int(os.environ.get('OCR_DPI', 200))
+    OCR_MAX_PAGES = int(os.environ.get('OCR_MAX_PAGES', 20))
+
+# Attributes every LogRecord carries - anything else was passed via extra= and is emitted as a field
+_RESERVED_RECORD_ATTRS = set(vars(logging.LogRecord('', 0, '', 0, '', None, None))) | {'message', 'asctime'}
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line, including any fields passed via extra="""
+
+    def format(self, record):
+        payload = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RESERVED_RECORD_ATTRS and not key.startswith('_') and key != 'sample':
+                payload[key] = value
+        if record.exc_info:
+            payload['exc_info'] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            payload['exc_info'] = record.exc_text
+        return json.dumps(payload, default=str)
+
+class RequestContextFilter(logging.Filter):
+    """Stamp records with the current Flask request id (runs in the logging thread's caller)"""
+
+    def filter(self, record):
+        if not hasattr(record, 'request_id'):
+            record.request_id = g.get('request_id') if has_request_context() else None
+        return True
+
+class SuccessSampler(logging.Filter):
+    """Keep only a fraction of records logged with extra={'sample': True}"""
+
+    def __init__(self, rate):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record):
+        if not getattr(record, 'sample', False) or record.levelno > logging.INFO:
+            return True
+        return self.rate >= 1.0 or random.random() < self.rate
+
+class NonBlockingQueueHandler(QueueHandler):
+    """Queue handler that drops records instead of blocking when the listener falls behind"""
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        # Resolve the message here so args are not shared with the caller after enqueueing,
+        # but leave extra= fields on the record for the JSON formatter
+        record = logging.makeLogRecord(record.__dict__)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+            metrics.inc('timesheet_log_records_dropped_total')
+
+_listener = None
 
 def setup_logging(app):
-    if not app.debug:
+    """
+    Route app and library logging through a bounded in-memory queue.
+
+    Request threads only enqueue records; a background listener thread formats them
+    and writes to stdout (and the rotating log file outside debug mode). Under
+    gunicorn each worker process gets its own queue and listener.
+    """
+    global _listener
+    if _listener is not None:
+        return _listener
+
+    if Config.LOG_FORMAT == 'json':
+        formatter = JsonFormatter()
+    else:
+        formatter = logging.Formatter(
+            '%(asctime)s %(levelname)s [%(request_id)s]: %(message)s [in %(pathname)s:%(lineno)d]'
+        )
+
+    handlers = []
+    stream_handler = logging.StreamHandler(sys.stdout)
+    stream_handler.setFormatter(formatter)
+    handlers.append(stream_handler)
+
+    if not app.debug and Config.LOG_FILE:
         file_handler = RotatingFileHandler(
-            Config.LOG_FILE, 
-            maxBytes=Config.LOG_MAX_BYTES, 
+            Config.LOG_FILE,
+            maxBytes=Config.LOG_MAX_BYTES,
             backupCount=Config.LOG_BACKUP_COUNT
         )
-        file_handler.setFormatter(logging.Formatter(
-            '%(asctime)s %(levelname)s: %(message)s [in %(pathname)s:%(lineno)d]'
-        ))
-        file_handler.setLevel(Config.LOG_LEVEL)
-        app.logger.addHandler(file_handler)
-        app.logger.setLevel(Config.LOG_LEVEL)
-        app.logger.info('Timesheet API startup')
\ No newline at end of file
+        file_handler.setFormatter(formatter)
+        handlers.append(file_handler)
+
+    log_queue = queue.Queue(maxsize=Config.LOG_QUEUE_SIZE)
+    queue_handler = NonBlockingQueueHandler(log_queue)
+    queue_handler.addFilter(SuccessSampler(Config.LOG_SUCCESS_SAMPLE_RATE))
+    queue_handler.addFilter(RequestContextFilter())
+
+    root = logging.getLogger()
+    root.addHandler(queue_handler)
+    root.setLevel(Config.LOG_LEVEL)
+    # HTTP client libraries log every request at INFO/DEBUG
+    for name in ('httpx', 'httpcore', 'botocore', 'urllib3'):
+        logging.getLogger(name).setLevel(max(Config.LOG_LEVEL, logging.WARNING))
+    app.logger.setLevel(Config.LOG_LEVEL)
+
+    _listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    atexit.register(_listener.stop)
+
+    app.logger.info('Timesheet API startup')
+    return _listener
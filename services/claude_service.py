@@ -1,42 +1,55 @@
 import base64
 import json
 import os
+import time
 from anthropic import Anthropic
+from services.fast_json import loads as json_loads
+from services.metrics import RequestTimer, metrics
+from services.model_router import RoutingDecision
 
-class ClaudeService:
-    def __init__(self, api_key=None):
-        self.client = Anthropic(
-            api_key=api_key or os.environ.get('ANTHROPIC_API_KEY')
-        )
-        self.model = "claude-sonnet-4-5-20250929"
-    
-    def extract_timesheet_data(self, file_bytes, file_type):
-        """
-        Extract timesheet data from PDF or image files by sending raw bytes to Claude
-        
-        Args:
-            file_bytes: Raw file bytes
-            file_type: File extension (pdf, png, jpg, jpeg)
-            
-        Returns:
-            dict: Structured JSON with extracted timesheet data
-        """
-        try:
-            # Convert file bytes to base64
-            file_base64 = base64.b64encode(file_bytes).decode('utf-8')
-            
-            # Determine media type
-            media_type_map = {
-                'pdf': 'application/pdf',
-                'png': 'image/png', 
-                'jpg': 'image/jpeg',
-                'jpeg': 'image/jpeg'
-            }
-            media_type = media_type_map.get(file_type.lower(), 'application/octet-stream')
-            
-            prompt = """Analyze this timesheet document and extract detailed time tracking information.
+DEFAULT_MODEL = "claude-sonnet-4-5-20250929"
+
+# Positional fields of one compact daily_breakdown row (trailing unknown values are left off)
+DAY_FIELDS = ("date", "hours", "start_time", "end_time", "notes")
+
+# Schema-constrained output: the model fills this tool's input instead of writing free-form JSON,
+# and daily rows are positional arrays - roughly a third of the output tokens of keyed objects
+EXTRACTION_TOOL = {
+    "name": "record_timesheet",
+    "description": "Record the time tracking data extracted from a timesheet.",
+    "input_schema": {
+        "type": "object",
+        "properties": {
+            "extracted_hours": {"type": "number", "description": "Total hours worked"},
+            "confidence_score": {"type": "number", "description": "Confidence in the extraction, 0 to 1"},
+            "summary": {"type": "string", "description": "Brief description of what was found"},
+            "days": {
+                "type": "array",
+                "description": "One row per daily entry: [date, hours, start_time, end_time, notes]. "
+                               "date is YYYY-MM-DD or a day of week, times are HH:MM, notes at most 5 words. "
+                               "Leave off trailing values that are unknown.",
+                "items": {
+                    "type": "array",
+                    "items": {"type": ["string", "number", "null"]},
+                    "minItems": 2,
+                    "maxItems": 5
+                }
+            },
+            "anomalies": {"type": "array", "items": {"type": "string"},
+                          "description": "Unusual patterns or issues; omit when there are none"},
+            "approval_status": {"type": "string", "enum": ["Approved", "Pending", "Not Found"],
+                                "description": "Whether the document shows manager approval"},
+            "approver_name": {"type": "string", "description": "Approver, if visible"},
+            "resource_name": {"type": "string", "description": "Employee/consultant, if found"},
+            "period": {"type": "string", "description": "Month/period covered, e.g. January 2026"}
+        },
+        "required": ["extracted_hours", "confidence_score", "summary", "days", "approval_status"]
+    }
+}
+
+TOOL_OUTPUT_INSTRUCTIONS = """Record the result by calling the record_timesheet tool. Omit optional fields that are not in the document."""
 
-IMPORTANT: Keep daily_breakdown notes to maximum 5 words per entry to minimize response length.
+JSON_OUTPUT_INSTRUCTIONS = """IMPORTANT: Keep daily_breakdown notes to maximum 5 words per entry to minimize response length.
 
 Return ONLY a valid JSON object with the following exact structure:
 {
@@ -57,9 +70,9 @@ Return ONLY a valid JSON object with the following exact structure:
     "approver_name": "<name of approver if visible in document, else null>",
     "resource_name": "<name of the employee/consultant if found, else null>",
     "period": "<month/period covered e.g. January 2026, else null>"
-}
+}"""
 
-Look for:
+LOOK_FOR = """Look for:
 - Total hours worked (main focus)
 - Daily time entries with start/end times
 - Project names, task descriptions
@@ -71,52 +84,64 @@ Look for:
 
 If no clear time data is found, set extracted_hours to 0 and confidence_score to 0.1."""
 
-            message = self.client.messages.create(
-                model=self.model,
-                max_tokens=8000,
-                messages=[{
-                    "role": "user",
-                    "content": [
-                        {
-                            "type": "text",
-                            "text": prompt
-                        },
-                        {
-                            "type": "document" if media_type == 'application/pdf' else "image",
-                            "source": {
-                                "type": "base64",
-                                "media_type": media_type,
-                                "data": file_base64
-                            }
-                        }
-                    ]
-                }]
-            )
+class ClaudeService:
+    def __init__(self, api_key=None, timer=None, router=None, output_format='tool'):
+        self.client = Anthropic(
+            api_key=api_key or os.environ.get('ANTHROPIC_API_KEY')
+        )
+        self.model = router.strong_model if router is not None else DEFAULT_MODEL
+        # Per-request stage timings and token usage (see services/metrics.py)
+        self.timer = timer if timer is not None else RequestTimer()
+        # Optional ModelRouter - without one every request uses self.model
+        self.router = router
+        # 'tool' (compact schema-constrained output) or 'json' (legacy free-form JSON reply)
+        self.output_format = output_format
+    
+    def extract_timesheet_data(self, file_bytes, file_type):
+        """
+        Extract timesheet data from PDF or image files by sending raw bytes to Claude
+        
+        Args:
+            file_bytes: Raw file bytes
+            file_type: File extension (pdf, png, jpg, jpeg)
+            
+        Returns:
+            dict: Structured JSON with extracted timesheet data
+        """
+        try:
+            # Convert file bytes to base64
+            file_base64 = base64.b64encode(file_bytes).decode('utf-8')
+            
+            # Determine media type
+            media_type_map = {
+                'pdf': 'application/pdf',
+                'png': 'image/png', 
+                'jpg': 'image/jpeg',
+                'jpeg': 'image/jpeg'
+            }
+            media_type = media_type_map.get(file_type.lower(), 'application/octet-stream')
+            
+            prompt = f"""Analyze this timesheet document and extract detailed time tracking information.
 
-            response_text = message.content[0].text
-            # Strip markdown code blocks if present
-            if response_text.startswith('```'):
-                response_text = response_text.strip('`')
-                if response_text.startswith('json'):
-                    response_text = response_text[4:]
-                response_text = response_text.strip()
+{self._output_instructions()}
 
-            try:
-                try:
-                    result = json.loads(response_text)
-                except json.JSONDecodeError:
-                    # Try to salvage truncated JSON by finding the last complete entry
-                    # Store the raw response for debugging
-                    raise json.JSONDecodeError(f"Invalid JSON response: {response_text[:500]}", response_text, 0)
-                return self._validate_and_format_response(result)
-            except json.JSONDecodeError:
-                return {
-                    "extracted_hours": 0,
-                    "confidence_score": 0.0,
-                    "summary": f"Invalid JSON response: {response_text}",
-                    "daily_breakdown": [],
-                    "anomalies": ["Failed to parse Claude response as JSON"]
+{LOOK_FOR}"""
+
+            content = [
+                {
+                    "type": "text",
+                    "text": prompt
+                },
+                {
+                    "type": "document" if media_type == 'application/pdf' else "image",
+                    "source": {
+                        "type": "base64",
+                        "media_type": media_type,
+                        "data": file_base64
+                    }
                 }
+            ]
+            return self._extract(content, self._route(file_type, file_bytes=file_bytes))
                 
         except Exception as e:
             return {
@@ -143,84 +168,121 @@ If no clear time data is found, set extracted_hours to 0 and confidence_score to
 Text content:
 {text_content}
 
-IMPORTANT: Keep daily_breakdown notes to maximum 5 words per entry to minimize response length.
+{self._output_instructions()}
 
-Return ONLY a valid JSON object with the following exact structure:
-{{
-    "extracted_hours": <total_hours_as_number>,
-    "confidence_score": <0_to_1_decimal_confidence>,
-    "summary": "<brief_description_of_what_was_found>",
-    "daily_breakdown": [
-        {{
-            "date": "<YYYY-MM-DD_or_day_of_week>",
-            "start_time": "<HH:MM_or_null>",
-            "end_time": "<HH:MM_or_null>",
-            "hours": <hours_as_number>,
-            "notes": "<task_description_or_project>"
-        }}
-    ],
-    "anomalies": ["<any_unusual_patterns_or_issues>"],
-    "approval_status": "<Approved/Pending/Not Found - check if document shows manager approval>",
-    "approver_name": "<name of approver if visible in document, else null>",
-    "resource_name": "<name of the employee/consultant if found, else null>",
-    "period": "<month/period covered e.g. January 2026, else null>"
-}}
+{LOOK_FOR}"""
 
-Look for:
-- Total hours worked (main focus)
-- Daily time entries with start/end times
-- Project names, task descriptions
-- Any inconsistencies or unusual patterns
-- Time formats like 8:00 AM - 5:00 PM or decimal hours
-- Manager/supervisor approval status and approver name
-- Employee/consultant/resource name
-- The time period or month the timesheet covers
+            return self._extract(prompt, self._route('text', text=text_content))
+                
+        except Exception as e:
+            return {
+                "extracted_hours": 0,
+                "confidence_score": 0.0,
+                "summary": f"Error processing text: {str(e)}",
+                "daily_breakdown": [],
+                "anomalies": [f"Processing error: {str(e)}"]
+            }
+    
+    def _output_instructions(self):
+        return TOOL_OUTPUT_INSTRUCTIONS if self.output_format == 'tool' else JSON_OUTPUT_INSTRUCTIONS
 
-If no clear time data is found, set extracted_hours to 0 and confidence_score to 0.1."""
+    def _route(self, file_type, text=None, file_bytes=None):
+        """Starting model for this request (always self.model without a router)"""
+        if self.router is None:
+            return RoutingDecision(self.model, 'strong', 'default', None)
+        decision = self.router.route(file_type, text=text, file_bytes=file_bytes)
+        metrics.inc('timesheet_model_routing_total',
+                    labels={'model': decision.model, 'tier': decision.tier, 'reason': decision.reason})
+        return decision
+
+    def _extract(self, content, decision):
+        """Run the extraction on the routed model, escalating weak fast-model results"""
+        if decision.tier != 'fast':
+            return self._run_model(content, decision.model)
+
+        try:
+            result = self._run_model(content, decision.model)
+            reason = self.router.escalation_reason(result)
+        except Exception:
+            reason = 'error'
+        if reason is None:
+            return result
+
+        metrics.inc('timesheet_model_escalations_total', labels={'model': decision.model, 'reason': reason})
+        result = self._run_model(content, self.router.strong_model)
+        result['escalated_from'] = decision.model
+        result['escalation_reason'] = reason
+        return result
 
+    def _run_model(self, content, model):
+        message = self._create_message(content, model)
+        with self.timer.span('parse'):
+            result = self._parse_response(message)
+        result['model'] = model
+        return result
+
+    def _create_message(self, content, model=None):
+        """Send a single user message to Claude, recording latency and token usage"""
+        model = model or self.model
+        start = time.perf_counter()
+        options = {}
+        if self.output_format == 'tool':
+            options = {"tools": [EXTRACTION_TOOL], "tool_choice": {"type": "tool", "name": EXTRACTION_TOOL["name"]}}
+        with self.timer.span('claude'):
             message = self.client.messages.create(
-                model=self.model,
+                model=model,
                 max_tokens=8000,
                 messages=[{
                     "role": "user",
-                    "content": prompt
-                }]
+                    "content": content
+                }],
+                **options
             )
+        metrics.observe('timesheet_claude_call_duration_seconds', time.perf_counter() - start, {'model': model})
+        self.timer.record_usage(getattr(message, 'usage', None))
+        self.timer.record_model(model)
+        return message
+
+    def _parse_response(self, message):
+        """Parse Claude's tool call (or JSON reply) into the validated response structure"""
+        if getattr(message, 'stop_reason', None) == 'max_tokens':
+            return self._validation_error("output truncated at max_tokens")
 
-            response_text = message.content[0].text
-            # Strip markdown code blocks if present
-            if response_text.startswith('```'):
-                response_text = response_text.strip('`')
-                if response_text.startswith('json'):
-                    response_text = response_text[4:]
-                response_text = response_text.strip()
+        # Tool input arrives already parsed - no fences to strip and no JSON to repair
+        for block in message.content:
+            if getattr(block, 'type', None) == 'tool_use' and block.name == EXTRACTION_TOOL["name"]:
+                if not isinstance(block.input, dict):
+                    return self._validation_error("tool input is not an object")
+                return self._validate_and_format_response(block.input)
 
+        text_blocks = [block.text for block in message.content if getattr(block, 'type', None) == 'text']
+        if not text_blocks:
+            return self._validation_error("no record_timesheet tool call in reply")
+        response_text = text_blocks[0].strip()
+        # Strip markdown code blocks if present
+        if response_text.startswith('```'):
+            response_text = response_text.strip('`')
+            if response_text.startswith('json'):
+                response_text = response_text[4:]
+            response_text = response_text.strip()
+
+        try:
             try:
-                try:
-                    result = json.loads(response_text)
-                except json.JSONDecodeError:
-                    # Try to salvage truncated JSON by finding the last complete entry
-                    # Store the raw response for debugging
-                    raise json.JSONDecodeError(f"Invalid JSON response: {response_text[:500]}", response_text, 0)
-                return self._validate_and_format_response(result)
+                result = json_loads(response_text)
             except json.JSONDecodeError:
-                return {
-                    "extracted_hours": 0,
-                    "confidence_score": 0.0,
-                    "summary": f"Invalid JSON response: {response_text}",
-                    "daily_breakdown": [],
-                    "anomalies": ["Failed to parse Claude response as JSON"]
-                }
-                
-        except Exception as e:
+                # Try to salvage truncated JSON by finding the last complete entry
+                # Store the raw response for debugging
+                raise json.JSONDecodeError(f"Invalid JSON response: {response_text[:500]}", response_text, 0)
+            return self._validate_and_format_response(result)
+        except json.JSONDecodeError:
             return {
                 "extracted_hours": 0,
                 "confidence_score": 0.0,
-                "summary": f"Error processing text: {str(e)}",
+                "summary": f"Invalid JSON response: {response_text}",
                 "daily_breakdown": [],
-                "anomalies": [f"Processing error: {str(e)}"]
+                "anomalies": ["Failed to parse Claude response as JSON"]
             }
-    
+
     def _validate_and_format_response(self, result):
         """Validate and ensure proper formatting of Claude response"""
         try:
@@ -237,16 +299,19 @@ If no clear time data is found, set extracted_hours to 0 and confidence_score to
                 "period": result.get("period")
             }
             
-            # Validate daily_breakdown
-            if isinstance(result.get("daily_breakdown"), list):
-                for entry in result["daily_breakdown"]:
+            # Validate daily_breakdown - keyed objects (JSON replies) or positional rows (tool output)
+            entries = result.get("days", result.get("daily_breakdown"))
+            if isinstance(entries, list):
+                for entry in entries:
+                    if isinstance(entry, list):
+                        entry = dict(zip(DAY_FIELDS, entry))
                     if isinstance(entry, dict):
                         validated_entry = {
                             "date": str(entry.get("date", "")),
                             "start_time": entry.get("start_time") if entry.get("start_time") else None,
                             "end_time": entry.get("end_time") if entry.get("end_time") else None,
-                            "hours": float(entry.get("hours", 0)),
-                            "notes": str(entry.get("notes", ""))
+                            "hours": float(entry.get("hours") or 0),
+                            "notes": str(entry.get("notes") or "")
                         }
                         validated["daily_breakdown"].append(validated_entry)
             
@@ -257,10 +322,13 @@ If no clear time data is found, set extracted_hours to 0 and confidence_score to
             return validated
             
         except (ValueError, TypeError) as e:
-            return {
-                "extracted_hours": 0,
-                "confidence_score": 0.0,
-                "summary": f"Response validation error: {str(e)}",
-                "daily_breakdown": [],
-                "anomalies": ["Failed to validate Claude response structure"]
-            }
\ No newline at end of file
+            return self._validation_error(str(e))
+
+    def _validation_error(self, reason):
+        return {
+            "extracted_hours": 0,
+            "confidence_score": 0.0,
+            "summary": f"Response validation error: {reason}",
+            "daily_breakdown": [],
+            "anomalies": ["Failed to validate Claude response structure"]
+        }
\ No newline at end of file
@@ -0,0 +1,60 @@
+import gzip
+import zlib
+
+try:
+    import brotli
+except ImportError:  # gzip only without the brotli package
+    brotli = None
+
+COMPRESSIBLE_MIMETYPES = {'application/json', 'application/x-ndjson', 'text/plain', 'text/html', 'text/csv'}
+
+
+def available_encodings():
+    """Content codings we can produce, most preferred first"""
+    return ['br', 'gzip'] if brotli is not None else ['gzip']
+
+
+def choose_encoding(accept_encodings):
+    """
+    Best content coding the client accepts
+
+    Args:
+        accept_encodings: werkzeug Accept object (request.accept_encodings)
+
+    Returns:
+        'br', 'gzip' or None for identity
+    """
+    best = None
+    for encoding in available_encodings():
+        quality = accept_encodings[encoding]
+        if quality > 0 and (best is None or quality > best[1]):
+            best = (encoding, quality)
+    return best[0] if best else None
+
+
+def compress(data, encoding, gzip_level=6, brotli_quality=4):
+    if encoding == 'br':
+        return brotli.compress(data, quality=brotli_quality, mode=brotli.MODE_TEXT)
+    # mtime=0 keeps identical bodies byte-identical (stable ETags and caches)
+    return gzip.compress(data, compresslevel=gzip_level, mtime=0)
+
+
+def compress_stream(chunks, encoding, gzip_level=6, brotli_quality=4):
+    """Compress a streamed body chunk by chunk, flushing each so clients see rows as they arrive"""
+    try:
+        if encoding == 'br':
+            compressor = brotli.Compressor(quality=brotli_quality, mode=brotli.MODE_TEXT)
+            for chunk in chunks:
+                yield compressor.process(chunk.encode() if isinstance(chunk, str) else chunk) + compressor.flush()
+            yield compressor.finish()
+            return
+
+        compressor = zlib.compressobj(gzip_level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)  # gzip container
+        for chunk in chunks:
+            yield compressor.compress(chunk.encode() if isinstance(chunk, str) else chunk) + \
+                compressor.flush(zlib.Z_SYNC_FLUSH)
+        yield compressor.flush()
+    finally:
+        # Let the wrapped generator release its request context / database connection
+        if hasattr(chunks, 'close'):
+            chunks.close()
@@ -0,0 +1,158 @@
+import zipfile
+import xml.etree.ElementTree as ET
+
+W = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}'
+MC_FALLBACK = '{http://schemas.openxmlformats.org/markup-compatibility/2006}Fallback'
+
+_P = W + 'p'
+_T = W + 't'
+_TAB = W + 'tab'
+_BR = W + 'br'
+_CR = W + 'cr'
+_TBL = W + 'tbl'
+_TR = W + 'tr'
+_TC = W + 'tc'
+_GRID_SPAN = W + 'gridSpan'
+_V_MERGE = W + 'vMerge'
+_GRID_BEFORE = W + 'gridBefore'
+_VAL = W + 'val'
+
+
+def iter_docx_blocks(file_path):
+    """
+    Stream word/document.xml and yield body blocks in document order
+
+    Yields:
+        ('paragraph', text) for body paragraphs and
+        ('table', rows) for tables, where rows is a list of lists of cell text.
+        Horizontally merged cells (gridSpan) appear once; vertically merged
+        continuation cells (vMerge) are emitted as '' so columns stay aligned.
+    """
+    with zipfile.ZipFile(file_path) as archive:
+        with archive.open('word/document.xml') as xml_file:
+            yield from _iter_blocks(xml_file)
+
+
+def _iter_blocks(xml_file):
+    paragraphs = []      # stack of run-text buffers for open paragraphs (text boxes nest)
+    tables = []          # stack of open tables: {'rows': [...], 'row': [...] or None}
+    cells = []           # stack of open cells: {'parts': [...], 'span': n, 'continue': bool}
+    fallback_depth = 0   # inside mc:Fallback, which duplicates the mc:Choice content
+
+    for event, elem in ET.iterparse(xml_file, events=('start', 'end')):
+        tag = elem.tag
+
+        if event == 'start':
+            if tag == MC_FALLBACK:
+                fallback_depth += 1
+            elif fallback_depth:
+                continue
+            elif tag == _P:
+                paragraphs.append([])
+            elif tag == _TBL:
+                tables.append({'rows': [], 'row': None})
+            elif tag == _TR:
+                tables[-1]['row'] = []
+            elif tag == _TC:
+                cells.append({'parts': [], 'span': 1, 'continue': False})
+            continue
+
+        # ---- end events ----
+        if fallback_depth and tag != MC_FALLBACK:
+            continue
+
+        if tag == _T:
+            if paragraphs and elem.text:
+                paragraphs[-1].append(elem.text)
+        elif tag == _TAB:
+            if paragraphs:
+                paragraphs[-1].append('\t')
+        elif tag in (_BR, _CR):
+            if paragraphs:
+                paragraphs[-1].append('\n')
+        elif tag == _GRID_SPAN:
+            if cells:
+                cells[-1]['span'] = _int_attr(elem, 1)
+        elif tag == _V_MERGE:
+            # <w:vMerge/> without val="restart" continues the cell above
+            if cells and elem.get(_VAL, 'continue') != 'restart':
+                cells[-1]['continue'] = True
+        elif tag == _GRID_BEFORE:
+            if tables and tables[-1]['row'] is not None:
+                tables[-1]['row'].extend([''] * _int_attr(elem, 0))
+        elif tag == _P:
+            text = ''.join(paragraphs.pop())
+            if paragraphs:
+                # Text box content nested inside another paragraph
+                if text:
+                    paragraphs[-1].append(' ' + text)
+            elif cells:
+                if text:
+                    cells[-1]['parts'].append(text)
+            else:
+                yield 'paragraph', text
+            elem.clear()
+        elif tag == _TC:
+            cell = cells.pop()
+            text = '' if cell['continue'] else ' '.join(' '.join(cell['parts']).split())
+            tables[-1]['row'].append(text)
+            # Keep grid alignment for spanned columns without repeating the text
+            tables[-1]['row'].extend([''] * (cell['span'] - 1))
+            elem.clear()
+        elif tag == _TR:
+            table = tables[-1]
+            table['rows'].append(table['row'])
+            table['row'] = None
+            elem.clear()
+        elif tag == _TBL:
+            rows = tables.pop()['rows']
+            if cells:
+                # Nested table: flatten into the enclosing cell
+                flattened = ' / '.join(' '.join(c for c in row if c) for row in rows)
+                if flattened:
+                    cells[-1]['parts'].append(flattened)
+            else:
+                yield 'table', rows
+            elem.clear()
+        elif tag == MC_FALLBACK:
+            fallback_depth -= 1
+            elem.clear()
+
+
+def _int_attr(elem, default):
+    try:
+        return int(elem.get(_VAL))
+    except (TypeError, ValueError):
+        return default
+
+
+def extract_docx_text(file_path, cell_separator='\t', table_formatter=None):
+    """
+    Extract plain text from a .docx, keeping table rows on one line each
+
+    Args:
+        file_path: Path to the Word document
+        cell_separator: String placed between cells of a table row
+        table_formatter: Optional callable rendering a table's rows to text
+            (e.g. table_serializer.serialize_table); overrides cell_separator
+
+    Returns:
+        str: Paragraphs and table rows in document order
+    """
+    lines = []
+    for kind, content in iter_docx_blocks(file_path):
+        if kind == 'paragraph':
+            if content.strip():
+                lines.append(content)
+        elif table_formatter is not None:
+            table = table_formatter(content)
+            if table:
+                lines.append(table)
+        else:
+            for row in content:
+                # Trailing empties come from spans/merges at the row end and carry no information
+                while row and not row[-1]:
+                    row = row[:-1]
+                if any(row):
+                    lines.append(cell_separator.join(row))
+    return '\n'.join(lines)
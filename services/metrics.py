@@ -0,0 +1,216 @@
+import threading
+import time
+from contextlib import contextmanager
+
+# Usage fields reported by the Anthropic API on message.usage
+TOKEN_USAGE_FIELDS = (
+    'input_tokens',
+    'output_tokens',
+    'cache_creation_input_tokens',
+    'cache_read_input_tokens'
+)
+
+# Latency buckets in seconds - Claude calls routinely take 5-60s
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120)
+
+
+class RequestTimer:
+    """Collects per-stage timing spans and Claude token usage for a single request"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.spans = {}
+        self.usage = {field: 0 for field in TOKEN_USAGE_FIELDS}
+        self.input_tokens_estimate = None
+        self.models = []
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def span(self, name):
+        """Time the enclosed block and record it under the given stage name"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_span(name, time.perf_counter() - start)
+
+    def add_span(self, name, seconds):
+        """Record a duration in seconds; repeated stages (e.g. retries) accumulate"""
+        with self._lock:
+            self.spans[name] = self.spans.get(name, 0.0) + seconds
+
+    def absorb(self, other, exclude=()):
+        """Add another timer's spans (except the excluded stages), token usage and models"""
+        with other._lock:
+            spans = {name: seconds for name, seconds in other.spans.items() if name not in exclude}
+            usage = dict(other.usage)
+            models = list(other.models)
+        with self._lock:
+            for name, seconds in spans.items():
+                self.spans[name] = self.spans.get(name, 0.0) + seconds
+            for field in TOKEN_USAGE_FIELDS:
+                self.usage[field] += usage[field]
+            self.models.extend(models)
+
+    def record_usage(self, usage):
+        """Add token counts from an Anthropic message.usage object"""
+        if usage is None:
+            return
+        with self._lock:
+            for field in TOKEN_USAGE_FIELDS:
+                self.usage[field] += getattr(usage, field, 0) or 0
+
+    def record_model(self, model):
+        """Note a model called during this request (escalations add a second entry)"""
+        with self._lock:
+            self.models.append(model)
+
+    def elapsed(self):
+        """Seconds since the timer was created"""
+        return time.perf_counter() - self.started
+
+    def server_timing_header(self, total=None):
+        """Render spans as a Server-Timing header value (durations in ms)"""
+        with self._lock:
+            spans = dict(self.spans)
+            usage = dict(self.usage)
+
+        parts = []
+        for name, seconds in spans.items():
+            entry = f'{name};dur={seconds * 1000:.1f}'
+            if name == 'claude':
+                estimate = f'est_in={self.input_tokens_estimate} ' if self.input_tokens_estimate else ''
+                entry += (f';desc="{estimate}in={usage["input_tokens"]} out={usage["output_tokens"]} '
+                          f'cache_read={usage["cache_read_input_tokens"]} '
+                          f'cache_write={usage["cache_creation_input_tokens"]}"')
+            parts.append(entry)
+        if total is not None:
+            parts.append(f'total;dur={total * 1000:.1f}')
+        return ', '.join(parts)
+
+
+class MetricsRegistry:
+    """
+    Minimal in-process registry rendering the Prometheus text exposition format.
+
+    Each gunicorn worker keeps its own registry, so with several workers a scrape
+    reports the series of whichever worker served it.
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self._meta = {}
+        self._histograms = {}
+        self._counters = {}
+        self._lock = threading.Lock()
+
+    def describe(self, name, metric_type, help_text):
+        """Register HELP/TYPE metadata for a metric"""
+        self._meta[name] = (metric_type, help_text)
+
+    def observe(self, name, value, labels=None):
+        """Add an observation to a histogram"""
+        key = (name, _label_key(labels))
+        with self._lock:
+            hist = self._histograms.get(key)
+            if hist is None:
+                hist = {'buckets': [0] * len(self.buckets), 'sum': 0.0, 'count': 0}
+                self._histograms[key] = hist
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    hist['buckets'][i] += 1
+            hist['sum'] += value
+            hist['count'] += 1
+
+    def inc(self, name, amount=1, labels=None):
+        """Increment a counter"""
+        key = (name, _label_key(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def observe_request(self, timer, file_type, outcome, total=None):
+        """Fold a finished request's spans and token usage into the registry"""
+        labels = {'file_type': file_type, 'outcome': outcome}
+        for stage, seconds in timer.spans.items():
+            self.observe('timesheet_stage_duration_seconds', seconds, dict(labels, stage=stage))
+        self.observe('timesheet_request_duration_seconds',
+                     total if total is not None else timer.elapsed(), labels)
+        for field, count in timer.usage.items():
+            if count:
+                self.inc('timesheet_claude_tokens_total', count, dict(labels, type=field))
+
+    def render(self):
+        """Render every metric in the Prometheus text format"""
+        with self._lock:
+            histograms = {k: {'buckets': list(v['buckets']), 'sum': v['sum'], 'count': v['count']}
+                          for k, v in self._histograms.items()}
+            counters = dict(self._counters)
+
+        lines = []
+        names = sorted({name for name, _ in histograms} | {name for name, _ in counters})
+        for name in names:
+            metric_type, help_text = self._meta.get(name, ('untyped', ''))
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} {metric_type}')
+
+            for (metric, label_key), hist in sorted(histograms.items()):
+                if metric != name:
+                    continue
+                for bound, count in zip(self.buckets, hist['buckets']):
+                    lines.append(f'{name}_bucket{_format_labels(label_key, le=_format_bound(bound))} {count}')
+                lines.append(f'{name}_bucket{_format_labels(label_key, le="+Inf")} {hist["count"]}')
+                lines.append(f'{name}_sum{_format_labels(label_key)} {hist["sum"]:.6f}')
+                lines.append(f'{name}_count{_format_labels(label_key)} {hist["count"]}')
+
+            for (metric, label_key), value in sorted(counters.items()):
+                if metric == name:
+                    lines.append(f'{name}{_format_labels(label_key)} {value}')
+
+        return '\n'.join(lines) + '\n'
+
+
+def _label_key(labels):
+    return tuple(sorted((labels or {}).items()))
+
+
+def _format_bound(bound):
+    return repr(float(bound))
+
+
+def _format_labels(label_key, **extra):
+    pairs = list(label_key) + list(extra.items())
+    if not pairs:
+        return ''
+    rendered = ','.join(
+        '{}="{}"'.format(k, str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+        for k, v in pairs
+    )
+    return '{' + rendered + '}'
+
+
+# Process-wide registry used by the Flask app
+metrics = MetricsRegistry()
+metrics.describe('timesheet_stage_duration_seconds', 'histogram',
+                 'Time spent in each stage of timesheet processing')
+metrics.describe('timesheet_request_duration_seconds', 'histogram',
+                 'End-to-end processing time of timesheet requests')
+metrics.describe('timesheet_claude_tokens_total', 'counter',
+                 'Claude tokens consumed, by usage type')
+metrics.describe('timesheet_claude_call_duration_seconds', 'histogram',
+                 'Latency of individual Claude API calls, by model')
+metrics.describe('timesheet_model_routing_total', 'counter',
+                 'Extraction requests by the model they were routed to and why')
+metrics.describe('timesheet_model_escalations_total', 'counter',
+                 'Fast-model results redone on the strong model, by reason')
+metrics.describe('timesheet_s3_outbox_upload_seconds', 'histogram',
+                 'Duration of background S3 uploads from the outbox')
+metrics.describe('timesheet_s3_outbox_delay_seconds', 'histogram',
+                 'Time from accepting a file to it landing in S3')
+metrics.describe('timesheet_s3_outbox_uploaded_total', 'counter',
+                 'Files uploaded to S3 by the outbox')
+metrics.describe('timesheet_s3_outbox_errors_total', 'counter',
+                 'Failed outbox upload attempts (final="true" once retries are exhausted)')
+metrics.describe('timesheet_incremental_extractions_total', 'counter',
+                 'Revised timesheets by how they were extracted (unchanged, local, partial or full)')
+metrics.describe('timesheet_log_records_dropped_total', 'counter',
+                 'Log records dropped because the logging queue was full')
@@ -0,0 +1,96 @@
+import io
+
+from services.token_estimator import estimate_pdf_pages, estimate_request_tokens
+
+try:
+    import pdfplumber
+except ImportError:  # fall back to the byte-level text layer check
+    pdfplumber = None
+
+TEXT_FILE_TYPES = {'docx', 'xlsx'}
+IMAGE_FILE_TYPES = {'png', 'jpg', 'jpeg'}
+
+# Validation failures surface as these summaries from ClaudeService._parse_response
+FAILED_SUMMARY_PREFIXES = ('Invalid JSON response', 'Response validation error', 'Error processing')
+
+
+def pdf_has_text_layer(file_bytes):
+    """Whether a PDF carries real text (generated) rather than only page images (scanned)"""
+    if b'/Font' in file_bytes:
+        return True
+    if pdfplumber is None or b'/ObjStm' not in file_bytes:
+        return False
+    # Font dictionaries can hide inside compressed object streams - ask the parser
+    try:
+        with pdfplumber.open(io.BytesIO(file_bytes)) as pdf:
+            return bool(pdf.pages and pdf.pages[0].chars)
+    except Exception:
+        return False
+
+
+class RoutingDecision:
+    """Which model an extraction starts on, and why"""
+
+    def __init__(self, model, tier, reason, input_tokens):
+        self.model = model
+        self.tier = tier
+        self.reason = reason
+        self.input_tokens = input_tokens
+
+
+class ModelRouter:
+    """
+    Sends simple extractions to a fast model and everything else to the strong model
+
+    Simple means a text input (DOCX/XLSX or a PDF with a text layer) that is short in
+    both rows and tokens. Scans and photos always go to the strong model. Fast-model
+    results that fail validation or come back below min_confidence are escalated.
+    """
+
+    def __init__(self, fast_model, strong_model, min_confidence=0.7, max_fast_tokens=6000, max_fast_rows=120,
+                 max_fast_pdf_pages=2, hours_tolerance=0.5):
+        self.fast_model = fast_model
+        self.strong_model = strong_model
+        self.min_confidence = min_confidence
+        self.max_fast_tokens = max_fast_tokens
+        self.max_fast_rows = max_fast_rows
+        self.max_fast_pdf_pages = max_fast_pdf_pages
+        self.hours_tolerance = hours_tolerance
+
+    def _strong(self, reason, tokens):
+        return RoutingDecision(self.strong_model, 'strong', reason, tokens)
+
+    def route(self, file_type, text=None, file_bytes=None):
+        """Pick the starting model for one extraction request"""
+        file_type = (file_type or '').lower()
+        tokens = estimate_request_tokens(file_type, text=text, file_bytes=file_bytes)
+
+        if text is not None:
+            rows = text.count('\n') + 1
+            if rows > self.max_fast_rows:
+                return self._strong('rows', tokens)
+        elif file_type == 'pdf':
+            if not pdf_has_text_layer(file_bytes or b''):
+                return self._strong('scanned', tokens)
+            if estimate_pdf_pages(file_bytes or b'') > self.max_fast_pdf_pages:
+                return self._strong('pages', tokens)
+        else:
+            # Photos and scans: handwriting and skew need the stronger vision model
+            return self._strong('image', tokens)
+
+        if tokens > self.max_fast_tokens:
+            return self._strong('tokens', tokens)
+        return RoutingDecision(self.fast_model, 'fast', 'simple', tokens)
+
+    def escalation_reason(self, result):
+        """Why a fast-model result must be redone on the strong model, or None if it stands"""
+        if str(result.get('summary', '')).startswith(FAILED_SUMMARY_PREFIXES):
+            return 'validation'
+        if result.get('confidence_score', 0) < self.min_confidence:
+            return 'low_confidence'
+        breakdown = result.get('daily_breakdown') or []
+        if breakdown:
+            daily_total = sum(entry.get('hours') or 0 for entry in breakdown)
+            if abs(daily_total - result.get('extracted_hours', 0)) > self.hours_tolerance:
+                return 'inconsistent_total'
+        return None
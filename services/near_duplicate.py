@@ -0,0 +1,231 @@
+import json
+import logging
+import sqlite3
+import threading
+import time
+from itertools import combinations
+
+from services.sqlite_store import connect, transaction
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # perceptual hashing is disabled without Pillow
+    Image = ImageOps = None
+
+try:
+    import pdfplumber
+except ImportError:  # PDFs are not fingerprinted without pdfplumber
+    pdfplumber = None
+
+logger = logging.getLogger(__name__)
+
+IMAGE_EXTENSIONS = {'png', 'jpg', 'jpeg'}
+
+# 64-bit dHash per page; the first page's hash is indexed, the rest confirm multi-page matches
+HASH_SIZE = 8
+
+# The first page's hash is split into BANDS 16-bit bands. Two hashes within distance d share at
+# least one band within distance d // BANDS (pigeonhole), so a lookup probes each band's
+# value and its near neighbours (17 values per band at d = 6) instead of scanning the table.
+BANDS = 4
+BAND_BITS = 64 // BANDS
+BAND_MASK = (1 << BAND_BITS) - 1
+
+SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS perceptual_hashes (
+        id INTEGER PRIMARY KEY,
+        band0 INTEGER NOT NULL,
+        band1 INTEGER NOT NULL,
+        band2 INTEGER NOT NULL,
+        band3 INTEGER NOT NULL,
+        page_count INTEGER NOT NULL,
+        page_hashes TEXT NOT NULL,      -- JSON list of per-page 64-bit hashes (hex)
+        file_hash TEXT NOT NULL,
+        file_name TEXT,
+        result TEXT NOT NULL,           -- extraction result (JSON)
+        created_at REAL NOT NULL
+    )
+    """,
+    'CREATE INDEX IF NOT EXISTS idx_phash_band0 ON perceptual_hashes (band0)',
+    'CREATE INDEX IF NOT EXISTS idx_phash_band1 ON perceptual_hashes (band1)',
+    'CREATE INDEX IF NOT EXISTS idx_phash_band2 ON perceptual_hashes (band2)',
+    'CREATE INDEX IF NOT EXISTS idx_phash_band3 ON perceptual_hashes (band3)',
+    'CREATE INDEX IF NOT EXISTS idx_phash_file_hash ON perceptual_hashes (file_hash)',
+]
+
+
+def dhash(image, hash_size=HASH_SIZE):
+    """Difference hash: one bit per horizontally adjacent pixel pair of a downscaled grayscale image"""
+    gray = image.convert('L').resize((hash_size + 1, hash_size), Image.LANCZOS)
+    pixels = gray.tobytes()
+    bits = 0
+    for row in range(hash_size):
+        offset = row * (hash_size + 1)
+        for col in range(hash_size):
+            bits = (bits << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+    return bits
+
+
+def hamming(a, b):
+    return bin(a ^ b).count('1')
+
+
+def _normalize(image):
+    """Undo phone rotation and exposure differences before hashing"""
+    image = ImageOps.exif_transpose(image)
+    return ImageOps.autocontrast(image.convert('L'), cutoff=1)
+
+
+class Fingerprint:
+    """Perceptual hashes of a document's (first few) pages"""
+
+    def __init__(self, page_hashes, page_count):
+        self.page_hashes = page_hashes
+        self.page_count = page_count
+
+    @classmethod
+    def from_images(cls, images, page_count=None):
+        return cls([dhash(_normalize(image)) for image in images], page_count or len(images))
+
+    def bands(self):
+        return [(self.page_hashes[0] >> (BAND_BITS * i)) & BAND_MASK for i in range(BANDS)]
+
+
+def fingerprint_file(file_path, file_extension, max_pages=4, resolution=36):
+    """
+    Perceptual fingerprint of an image or of a PDF's rendered pages
+
+    Returns:
+        Fingerprint, or None for other file types, missing imaging libraries or unreadable files
+    """
+    if Image is None:
+        return None
+    try:
+        if file_extension in IMAGE_EXTENSIONS:
+            with Image.open(file_path) as image:
+                # JPEG decoders can downscale while decoding - far cheaper for phone photos
+                image.draft('L', (256, 256))
+                return Fingerprint.from_images([image.copy()])
+        if file_extension == 'pdf' and pdfplumber is not None:
+            with pdfplumber.open(file_path) as pdf:
+                pages = pdf.pages[:max_pages]
+                if not pages:
+                    return None
+                images = [page.to_image(resolution=resolution).original for page in pages]
+                return Fingerprint.from_images(images, page_count=len(pdf.pages))
+    except Exception as e:
+        logger.warning(f'Perceptual hashing failed: {e}')
+    return None
+
+
+def confirms_duplicate(previous, current):
+    """Whether two extraction results describe the same timesheet rather than the same template"""
+    names = [(result.get('resource_name') or '').strip().lower() for result in (previous, current)]
+    if all(names) and names[0] != names[1]:
+        return False
+
+    previous_days = {entry.get('date') for entry in previous.get('daily_breakdown', []) if entry.get('date')}
+    current_days = {entry.get('date') for entry in current.get('daily_breakdown', []) if entry.get('date')}
+    if previous_days and current_days:
+        return len(previous_days & current_days) * 2 >= min(len(previous_days), len(current_days))
+    return (previous.get('period') == current.get('period') and
+            previous.get('extracted_hours') == current.get('extracted_hours'))
+
+
+class NearDuplicateIndex:
+    """
+    SQLite index of perceptual fingerprints for previously extracted files
+
+    Lookups use multi-index hashing on the first page's hash, then check the remaining
+    pages of each candidate. A page-level hash cannot tell two weeks filled in on the
+    same template apart, so callers should treat a match as a candidate to confirm.
+    """
+
+    def __init__(self, db_path, threshold=6):
+        self.db_path = db_path
+        self.threshold = threshold
+        self._local = threading.local()
+        self._schema_ready = False
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = connect(self.db_path)
+            if not self._schema_ready:
+                with transaction(conn):
+                    for statement in SCHEMA:
+                        conn.execute(statement)
+                self._schema_ready = True
+            self._local.conn = conn
+        return conn
+
+    def _candidates(self, fingerprint):
+        radius = self.threshold // BANDS
+        clauses = []
+        params = []
+        for i, band in enumerate(fingerprint.bands()):
+            values = {band}
+            for flips in range(1, radius + 1):
+                for bits in combinations(range(BAND_BITS), flips):
+                    values.add(band ^ sum(1 << bit for bit in bits))
+            clauses.append(f'band{i} IN ({",".join("?" * len(values))})')
+            params.extend(values)
+        query = ('SELECT * FROM perceptual_hashes WHERE page_count = ? AND (' +
+                 ' OR '.join(clauses) + ')')
+        return self._conn().execute(query, [fingerprint.page_count] + params).fetchall()
+
+    def find(self, fingerprint):
+        """
+        Closest earlier file whose every hashed page is within the threshold
+
+        Returns:
+            dict with file_hash, file_name, created_at, distance and result, or None
+        """
+        best = None
+        for row in self._candidates(fingerprint):
+            stored = [int(value, 16) for value in json.loads(row['page_hashes'])]
+            distances = [hamming(a, b) for a, b in zip(stored, fingerprint.page_hashes)]
+            if max(distances) > self.threshold:
+                continue
+            distance = distances[0]
+
+            if best is None or distance < best['distance']:
+                best = {
+                    'file_hash': row['file_hash'],
+                    'file_name': row['file_name'],
+                    'created_at': row['created_at'],
+                    'distance': distance,
+                    'result': json.loads(row['result'])
+                }
+        return best
+
+    def add(self, fingerprint, file_hash, file_name, result):
+        """Record a successfully extracted file"""
+        bands = fingerprint.bands()
+        conn = self._conn()
+        with transaction(conn):
+            if conn.execute('SELECT 1 FROM perceptual_hashes WHERE file_hash = ?', (file_hash,)).fetchone():
+                return
+            conn.execute(
+                'INSERT INTO perceptual_hashes (band0, band1, band2, band3, page_count, page_hashes, '
+                'file_hash, file_name, result, created_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                bands + [fingerprint.page_count,
+                         json.dumps([f'{value:016x}' for value in fingerprint.page_hashes]),
+                         file_hash, file_name, json.dumps(result), time.time()]
+            )
+
+    def safe_find(self, fingerprint):
+        """find() that logs and returns None if the index is unavailable"""
+        try:
+            return self.find(fingerprint)
+        except sqlite3.Error as e:
+            logger.warning(f'Near-duplicate lookup failed: {e}')
+            return None
+
+    def safe_add(self, fingerprint, file_hash, file_name, result):
+        """add() that logs instead of failing the request"""
+        try:
+            self.add(fingerprint, file_hash, file_name, result)
+        except sqlite3.Error as e:
+            logger.warning(f'Near-duplicate index update failed: {e}')
@@ -0,0 +1,232 @@
+import importlib.util
+import logging
+import multiprocessing
+import math
+import os
+import time
+from concurrent.futures import FIRST_EXCEPTION, ProcessPoolExecutor, wait
+from concurrent.futures import TimeoutError as FutureTimeout
+
+try:
+    from PIL import Image
+except ImportError:  # OCR is unavailable without Pillow
+    Image = None
+
+try:
+    import pypdfium2
+except ImportError:  # scanned PDFs cannot be rasterized without pypdfium2 (a pdfplumber dependency)
+    pypdfium2 = None
+
+# Imported by the pool workers only, once OMP_THREAD_LIMIT is set (see _init_worker);
+# without it they fall back to the tesseract CLI via pytesseract
+HAVE_TESSEROCR = importlib.util.find_spec('tesserocr') is not None
+tesserocr = None
+
+try:
+    import pytesseract
+except ImportError:
+    pytesseract = None
+
+logger = logging.getLogger(__name__)
+
+IMAGE_EXTENSIONS = {'png', 'jpg', 'jpeg'}
+
+# Per-process tesseract handle, created once by the pool initializer
+_api = None
+
+
+class OCRUnavailable(RuntimeError):
+    """No tesseract binding, imaging library or PDF rasterizer is installed"""
+
+
+class OCRPage:
+    """Text and word boxes for one page; boxes are pixels at the page's render DPI"""
+
+    def __init__(self, page_number, text, words, width, height, dpi, seconds):
+        self.page_number = page_number
+        self.text = text
+        self.words = words
+        self.width = width
+        self.height = height
+        self.dpi = dpi
+        self.seconds = seconds
+
+    def to_dict(self):
+        return {
+            'page': self.page_number,
+            'text': self.text,
+            'words': self.words,
+            'width': self.width,
+            'height': self.height,
+            'dpi': self.dpi,
+            'ocr_ms': round(self.seconds * 1000, 1)
+        }
+
+
+class OCRResult:
+    """OCR output for a document; pages beyond the engine's max_pages are not read"""
+
+    def __init__(self, pages, page_count):
+        self.pages = pages
+        self.page_count = page_count
+
+    @property
+    def text(self):
+        return '\n\f'.join(page.text for page in self.pages)
+
+    @property
+    def truncated(self):
+        return len(self.pages) < self.page_count
+
+
+def _init_worker(lang, tessdata):
+    """Pool initializer: limit OpenMP to one thread and load the language model once per worker"""
+    global _api, tesserocr
+    # One page per process - tesseract's own OpenMP threads would fight the pool for cores.
+    # OpenMP reads this when the library loads, so it is set before tesserocr is imported;
+    # pytesseract's CLI calls inherit it. The web process environment is left alone.
+    os.environ['OMP_THREAD_LIMIT'] = '1'
+    if HAVE_TESSEROCR:
+        import tesserocr
+        kwargs = {'lang': lang, 'psm': tesserocr.PSM.AUTO}
+        if tessdata:
+            kwargs['path'] = tessdata
+        _api = tesserocr.PyTessBaseAPI(**kwargs)
+
+
+def _recognize(image, lang, tessdata):
+    """(text, words) for a grayscale PIL image"""
+    words = []
+    if _api is not None:
+        _api.SetImage(image)
+        _api.Recognize()
+        iterator = _api.GetIterator()
+        level = tesserocr.RIL.WORD
+        for word in tesserocr.iterate_level(iterator, level):
+            value = word.GetUTF8Text(level)
+            box = word.BoundingBox(level)
+            if value and box:
+                left, top, right, bottom = box
+                words.append({'text': value, 'left': left, 'top': top, 'width': right - left,
+                              'height': bottom - top, 'confidence': round(word.Confidence(level), 1)})
+        return _api.GetUTF8Text(), words
+
+    # pytesseract runs the CLI per call; one image_to_data call gives both words and line layout
+    config = f'--tessdata-dir "{tessdata}"' if tessdata else ''
+    data = pytesseract.image_to_data(image, lang=lang, config=config, output_type=pytesseract.Output.DICT)
+    lines = {}
+    for i, value in enumerate(data['text']):
+        if not value.strip():
+            continue
+        words.append({'text': value, 'left': data['left'][i], 'top': data['top'][i], 'width': data['width'][i],
+                      'height': data['height'][i], 'confidence': round(float(data['conf'][i]), 1)})
+        key = (data['block_num'][i], data['par_num'][i], data['line_num'][i])
+        lines.setdefault(key, []).append(value)
+    return '\n'.join(' '.join(line) for line in lines.values()) + '\n', words
+
+
+def _ocr_pdf_page(file_path, index, dpi, lang, tessdata):
+    """Rasterize and OCR one PDF page inside a worker process"""
+    start = time.perf_counter()
+    pdf = pypdfium2.PdfDocument(file_path)
+    try:
+        bitmap = pdf[index].render(scale=dpi / 72, grayscale=True)
+        image = bitmap.to_pil()
+    finally:
+        pdf.close()
+    text, words = _recognize(image, lang, tessdata)
+    return OCRPage(index + 1, text, words, image.width, image.height, dpi, time.perf_counter() - start)
+
+
+def _ocr_image(file_path, lang, tessdata):
+    start = time.perf_counter()
+    with Image.open(file_path) as image:
+        dpi = image.info.get('dpi', (None,))[0]
+        image = image.convert('L')
+    text, words = _recognize(image, lang, tessdata)
+    return OCRPage(1, text, words, image.width, image.height, dpi and round(dpi), time.perf_counter() - start)
+
+
+class OCREngine:
+    """
+    Tesseract OCR on a persistent process pool
+
+    Each worker loads the language model once (tesserocr) and PDF pages are rasterized
+    and recognized in parallel, one page per task. Without tesserocr the workers shell
+    out to the tesseract CLI through pytesseract, still in parallel.
+    """
+
+    def __init__(self, workers=None, dpi=200, max_pages=20, lang='eng', tessdata=None, page_timeout=60):
+        self.workers = workers or os.cpu_count() or 1
+        self.dpi = dpi
+        self.max_pages = max_pages
+        self.lang = lang
+        self.tessdata = tessdata or os.environ.get('TESSDATA_PREFIX')
+        self.page_timeout = page_timeout
+        self._pool = None
+
+    @staticmethod
+    def available():
+        return Image is not None and (HAVE_TESSEROCR or pytesseract is not None)
+
+    def _executor(self):
+        if not self.available():
+            raise OCRUnavailable('OCR needs Pillow and tesserocr or pytesseract')
+        if self._pool is None:
+            # spawn: forking a threaded web worker can copy held locks into the children
+            self._pool = ProcessPoolExecutor(max_workers=self.workers,
+                                             mp_context=multiprocessing.get_context('spawn'),
+                                             initializer=_init_worker, initargs=(self.lang, self.tessdata))
+        return self._pool
+
+    def warm_up(self):
+        """Start every worker and load its language model ahead of the first request"""
+        executor = self._executor()
+        list(executor.map(time.sleep, [0.05] * self.workers))
+
+    def ocr_pdf(self, file_path):
+        """
+        OCR the first max_pages pages of a PDF in parallel
+
+        The whole document gets one deadline: page_timeout for each round of pages the
+        pool works through. Pages still pending when it passes are cancelled.
+        """
+        if pypdfium2 is None:
+            raise OCRUnavailable('Scanned PDFs need pypdfium2')
+        pdf = pypdfium2.PdfDocument(file_path)
+        try:
+            page_count = len(pdf)
+        finally:
+            pdf.close()
+
+        executor = self._executor()
+        futures = [executor.submit(_ocr_pdf_page, file_path, index, self.dpi, self.lang, self.tessdata)
+                   for index in range(min(page_count, self.max_pages))]
+        timeout = self.page_timeout * math.ceil(len(futures) / self.workers)
+        done, pending = wait(futures, timeout=timeout, return_when=FIRST_EXCEPTION)
+        if pending:
+            for future in pending:
+                future.cancel()
+            failed = [future for future in done if future.exception() is not None]
+            if failed:
+                raise failed[0].exception()
+            raise FutureTimeout(f'OCR of {len(futures)} pages did not finish within {timeout}s')
+        return OCRResult([future.result() for future in futures], page_count)
+
+    def ocr_image(self, file_path):
+        page = self._executor().submit(_ocr_image, file_path, self.lang, self.tessdata).result(
+            timeout=self.page_timeout)
+        return OCRResult([page], 1)
+
+    def ocr_file(self, file_path, file_extension):
+        """OCRResult for a PDF or image file"""
+        if file_extension == 'pdf':
+            return self.ocr_pdf(file_path)
+        if file_extension in IMAGE_EXTENSIONS:
+            return self.ocr_image(file_path)
+        raise ValueError(f'Unsupported file type for OCR: {file_extension}')
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
@@ -1,14 +1,25 @@
-import pytesseract
-from PIL import Image
 import pdfplumber
 import re
-import os
-import tempfile
-from docx import Document
+import threading
+from config import Config
+from services.docx_extractor import extract_docx_text
+from services.ocr_engine import OCREngine
+
+_default_engine = None
+_default_engine_lock = threading.Lock()
+
+def default_engine():
+    """Process-wide OCR pool sized and tuned from Config"""
+    global _default_engine
+    with _default_engine_lock:
+        if _default_engine is None:
+            _default_engine = OCREngine(workers=Config.OCR_WORKERS, dpi=Config.OCR_DPI,
+                                        max_pages=Config.OCR_MAX_PAGES)
+    return _default_engine
 
 class OCRService:
-    def __init__(self):
-        pass
+    def __init__(self, engine=None):
+        self.engine = engine or default_engine()
     
     def extract_hours(self, file_path):
         file_extension = file_path.split('.')[-1].lower()
@@ -31,6 +42,10 @@ class OCRService:
                     if page_text:
                         text += page_text
                 
+                # No text layer - a scan, so OCR the rendered pages
+                if not text.strip():
+                    text = self.engine.ocr_pdf(file_path).text
+
                 hours = self._extract_hours_from_text(text)
                 if hours is not None:
                     return hours
@@ -41,8 +56,7 @@ class OCRService:
     
     def _extract_from_image(self, file_path):
         try:
-            image = Image.open(file_path)
-            text = pytesseract.image_to_string(image)
+            text = self.engine.ocr_image(file_path).text
             return self._extract_hours_from_text(text)
         except Exception as e:
             print(f"Error processing image: {e}")
@@ -50,17 +64,7 @@ class OCRService:
     
     def _extract_from_word(self, file_path):
         try:
-            doc = Document(file_path)
-            text = ""
-            for paragraph in doc.paragraphs:
-                text += paragraph.text + "\n"
-            
-            for table in doc.tables:
-                for row in table.rows:
-                    for cell in row.cells:
-                        text += cell.text + " "
-                    text += "\n"
-            
+            text = extract_docx_text(file_path)
             return self._extract_hours_from_text(text)
         except Exception as e:
             print(f"Error processing Word document: {e}")
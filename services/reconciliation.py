@@ -0,0 +1,221 @@
+import csv
+import io
+import re
+
+from services.result_store import month_from_period, resource_key
+from services.sqlite_store import connect
+
+_ISO_DATE_RE = re.compile(r'^\d{4}-\d{2}-\d{2}$')
+_MONTH_RE = re.compile(r'^\d{4}-\d{2}$')
+
+# Accepted spellings of each claim column (CSV headers and JSON keys)
+COLUMN_ALIASES = {
+    'resource': ('resource', 'resource_name', 'name', 'employee'),
+    'period': ('period', 'month'),
+    'date': ('date', 'day', 'entry_date'),
+    'claimed_hours': ('claimed_hours', 'hours', 'claimed'),
+}
+
+# Rows fetched from SQLite per round trip while streaming results
+FETCH_SIZE = 500
+
+
+class ClaimsError(ValueError):
+    """The uploaded claims could not be parsed; carries per-row messages"""
+
+    def __init__(self, errors):
+        super().__init__(f'{len(errors)} invalid claim rows')
+        self.errors = errors
+
+
+def parse_claims_csv(text):
+    """Claim rows from CSV text with a header row"""
+    return list(csv.DictReader(io.StringIO(text.lstrip('﻿'))))
+
+
+def _field(row, name):
+    for alias in COLUMN_ALIASES[name]:
+        for key, value in row.items():
+            if key and key.strip().lower() == alias and value not in (None, ''):
+                return value
+    return None
+
+
+def normalize_claims(rows):
+    """
+    Group raw claim rows into per resource/month claims
+
+    Rows with a date are per-day claims and also roll up into their month; a row without
+    a date sets the month's claimed total explicitly (overriding the sum of its days).
+
+    Returns:
+        tuple: (claims, day_claims) where claims is a list of
+        (resource_key, resource_name, month, claimed_hours) and day_claims maps
+        claim index -> {date: claimed_hours}
+
+    Raises:
+        ClaimsError: if any row is missing a resource, a period/date or a numeric hours value
+    """
+    errors = []
+    index = {}
+    claims = []
+    day_claims = {}
+    explicit = set()
+
+    for number, row in enumerate(rows, start=1):
+        if not isinstance(row, dict):
+            errors.append({'row': number, 'error': 'Claim must be an object'})
+            continue
+        resource = _field(row, 'resource')
+        date = _field(row, 'date')
+        period = _field(row, 'period')
+        try:
+            hours = float(_field(row, 'claimed_hours'))
+        except (TypeError, ValueError):
+            errors.append({'row': number, 'error': 'claimed_hours must be a number'})
+            continue
+        if not resource:
+            errors.append({'row': number, 'error': 'resource is required'})
+            continue
+
+        date = str(date).strip() if date else None
+        if date and not _ISO_DATE_RE.match(date):
+            errors.append({'row': number, 'error': 'date must be YYYY-MM-DD'})
+            continue
+        month = date[:7] if date else None
+        if month is None and period:
+            period = str(period).strip()
+            month = period if _MONTH_RE.match(period) else month_from_period(period)
+        if month is None:
+            errors.append({'row': number, 'error': 'period (YYYY-MM or e.g. "January 2026") or date is required'})
+            continue
+
+        key = (resource_key(resource), month)
+        if key not in index:
+            index[key] = len(claims)
+            claims.append([key[0], ' '.join(str(resource).split()), month, 0.0])
+        claim = index[key]
+        if date:
+            days = day_claims.setdefault(claim, {})
+            days[date] = days.get(date, 0.0) + hours
+            if claim not in explicit:
+                claims[claim][3] += hours
+        else:
+            explicit.add(claim)
+            claims[claim][3] = hours
+
+    if errors:
+        raise ClaimsError(errors)
+    return [tuple(claim) for claim in claims], day_claims
+
+
+def _status_sql(difference, confidence):
+    """SQL CASE mirroring app.calculate_match_status"""
+    return (f"CASE WHEN {confidence} < :min_confidence THEN 'Low Confidence' "
+            f"WHEN ABS({difference}) <= :match_tolerance THEN 'Match' "
+            f"WHEN ABS({difference}) <= :minor_mismatch THEN 'Minor Mismatch' "
+            f"ELSE 'Mismatch' END")
+
+
+CLAIM_RESULTS_SQL = f"""
+SELECT c.id, c.resource_name, c.month, c.claimed_hours,
+       x.hours AS extracted_hours, x.confidence_score, x.timesheets, x.approval_status,
+       ROUND(ABS(x.hours - c.claimed_hours), 2) AS variance,
+       CASE WHEN x.hours IS NULL THEN 'Not Found'
+            ELSE {_status_sql('x.hours - c.claimed_hours', 'x.confidence_score')} END AS match_status
+FROM temp.claims c
+LEFT JOIN (
+    SELECT m.resource_key, m.month, ROUND(SUM(m.hours), 2) AS hours,
+           MIN(e.confidence_score) AS confidence_score, COUNT(*) AS timesheets,
+           GROUP_CONCAT(DISTINCT e.approval_status) AS approval_status
+    FROM extraction_months m JOIN extractions e ON e.id = m.extraction_id
+    WHERE (m.resource_key, m.month) IN (SELECT resource_key, month FROM temp.claims)
+    GROUP BY m.resource_key, m.month
+) x ON x.resource_key = c.resource_key AND x.month = c.month
+ORDER BY c.id
+"""
+
+# Per-day comparison for claims that came with daily rows: claimed days that differ from
+# the extraction plus extracted days nobody claimed (SQLite has no FULL OUTER JOIN here)
+DAY_DISCREPANCIES_SQL = """
+WITH extracted AS (
+    SELECT c.id AS claim_id, d.entry_date, SUM(d.hours) AS hours
+    FROM temp.claims c
+    JOIN daily_entries d ON d.resource_key = c.resource_key AND d.month = c.month
+    JOIN extractions e ON e.id = d.extraction_id AND e.duplicate_of IS NULL AND e.superseded_by IS NULL
+    WHERE c.id IN (SELECT DISTINCT claim_id FROM temp.claim_days)
+    GROUP BY c.id, d.entry_date
+)
+SELECT claim_id, entry_date, claimed, extracted FROM (
+    SELECT cd.claim_id, cd.entry_date, cd.claimed_hours AS claimed, COALESCE(x.hours, 0) AS extracted
+    FROM temp.claim_days cd
+    LEFT JOIN extracted x ON x.claim_id = cd.claim_id AND x.entry_date = cd.entry_date
+    UNION ALL
+    SELECT x.claim_id, x.entry_date, 0, x.hours
+    FROM extracted x
+    WHERE NOT EXISTS (SELECT 1 FROM temp.claim_days cd
+                      WHERE cd.claim_id = x.claim_id AND cd.entry_date = x.entry_date)
+)
+WHERE ROUND(claimed - extracted, 2) != 0
+ORDER BY claim_id, entry_date
+"""
+
+
+def reconcile(db_path, claims, day_claims, thresholds):
+    """
+    Join claims against stored extractions in SQL and yield one result per claim
+
+    Args:
+        db_path: Result store database
+        claims: From normalize_claims
+        day_claims: From normalize_claims
+        thresholds: dict with match_tolerance, minor_mismatch and min_confidence
+
+    Yields:
+        dict per claim, in input order, with variance, match_status and day_discrepancies
+    """
+    conn = connect(db_path)
+    try:
+        # Only temp tables are written, so a deferred transaction never takes the shared write lock
+        conn.execute('BEGIN')
+        try:
+            conn.execute('CREATE TEMP TABLE claims (id INTEGER PRIMARY KEY, resource_key TEXT, '
+                         'resource_name TEXT, month TEXT, claimed_hours REAL)')
+            conn.execute('CREATE TEMP TABLE claim_days (claim_id INTEGER, entry_date TEXT, claimed_hours REAL)')
+            conn.executemany('INSERT INTO temp.claims VALUES (?, ?, ?, ?, ?)',
+                             ((number,) + claim for number, claim in enumerate(claims)))
+            conn.executemany('INSERT INTO temp.claim_days VALUES (?, ?, ?)',
+                             ((claim, date, hours) for claim, days in day_claims.items()
+                              for date, hours in days.items()))
+            conn.execute('CREATE INDEX temp.idx_claims_key ON claims (resource_key, month)')
+            conn.execute('CREATE INDEX temp.idx_claim_days ON claim_days (claim_id, entry_date)')
+            conn.execute('COMMIT')
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+
+        # Both result sets are ordered by claim id, so they can be merged while streaming
+        days_cursor = conn.execute(DAY_DISCREPANCIES_SQL) if day_claims else iter(())
+        pending_day = next(days_cursor, None)
+        claims_cursor = conn.execute(CLAIM_RESULTS_SQL, thresholds)
+        while True:
+            rows = claims_cursor.fetchmany(FETCH_SIZE)
+            if not rows:
+                break
+            for row in rows:
+                result = dict(row)
+                claim_id = result.pop('id')
+                if claim_id in day_claims:
+                    discrepancies = []
+                    while pending_day is not None and pending_day['claim_id'] == claim_id:
+                        discrepancies.append({
+                            'date': pending_day['entry_date'],
+                            'claimed_hours': pending_day['claimed'],
+                            'extracted_hours': pending_day['extracted'],
+                            'difference': round(pending_day['extracted'] - pending_day['claimed'], 2)
+                        })
+                        pending_day = next(days_cursor, None)
+                    result['day_discrepancies'] = discrepancies
+                yield result
+    finally:
+        conn.close()
@@ -0,0 +1,188 @@
+import json
+import logging
+import sqlite3
+import threading
+import time
+import uuid
+
+from services.sqlite_store import connect, transaction
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS flights (
+    key TEXT PRIMARY KEY,
+    state TEXT NOT NULL,            -- 'running' or 'done'
+    owner TEXT NOT NULL,            -- token of the request computing the result
+    heartbeat REAL NOT NULL,        -- last time the owner proved it is alive
+    status INTEGER,
+    body TEXT,
+    replayable INTEGER NOT NULL DEFAULT 0,
+    expires_at REAL,
+    created_at REAL NOT NULL,
+    completed_at REAL
+)
+"""
+
+
+class CoalesceTimeout(Exception):
+    """An identical request is still running after the follower's wait budget"""
+
+
+class RequestCoalescer:
+    """
+    Single-flight execution of identical requests across gunicorn workers
+
+    The first request for a key becomes the leader and computes the response;
+    concurrent requests with the same key poll a shared SQLite table until the
+    leader stores its result. Requests that arrive after the leader finished run
+    again, unless share_window (off by default) is set to also share a result with
+    duplicates queued in the listen backlog that arrive within that many seconds of
+    its completion. Leaders heartbeat while they work, so a crashed worker's lease
+    expires and a waiting follower takes over. Replayable results (idempotent
+    requests) are served again until replay_ttl expires.
+    """
+
+    def __init__(self, db_path, replay_ttl=86400, lease_seconds=30, wait_timeout=120, poll_interval=0.1,
+                 share_window=0.0):
+        self.db_path = db_path
+        self.replay_ttl = replay_ttl
+        self.share_window = share_window
+        self.lease_seconds = lease_seconds
+        self.wait_timeout = wait_timeout
+        self.poll_interval = poll_interval
+        self._local = threading.local()
+        self._schema_ready = False
+
+    def _conn(self):
+        # One connection per thread (heartbeats run on their own thread)
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = connect(self.db_path)
+            if not self._schema_ready:
+                conn.execute(SCHEMA)
+                self._schema_ready = True
+            self._local.conn = conn
+        return conn
+
+    def run(self, key, compute, idempotent=False, started_at=None):
+        """
+        Compute the response for key once, sharing it with concurrent duplicates
+
+        Args:
+            key: Coalescing key (request fingerprint)
+            compute: Callable returning (body, status, cacheable); body must be JSON-serializable
+            idempotent: Store a cacheable result for replay to later requests with the same key
+            started_at: Wall-clock arrival time of the request; a result completed after it
+                was computed concurrently and is shared even when it is not replayable
+
+        Returns:
+            tuple: (body, status, role) where role is 'leader', 'follower' or 'replay'
+        """
+        deadline = time.monotonic() + self.wait_timeout
+        started_at = time.time() if started_at is None else started_at
+        while True:
+            try:
+                role, row = self._claim(key, started_at)
+            except sqlite3.Error as e:
+                # A broken store must never block extraction - run uncoordinated
+                logger.warning(f'Request coalescing unavailable: {e}')
+                body, status, _ = compute()
+                return body, status, 'leader'
+
+            if role == 'leader':
+                return self._lead(key, row, compute, idempotent)
+            if role == 'replay':
+                return json.loads(row['body']), row['status'], 'replay'
+            if row['state'] == 'done':
+                return json.loads(row['body']), row['status'], 'follower'
+
+            done = self._wait(key, deadline)
+            if done is not None:
+                return json.loads(done['body']), done['status'], 'follower'
+            if time.monotonic() >= deadline:
+                raise CoalesceTimeout(key)
+            # Leader gave up or its lease expired - try to take over
+
+    def _claim(self, key, started_at):
+        """Atomically become the leader, or return the row to follow, share or replay"""
+        conn = self._conn()
+        now = time.time()
+        with transaction(conn):
+            row = conn.execute('SELECT * FROM flights WHERE key = ?', (key,)).fetchone()
+            if row is not None:
+                if row['state'] == 'done' and row['replayable'] and row['expires_at'] > now:
+                    return 'replay', row
+                # Arrived while the leader ran (or, with a share window, queued behind it) - a duplicate
+                if row['state'] == 'done' and (row['completed_at'] >= started_at or
+                                               (self.share_window and
+                                                row['completed_at'] > now - self.share_window)):
+                    return 'follower', row
+                if row['state'] == 'running' and row['heartbeat'] > now - self.lease_seconds:
+                    return 'follower', row
+            token = uuid.uuid4().hex
+            conn.execute(
+                'INSERT OR REPLACE INTO flights (key, state, owner, heartbeat, created_at) '
+                "VALUES (?, 'running', ?, ?, ?)",
+                (key, token, now, now)
+            )
+            return 'leader', token
+
+    def _lead(self, key, token, compute, idempotent):
+        stop = threading.Event()
+        heartbeat = threading.Thread(target=self._heartbeat, args=(key, token, stop), daemon=True)
+        heartbeat.start()
+        try:
+            body, status, cacheable = compute()
+        except BaseException:
+            # Let a waiting follower retry rather than share the failure
+            stop.set()
+            self._release(key, token)
+            raise
+        stop.set()
+
+        replayable = bool(idempotent and cacheable)
+        now = time.time()
+        # Non-replayable rows only need to outlive the followers already waiting on them
+        expires_at = now + (self.replay_ttl if replayable else max(self.wait_timeout, self.share_window))
+        try:
+            conn = self._conn()
+            conn.execute(
+                "UPDATE flights SET state = 'done', status = ?, body = ?, replayable = ?, expires_at = ?, "
+                'completed_at = ? WHERE key = ? AND owner = ?',
+                (status, json.dumps(body), int(replayable), expires_at, now, key, token)
+            )
+            conn.execute("DELETE FROM flights WHERE state = 'done' AND expires_at < ?", (now,))
+        except sqlite3.Error as e:
+            logger.warning(f'Failed to store coalesced result: {e}')
+        return body, status, 'leader'
+
+    def _heartbeat(self, key, token, stop):
+        interval = self.lease_seconds / 3
+        while not stop.wait(interval):
+            try:
+                self._conn().execute('UPDATE flights SET heartbeat = ? WHERE key = ? AND owner = ?',
+                                     (time.time(), key, token))
+            except sqlite3.Error as e:
+                logger.warning(f'Coalescing heartbeat failed: {e}')
+
+    def _release(self, key, token):
+        try:
+            self._conn().execute("DELETE FROM flights WHERE key = ? AND owner = ? AND state = 'running'",
+                                 (key, token))
+        except sqlite3.Error as e:
+            logger.warning(f'Failed to release coalescing lease: {e}')
+
+    def _wait(self, key, deadline):
+        """Poll until a result is stored; None when the leader vanished or the deadline passed"""
+        conn = self._conn()
+        while time.monotonic() < deadline:
+            time.sleep(self.poll_interval)
+            row = conn.execute('SELECT * FROM flights WHERE key = ?', (key,)).fetchone()
+            if row is None:
+                return None
+            if row['state'] == 'done':
+                return row
+            if row['heartbeat'] <= time.time() - self.lease_seconds:
+                return None
+        return None
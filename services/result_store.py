@@ -0,0 +1,369 @@
+import json
+import re
+import threading
+from collections import Counter
+from datetime import datetime
+
+from services.sqlite_store import connect, transaction
+
+SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS extractions (
+        id INTEGER PRIMARY KEY,
+        file_hash TEXT NOT NULL UNIQUE,
+        file_name TEXT,
+        file_type TEXT,
+        file_size_bytes INTEGER,
+        s3_url TEXT,
+        request_id TEXT,
+        resource_name TEXT,
+        resource_key TEXT,              -- normalized resource_name used for filtering and grouping
+        period TEXT,
+        period_start TEXT,
+        period_end TEXT,
+        period_month TEXT,              -- YYYY-MM the timesheet mostly falls in
+        approval_status TEXT,
+        approver_name TEXT,
+        extracted_hours REAL NOT NULL,
+        confidence_score REAL NOT NULL,
+        claimed_hours REAL,
+        match_status TEXT,
+        variance REAL,
+        summary TEXT,
+        anomalies TEXT,                 -- JSON list
+        duplicate_of TEXT,              -- file_hash of an earlier submission of the same timesheet
+        superseded_by TEXT,             -- file_hash of a later revision that replaces this one in the rollups
+        entry_count INTEGER NOT NULL,
+        uploaded_at TEXT NOT NULL
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS daily_entries (
+        extraction_id INTEGER NOT NULL REFERENCES extractions (id) ON DELETE CASCADE,
+        resource_key TEXT,
+        entry_date TEXT,
+        month TEXT,
+        hours REAL NOT NULL,
+        start_time TEXT,
+        end_time TEXT,
+        notes TEXT
+    )
+    """,
+    # Each extraction's hours per calendar month, kept so the rollup can be reversed on replace
+    """
+    CREATE TABLE IF NOT EXISTS extraction_months (
+        extraction_id INTEGER NOT NULL REFERENCES extractions (id) ON DELETE CASCADE,
+        resource_key TEXT NOT NULL,
+        month TEXT NOT NULL,
+        hours REAL NOT NULL,
+        entries INTEGER NOT NULL
+    )
+    """,
+    # Rollup maintained on every save so hours-per-resource-per-month never scans the entries
+    """
+    CREATE TABLE IF NOT EXISTS monthly_hours (
+        resource_key TEXT NOT NULL,
+        month TEXT NOT NULL,
+        resource_name TEXT,
+        hours REAL NOT NULL,
+        entries INTEGER NOT NULL,
+        timesheets INTEGER NOT NULL,
+        PRIMARY KEY (resource_key, month)
+    )
+    """,
+    'CREATE INDEX IF NOT EXISTS idx_extraction_months ON extraction_months (extraction_id)',
+    'CREATE INDEX IF NOT EXISTS idx_extraction_months_key ON extraction_months (resource_key, month)',
+    'CREATE INDEX IF NOT EXISTS idx_monthly_hours_month ON monthly_hours (month)',
+    'CREATE INDEX IF NOT EXISTS idx_extractions_resource ON extractions (resource_key, period_month)',
+    'CREATE INDEX IF NOT EXISTS idx_extractions_month ON extractions (period_month)',
+    'CREATE INDEX IF NOT EXISTS idx_extractions_period ON extractions (period)',
+    'CREATE INDEX IF NOT EXISTS idx_extractions_uploaded ON extractions (uploaded_at)',
+    'CREATE INDEX IF NOT EXISTS idx_daily_extraction ON daily_entries (extraction_id)',
+    'CREATE INDEX IF NOT EXISTS idx_daily_resource ON daily_entries (resource_key, entry_date)',
+    'CREATE INDEX IF NOT EXISTS idx_daily_month ON daily_entries (month, resource_key)',
+]
+
+_ISO_DATE_RE = re.compile(r'^\d{4}-\d{2}-\d{2}$')
+_MONTHS = {name: number for number, name in enumerate(
+    ['january', 'february', 'march', 'april', 'may', 'june', 'july', 'august',
+     'september', 'october', 'november', 'december'], start=1)}
+_MONTH_YEAR_RE = re.compile(r'\b([a-z]{3,9})\.?\s+(\d{4})\b', re.IGNORECASE)
+_YEAR_MONTH_RE = re.compile(r'\b(\d{4})-(\d{2})\b')
+
+# Columns returned by the list endpoint
+SUMMARY_COLUMNS = (
+    'id', 'file_hash', 'file_name', 'file_type', 'resource_name', 'period', 'period_start', 'period_end',
+    'period_month', 'approval_status', 'approver_name', 'extracted_hours', 'confidence_score',
+    'claimed_hours', 'match_status', 'variance', 'duplicate_of', 'superseded_by', 'entry_count', 'uploaded_at',
+    's3_url'
+)
+
+# Columns added after the first release, created on stores that predate them
+MIGRATIONS = {
+    'superseded_by': 'ALTER TABLE extractions ADD COLUMN superseded_by TEXT',
+}
+
+
+def resource_key(name):
+    """Case- and whitespace-insensitive key for a resource name"""
+    if not name:
+        return None
+    return ' '.join(str(name).split()).lower()
+
+
+def month_from_period(period):
+    """YYYY-MM from free-text periods such as 'January 2026' or '2026-01-05 to 2026-01-11'"""
+    if not period:
+        return None
+    match = _YEAR_MONTH_RE.search(period)
+    if match and 1 <= int(match.group(2)) <= 12:
+        return f'{match.group(1)}-{match.group(2)}'
+    for word, year in _MONTH_YEAR_RE.findall(period):
+        for name, number in _MONTHS.items():
+            if name.startswith(word.lower()) and len(word) >= 3:
+                return f'{year}-{number:02d}'
+    return None
+
+
+def period_bounds(daily_breakdown, period):
+    """(period_start, period_end, period_month) from the entry dates, falling back to the period text"""
+    dates = sorted(entry['date'] for entry in daily_breakdown if _ISO_DATE_RE.match(entry.get('date') or ''))
+    if dates:
+        month = Counter(day[:7] for day in dates).most_common(1)[0][0]
+        return dates[0], dates[-1], month
+    return None, None, month_from_period(period)
+
+
+def monthly_contributions(daily_breakdown, period_month, extracted_hours):
+    """{month: (hours, entries)} - dated entries by their own month, otherwise the whole total under period_month"""
+    months = {}
+    for entry in daily_breakdown:
+        date = entry.get('date') or ''
+        if _ISO_DATE_RE.match(date):
+            hours, entries = months.get(date[:7], (0.0, 0))
+            months[date[:7]] = (hours + (entry.get('hours') or 0), entries + 1)
+    if not months and period_month:
+        months[period_month] = (extracted_hours, 0)
+    return months
+
+
+class ResultStore:
+    """Persists every extraction and its daily entries in SQLite for later queries and reconciliation"""
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self._local = threading.local()
+        self._schema_ready = False
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = connect(self.db_path)
+            conn.execute('PRAGMA foreign_keys=ON')
+            if not self._schema_ready:
+                with transaction(conn):
+                    for statement in SCHEMA:
+                        conn.execute(statement)
+                    columns = {row['name'] for row in conn.execute('PRAGMA table_info(extractions)')}
+                    for column, statement in MIGRATIONS.items():
+                        if column not in columns:
+                            conn.execute(statement)
+                self._schema_ready = True
+            self._local.conn = conn
+        return conn
+
+    def ensure_schema(self):
+        """Create the tables up front, for readers that open their own connection"""
+        self._conn()
+
+    def save(self, response_data, file_hash, request_id=None, uploaded_at=None, supersedes=None):
+        """
+        Store an extraction response; re-processing the same file replaces the earlier row
+
+        supersedes is the file_hash of an earlier version of the same timesheet. The newest
+        version in its chain is kept for reference but marked superseded_by this file and
+        taken out of the monthly rollup and reconciliation, so only the newest revision counts.
+
+        Returns:
+            int: id of the stored extraction
+        """
+        daily_breakdown = response_data.get('daily_breakdown') or []
+        period_start, period_end, period_month = period_bounds(daily_breakdown, response_data.get('period'))
+        key = resource_key(response_data.get('resource_name'))
+        duplicate_of = (response_data.get('near_duplicate_of') or {}).get('file_hash')
+        if duplicate_of == file_hash:
+            duplicate_of = None  # byte-identical re-upload - this row replaces the earlier one
+
+        conn = self._conn()
+        with transaction(conn):
+            previous = conn.execute('SELECT id FROM extractions WHERE file_hash = ?', (file_hash,)).fetchone()
+            if previous is not None:
+                self._remove_from_rollup(conn, previous['id'])
+                conn.execute('DELETE FROM extractions WHERE id = ?', (previous['id'],))
+            if supersedes and supersedes != file_hash:
+                earlier = self._revision_head(conn, supersedes, file_hash)
+                if earlier is not None:
+                    self._remove_from_rollup(conn, earlier['id'])
+                    conn.execute('UPDATE extractions SET superseded_by = ? WHERE id = ?', (file_hash, earlier['id']))
+
+            cursor = conn.execute(
+                'INSERT INTO extractions (file_hash, file_name, file_type, file_size_bytes, s3_url, request_id, '
+                'resource_name, resource_key, period, period_start, period_end, period_month, approval_status, '
+                'approver_name, extracted_hours, confidence_score, claimed_hours, match_status, variance, summary, '
+                'anomalies, duplicate_of, entry_count, uploaded_at) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                (file_hash, response_data.get('file_name'), response_data.get('file_type'),
+                 response_data.get('file_size_bytes'), response_data.get('s3_url'), request_id,
+                 response_data.get('resource_name'), key, response_data.get('period'),
+                 period_start, period_end, period_month, response_data.get('approval_status'),
+                 response_data.get('approver_name'), response_data['extracted_hours'],
+                 response_data['confidence_score'], response_data.get('claimed_hours'),
+                 response_data.get('match_status'), response_data.get('variance'), response_data.get('summary'),
+                 json.dumps(response_data.get('anomalies') or []), duplicate_of, len(daily_breakdown),
+                 uploaded_at or datetime.utcnow().isoformat(timespec='seconds'))
+            )
+            extraction_id = cursor.lastrowid
+            conn.executemany(
+                'INSERT INTO daily_entries (extraction_id, resource_key, entry_date, month, hours, start_time, '
+                'end_time, notes) VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                [(extraction_id, key, entry.get('date'),
+                  entry['date'][:7] if _ISO_DATE_RE.match(entry.get('date') or '') else None,
+                  entry.get('hours') or 0, entry.get('start_time'), entry.get('end_time'), entry.get('notes'))
+                 for entry in daily_breakdown]
+            )
+
+            # Confirmed duplicate submissions are stored but never counted twice
+            if duplicate_of is None:
+                months = monthly_contributions(daily_breakdown, period_month, response_data['extracted_hours'])
+                for month, (hours, entries) in months.items():
+                    conn.execute('INSERT INTO extraction_months (extraction_id, resource_key, month, hours, entries) '
+                                 'VALUES (?, ?, ?, ?, ?)', (extraction_id, key or '', month, hours, entries))
+                    self._add_to_rollup(conn, key or '', response_data.get('resource_name'), month, hours, entries, 1)
+            conn.execute('DELETE FROM monthly_hours WHERE timesheets <= 0')
+        return extraction_id
+
+    def _revision_head(self, conn, supersedes, file_hash):
+        """Newest version in the chain starting at supersedes (it may have been revised since), or None"""
+        seen = {file_hash}
+        row = conn.execute('SELECT id, file_hash, superseded_by FROM extractions WHERE file_hash = ?',
+                           (supersedes,)).fetchone()
+        while row is not None and row['superseded_by'] is not None:
+            if row['superseded_by'] in seen:
+                return None
+            seen.add(row['file_hash'])
+            row = conn.execute('SELECT id, file_hash, superseded_by FROM extractions WHERE file_hash = ?',
+                               (row['superseded_by'],)).fetchone()
+        return row
+
+    def _remove_from_rollup(self, conn, extraction_id):
+        """Reverse an extraction's monthly contributions and forget them"""
+        for row in conn.execute('SELECT resource_key, month, hours, entries FROM extraction_months '
+                                'WHERE extraction_id = ?', (extraction_id,)).fetchall():
+            self._add_to_rollup(conn, row['resource_key'], None, row['month'], -row['hours'], -row['entries'], -1)
+        conn.execute('DELETE FROM extraction_months WHERE extraction_id = ?', (extraction_id,))
+
+    def _add_to_rollup(self, conn, key, resource_name, month, hours, entries, timesheets):
+        conn.execute(
+            'INSERT INTO monthly_hours (resource_key, month, resource_name, hours, entries, timesheets) '
+            'VALUES (?, ?, ?, ?, ?, ?) ON CONFLICT (resource_key, month) DO UPDATE SET '
+            'hours = hours + excluded.hours, entries = entries + excluded.entries, '
+            'timesheets = timesheets + excluded.timesheets, '
+            'resource_name = COALESCE(excluded.resource_name, resource_name)',
+            (key, month, resource_name, hours, entries, timesheets)
+        )
+
+    def query(self, resource=None, period=None, month=None, approval_status=None, file_hash=None,
+              uploaded_from=None, uploaded_to=None, include_duplicates=True, cursor=None, limit=50):
+        """
+        Extractions matching every given filter, newest first
+
+        Pagination is keyset-based: pass the returned next_cursor to fetch the next page.
+
+        Returns:
+            tuple: (rows as dicts, next_cursor or None)
+        """
+        clauses = []
+        params = []
+        if resource:
+            clauses.append('resource_key = ?')
+            params.append(resource_key(resource))
+        if period:
+            clauses.append('period = ?')
+            params.append(period)
+        if month:
+            clauses.append('period_month = ?')
+            params.append(month)
+        if approval_status:
+            clauses.append('approval_status = ?')
+            params.append(approval_status)
+        if file_hash:
+            clauses.append('file_hash = ?')
+            params.append(file_hash)
+        if uploaded_from:
+            clauses.append('uploaded_at >= ?')
+            params.append(uploaded_from)
+        if uploaded_to:
+            clauses.append('uploaded_at < ?')
+            params.append(uploaded_to)
+        if not include_duplicates:
+            clauses.append('duplicate_of IS NULL AND superseded_by IS NULL')
+        if cursor:
+            clauses.append('id < ?')
+            params.append(int(cursor))
+
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ''
+        rows = self._conn().execute(
+            f"SELECT {', '.join(SUMMARY_COLUMNS)} FROM extractions {where} ORDER BY id DESC LIMIT ?",
+            params + [limit + 1]
+        ).fetchall()
+
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = rows[-1]['id']
+        return [dict(row) for row in rows], next_cursor
+
+    def get(self, extraction_id):
+        """A single extraction with its anomalies and daily breakdown, or None"""
+        conn = self._conn()
+        row = conn.execute('SELECT * FROM extractions WHERE id = ?', (extraction_id,)).fetchone()
+        if row is None:
+            return None
+        record = dict(row)
+        record['anomalies'] = json.loads(record['anomalies'] or '[]')
+        record.pop('resource_key')
+        record['daily_breakdown'] = [
+            {'date': entry['entry_date'], 'start_time': entry['start_time'], 'end_time': entry['end_time'],
+             'hours': entry['hours'], 'notes': entry['notes']}
+            for entry in conn.execute('SELECT * FROM daily_entries WHERE extraction_id = ? ORDER BY rowid',
+                                      (extraction_id,))
+        ]
+        return record
+
+    def hours_by_resource_month(self, resource=None, month_from=None, month_to=None):
+        """
+        Hours per resource per calendar month, read from the maintained rollup
+
+        Dated entries count in their own month, so a timesheet spanning two months is
+        split; extractions without dated entries count under period_month. Confirmed
+        duplicate submissions are excluded.
+        """
+        clauses = []
+        params = []
+        if resource:
+            clauses.append('resource_key = ?')
+            params.append(resource_key(resource))
+        if month_from:
+            clauses.append('month >= ?')
+            params.append(month_from)
+        if month_to:
+            clauses.append('month <= ?')
+            params.append(month_to)
+
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ''
+        rows = self._conn().execute(
+            f'SELECT resource_name, month, ROUND(hours, 2) AS hours, entries, timesheets FROM monthly_hours '
+            f'{where} ORDER BY resource_key, month',
+            params
+        ).fetchall()
+        return [dict(row) for row in rows]
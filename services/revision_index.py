@@ -0,0 +1,468 @@
+import io
+import json
+import logging
+import re
+import sqlite3
+import threading
+import time
+from datetime import date
+from difflib import SequenceMatcher
+
+from services.sqlite_store import connect, transaction
+from services.table_serializer import DELIMITER, DITTO, DITTO_LEGEND, cell_kind
+
+try:
+    import pdfplumber
+except ImportError:  # PDFs are not diffed without pdfplumber
+    pdfplumber = None
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS revisions (
+        id INTEGER PRIMARY KEY,
+        file_hash TEXT NOT NULL UNIQUE,
+        file_name TEXT,
+        file_type TEXT NOT NULL,
+        resource_name TEXT,
+        rows TEXT NOT NULL,             -- JSON list of serialized rows (lists of cells, dittos resolved)
+        result TEXT NOT NULL,           -- extraction result (JSON)
+        created_at REAL NOT NULL
+    )
+    """,
+    # Calendar months each revision has dated rows in - the lookup key for later versions
+    """
+    CREATE TABLE IF NOT EXISTS revision_months (
+        revision_id INTEGER NOT NULL,
+        month TEXT NOT NULL
+    )
+    """,
+    'CREATE INDEX IF NOT EXISTS idx_revision_months ON revision_months (month, revision_id)',
+    'CREATE INDEX IF NOT EXISTS idx_revision_months_id ON revision_months (revision_id)',
+]
+
+_ISO_DATE_RE = re.compile(r'^(\d{4})-(\d{1,2})-(\d{1,2})(?:[ T]\d{1,2}:\d{2}(?::\d{2})?)?$')
+_NUMERIC_DATE_RE = re.compile(r'^(\d{1,2})[/.-](\d{1,2})[/.-](\d{2}|\d{4})$')
+_DURATION_RE = re.compile(r'^(\d{1,3}):(\d{2})$')
+_REVISED_RE = re.compile(r'\s*Revised: \d+ day\(s\) changed.*$')
+
+# Header cells naming the columns a purely numeric revision may touch
+_COLUMN_PATTERNS = {
+    'hours': re.compile(r'^((total|billable|worked)\s+)?(hours?|hrs?)\b|^(total|duration)$', re.IGNORECASE),
+    'start_time': re.compile(r'^(start|from|in|time in|clock in)\b', re.IGNORECASE),
+    'end_time': re.compile(r'^(end|finish|to|out|time out|clock out)\b', re.IGNORECASE),
+}
+
+
+def source_rows(text):
+    """
+    Split serialized document text into rows of cells
+
+    Table rows split on the serializer's delimiter (other lines on whitespace, as
+    in a PDF text layer) and ditto marks are replaced by the value above, so a
+    row compares equal whenever its content is unchanged.
+    """
+    rows = []
+    previous = []
+    for line in (text or '').splitlines():
+        line = line.strip()
+        if not line or line == DITTO_LEGEND:
+            continue
+        cells = [cell.strip() for cell in line.split(DELIMITER)] if DELIMITER in line else line.split()
+        cells = [previous[i] if cell == DITTO and i < len(previous) else cell for i, cell in enumerate(cells)]
+        rows.append(cells)
+        previous = cells
+    return rows
+
+
+def pdf_text_layer(file_bytes, max_pages=10):
+    """Text of a generated PDF's first pages, or None for scans and unreadable files"""
+    if pdfplumber is None:
+        return None
+    try:
+        with pdfplumber.open(io.BytesIO(file_bytes)) as pdf:
+            pages = pdf.pages[:max_pages]
+            if not pages or not pages[0].chars:
+                return None
+            return '\n'.join(page.extract_text() or '' for page in pages)
+    except Exception as e:
+        logger.warning(f'Reading the PDF text layer failed: {e}')
+        return None
+
+
+def _date_variants(cell):
+    """Dates a cell can denote - two for ambiguous day/month orders"""
+    match = _ISO_DATE_RE.match(cell)
+    if match:
+        parts = [(int(match.group(1)), int(match.group(2)), int(match.group(3)))]
+    else:
+        match = _NUMERIC_DATE_RE.match(cell)
+        if not match:
+            return []
+        first, second, year = int(match.group(1)), int(match.group(2)), int(match.group(3))
+        year += 2000 if year < 100 else 0
+        parts = [(year, second, first), (year, first, second)]  # day-first, then month-first
+    variants = []
+    for year, month, day in parts:
+        try:
+            variants.append(date(year, month, day).isoformat())
+        except ValueError:
+            continue
+    return variants
+
+
+def row_date(cells, known_dates=()):
+    """ISO date of a row's first date cell, disambiguated by dates already extracted; None if undated"""
+    for cell in cells:
+        variants = _date_variants(cell)
+        if variants:
+            for variant in variants:
+                if variant in known_dates:
+                    return variant
+            return variants[0]
+    return None
+
+
+def row_months(rows):
+    """Months the rows' dates fall in, counting both readings of ambiguous dates"""
+    months = set()
+    for cells in rows:
+        for cell in cells:
+            variants = _date_variants(cell)
+            if variants:
+                months.update(variant[:7] for variant in variants)
+                break
+    return sorted(months)
+
+
+def _normalize_text(text):
+    return ' '.join((text or '').lower().split())
+
+
+def _row_key(cells):
+    return DELIMITER.join(cells)
+
+
+def _parse_hours(cell):
+    """Hours from a numeric cell or an h:mm duration; None if the cell is neither"""
+    if not cell:
+        return 0.0
+    match = _DURATION_RE.match(cell)
+    if match:
+        return int(match.group(1)) + int(match.group(2)) / 60
+    try:
+        return float(cell)
+    except ValueError:
+        return None
+
+
+def _numeric_change(old, new):
+    """Indexes of the differing cells of two equally wide rows, or None if any is not a number or time"""
+    if len(old) != len(new):
+        return None
+    changed = [i for i, (a, b) in enumerate(zip(old, new)) if a != b]
+    if all(cell_kind(cell) in ('num', 'date', 'empty') for i in changed for cell in (old[i], new[i])):
+        return changed
+    return None
+
+
+def find_columns(rows):
+    """Column index of hours, start_time and end_time from the header row, if there is one"""
+    for cells in rows:
+        if row_date(cells) is not None:
+            break
+        columns = {}
+        for index, cell in enumerate(cells):
+            for field, pattern in _COLUMN_PATTERNS.items():
+                if field not in columns and pattern.search(cell) and cell_kind(cell) == 'text':
+                    columns[field] = index
+                    break
+        if 'hours' in columns:
+            return columns
+    return {}
+
+
+class RevisionDiff:
+    """Row-level difference between two serialized versions of a timesheet"""
+
+    def __init__(self, previous_rows, rows, known_dates=()):
+        self.rows = rows
+        self.numeric = []           # (date, previous cells, cells, changed indexes) of re-valued dated rows
+        self.removed = []           # (date, cells) only in the previous version
+        self.added = []             # (date, cells) only in the new version
+        self.metadata_changed = False  # an undated row (resource, period, approval...) changed
+        self.known_dates = known_dates = set(known_dates)
+
+        matcher = SequenceMatcher(None, [_row_key(r) for r in previous_rows], [_row_key(r) for r in rows],
+                                  autojunk=False)
+        self.similarity = matcher.ratio()
+        for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+            if tag == 'equal':
+                continue
+            old_block, new_block = previous_rows[i1:i2], rows[j1:j2]
+            if tag == 'replace' and len(old_block) == len(new_block):
+                for old, new in zip(old_block, new_block):
+                    self._pair(old, new, known_dates)
+                continue
+            for old in old_block:
+                self._side(self.removed, old, known_dates)
+            for new in new_block:
+                self._side(self.added, new, known_dates)
+
+    def _pair(self, old, new, known_dates):
+        old_date, new_date = row_date(old, known_dates), row_date(new, known_dates)
+        changed = _numeric_change(old, new)
+        if old_date is None and new_date is None and changed is not None:
+            return  # a totals row - recomputed from the days
+        if old_date is not None and old_date == new_date and changed is not None:
+            self.numeric.append((new_date, old, new, changed))
+            return
+        self._side(self.removed, old, known_dates)
+        self._side(self.added, new, known_dates)
+
+    def _side(self, target, cells, known_dates):
+        day = row_date(cells, known_dates)
+        if day is None:
+            self.metadata_changed = True
+        else:
+            target.append((day, cells))
+
+    @property
+    def unchanged(self):
+        return not (self.numeric or self.removed or self.added or self.metadata_changed)
+
+    def redo_days(self):
+        """Days whose entries must be extracted again"""
+        return {day for day, _ in self.removed} | {day for day, _ in self.added}
+
+    def redo_rows(self):
+        """Every new-version row of the redo days - a day's other rows are replaced along with it"""
+        days = self.redo_days()
+        return [cells for cells in self.rows if row_date(cells, self.known_dates) in days]
+
+    def apply_numeric_locally(self, daily_breakdown):
+        """
+        Re-value the breakdown for numeric row changes that map onto a single entry
+
+        Changes that cannot be applied (no header, other columns touched, several rows or
+        entries for the day) are moved to removed/added so the caller re-extracts them.
+
+        Returns:
+            dict: date -> updated fields
+        """
+        columns = find_columns(self.rows)
+        by_column = {index: field for field, index in columns.items()}
+        entries_per_day = {}
+        for entry in daily_breakdown:
+            entries_per_day[entry.get('date')] = entries_per_day.get(entry.get('date'), 0) + 1
+        rows_per_day = {}
+        for cells in self.rows:
+            day = row_date(cells, entries_per_day)
+            rows_per_day[day] = rows_per_day.get(day, 0) + 1
+
+        updates = {}
+        for day, old, new, changed in self.numeric:
+            fields = {by_column.get(index) for index in changed}
+            update = {}
+            if None not in fields and entries_per_day.get(day) == 1 and rows_per_day.get(day) == 1:
+                for index in changed:
+                    field = by_column[index]
+                    update[field] = _parse_hours(new[index]) if field == 'hours' else (new[index] or None)
+            if update and update.get('hours', 0) is not None:
+                updates[day] = update
+            else:
+                self.removed.append((day, old))
+                self.added.append((day, new))
+        self.numeric = []
+        return updates
+
+
+def revised_rows_text(diff, previous_result):
+    """Prompt text with just the rows to re-extract, under the table header for context"""
+    lines = []
+    if previous_result.get('resource_name'):
+        lines.append(f"Resource: {previous_result['resource_name']}")
+    if previous_result.get('period'):
+        lines.append(f"Period: {previous_result['period']}")
+    for cells in diff.rows:
+        if row_date(cells) is not None:
+            break
+        if find_columns([cells]):
+            lines.append(DELIMITER.join(cells))
+    lines.extend(DELIMITER.join(cells) for cells in diff.redo_rows())
+    return '\n'.join(lines)
+
+
+def merge_revision(previous_result, diff, updates, partial_result=None):
+    """
+    Previous extraction with the changed days replaced
+
+    Args:
+        previous_result: extraction of the earlier version
+        diff: RevisionDiff after apply_numeric_locally
+        updates: date -> fields re-valued locally
+        partial_result: extraction of revised_rows_text(), when there are rows to re-extract
+
+    Returns:
+        dict: merged result with changed_days, or None if the partial extraction
+        is missing a revised day (the caller should extract the whole document)
+    """
+    previous_days = previous_result.get('daily_breakdown') or []
+    redo = diff.redo_days()
+    replacements = [entry for entry in (partial_result or {}).get('daily_breakdown', [])
+                    if entry.get('date') in redo]
+    expected = {row_date(cells, diff.known_dates) for cells in diff.redo_rows()}
+    if expected - {entry['date'] for entry in replacements}:
+        return None
+
+    daily_breakdown = []
+    for entry in previous_days:
+        if entry.get('date') in redo:
+            continue
+        daily_breakdown.append(dict(entry, **updates.get(entry.get('date'), {})))
+    daily_breakdown.extend(replacements)
+    if all(_ISO_DATE_RE.match(entry.get('date') or '') for entry in daily_breakdown):
+        daily_breakdown.sort(key=lambda entry: entry['date'])
+
+    def hours_by_day(entries):
+        totals = {}
+        for entry in entries:
+            totals[entry.get('date')] = totals.get(entry.get('date'), 0) + (entry.get('hours') or 0)
+        return totals
+
+    before, after = hours_by_day(previous_days), hours_by_day(daily_breakdown)
+    changed_days = []
+    for day in sorted(redo | set(updates)):
+        change = 'added' if day not in before else 'removed' if day not in after else 'modified'
+        changed_days.append({'date': day, 'change': change,
+                             'previous_hours': before.get(day), 'hours': after.get(day)})
+
+    # Keep any difference between the stated total and the sum of the days (e.g. a rounding rule)
+    previous_sum = sum(before.values())
+    extracted_hours = previous_result['extracted_hours'] + sum(after.values()) - previous_sum
+
+    result = {key: value for key, value in previous_result.items()
+              if key not in ('model', 'escalated_from', 'escalation_reason', 'sheets')}
+    result.update({
+        'extracted_hours': round(extracted_hours, 2),
+        'daily_breakdown': daily_breakdown,
+        'changed_days': changed_days,
+        'model': (partial_result or {}).get('model')
+    })
+    if partial_result is not None:
+        result['confidence_score'] = min(previous_result['confidence_score'], partial_result['confidence_score'])
+        result['anomalies'] = list(dict.fromkeys(list(previous_result.get('anomalies') or []) +
+                                                 list(partial_result.get('anomalies') or [])))
+    if changed_days:
+        summary = _REVISED_RE.sub('', previous_result.get('summary') or '')
+        result['summary'] = (f"{summary} Revised: {len(changed_days)} day(s) changed, "
+                             f"{result['extracted_hours']:g} hours in total.").strip()
+    return result
+
+
+class RevisionIndex:
+    """
+    SQLite index of the serialized rows behind earlier text-based extractions
+
+    A resubmitted timesheet is matched to the latest stored version that has rows in
+    the same months, names the same resource and shares at least min_similarity of
+    its rows, so only the rows that changed need extracting again.
+    """
+
+    def __init__(self, db_path, min_similarity=0.8, max_candidates=20):
+        self.db_path = db_path
+        self.min_similarity = min_similarity
+        self.max_candidates = max_candidates
+        self._local = threading.local()
+        self._schema_ready = False
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = connect(self.db_path)
+            if not self._schema_ready:
+                with transaction(conn):
+                    for statement in SCHEMA:
+                        conn.execute(statement)
+                self._schema_ready = True
+            self._local.conn = conn
+        return conn
+
+    def find(self, rows, file_type, file_hash=None):
+        """
+        Most similar earlier version of the same timesheet (never the upload's own file_hash)
+
+        Returns:
+            dict with file_hash, file_name, created_at, similarity, rows and result, or None
+        """
+        months = row_months(rows)
+        if not months:
+            return None
+        candidates = self._conn().execute(
+            'SELECT * FROM revisions WHERE file_type = ? AND id IN (SELECT revision_id FROM revision_months '
+            f'WHERE month IN ({",".join("?" * len(months))})) ORDER BY id DESC LIMIT ?',
+            [file_type] + months + [self.max_candidates]
+        ).fetchall()
+
+        text = _normalize_text(' '.join(' '.join(cells) for cells in rows))
+        keys = [_row_key(cells) for cells in rows]
+        best = None
+        for row in candidates:
+            if row['file_hash'] == file_hash:
+                continue
+            if row['resource_name'] and _normalize_text(row['resource_name']) not in text:
+                continue
+            stored = json.loads(row['rows'])
+            similarity = SequenceMatcher(None, [_row_key(cells) for cells in stored], keys,
+                                         autojunk=False).ratio()
+            if similarity >= self.min_similarity and (best is None or similarity > best['similarity']):
+                best = {
+                    'file_hash': row['file_hash'],
+                    'file_name': row['file_name'],
+                    'created_at': row['created_at'],
+                    'similarity': similarity,
+                    'rows': stored,
+                    'result': json.loads(row['result'])
+                }
+        return best
+
+    def add(self, file_hash, file_name, file_type, rows, result, supersedes=None):
+        """
+        Record a successfully extracted version
+
+        It replaces an earlier upload of the same bytes and the version it revises
+        (supersedes), so later revisions are matched against the newest version only.
+        """
+        months = row_months(rows)
+        if not months:
+            return
+        conn = self._conn()
+        with transaction(conn):
+            for previous in conn.execute('SELECT id FROM revisions WHERE file_hash IN (?, ?)',
+                                         (file_hash, supersedes)).fetchall():
+                conn.execute('DELETE FROM revision_months WHERE revision_id = ?', (previous['id'],))
+                conn.execute('DELETE FROM revisions WHERE id = ?', (previous['id'],))
+            cursor = conn.execute(
+                'INSERT INTO revisions (file_hash, file_name, file_type, resource_name, rows, result, created_at) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                (file_hash, file_name, file_type, result.get('resource_name'), json.dumps(rows),
+                 json.dumps(result), time.time())
+            )
+            conn.executemany('INSERT INTO revision_months (revision_id, month) VALUES (?, ?)',
+                             [(cursor.lastrowid, month) for month in months])
+
+    def safe_find(self, rows, file_type, file_hash=None):
+        """find() that logs and returns None if the index is unavailable"""
+        try:
+            return self.find(rows, file_type, file_hash)
+        except sqlite3.Error as e:
+            logger.warning(f'Revision lookup failed: {e}')
+            return None
+
+    def safe_add(self, file_hash, file_name, file_type, rows, result, supersedes=None):
+        """add() that logs instead of failing the request"""
+        try:
+            self.add(file_hash, file_name, file_type, rows, result, supersedes)
+        except sqlite3.Error as e:
+            logger.warning(f'Revision index update failed: {e}')
@@ -0,0 +1,270 @@
+import hashlib
+import logging
+import os
+import random
+import threading
+import time
+import uuid
+
+from services.metrics import metrics
+from services.sqlite_store import connect, transaction
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS uploads (
+        s3_key TEXT PRIMARY KEY,
+        file_hash TEXT NOT NULL,
+        file_name TEXT,
+        content_type TEXT,
+        size INTEGER NOT NULL,
+        spool_path TEXT NOT NULL,
+        state TEXT NOT NULL,             -- pending | uploading | uploaded | failed
+        attempts INTEGER NOT NULL DEFAULT 0,
+        next_attempt_at REAL NOT NULL,
+        last_error TEXT,
+        lease_owner TEXT,
+        lease_expires REAL,
+        created_at REAL NOT NULL,
+        uploaded_at REAL
+    )
+    """,
+    'CREATE INDEX IF NOT EXISTS idx_uploads_due ON uploads (state, next_attempt_at)',
+    'CREATE INDEX IF NOT EXISTS idx_uploads_file_hash ON uploads (file_hash)',
+]
+
+STATUS_FIELDS = ('s3_key', 'file_hash', 'file_name', 'size', 'state', 'attempts', 'last_error',
+                 'created_at', 'uploaded_at')
+
+
+class S3Outbox:
+    """
+    Durable local queue of S3 uploads
+
+    enqueue() writes the bytes to a spool directory and records them in a SQLite ledger
+    before returning, so the request never waits on S3. Background threads claim due
+    uploads in batches under a lease (shared by every gunicorn worker on the host), upload
+    them, and retry failures with exponential backoff and jitter. After max_attempts an
+    upload is marked failed and its spool file is kept for retry().
+    """
+
+    def __init__(self, db_path, spool_dir, client, bucket, workers=2, batch_size=8, max_attempts=10,
+                 base_backoff=2.0, max_backoff=600.0, lease_seconds=300, poll_interval=1.0,
+                 retention_seconds=7 * 86400):
+        self.db_path = db_path
+        self.spool_dir = spool_dir
+        self.client = client
+        self.bucket = bucket
+        self.workers = workers
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.lease_seconds = lease_seconds
+        self.poll_interval = poll_interval
+        self.retention_seconds = retention_seconds
+        self._local = threading.local()
+        self._schema_ready = False
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._threads = []
+        self._pid = None
+        self._start_lock = threading.Lock()
+        os.makedirs(spool_dir, exist_ok=True)
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = connect(self.db_path)
+            if not self._schema_ready:
+                with transaction(conn):
+                    for statement in SCHEMA:
+                        conn.execute(statement)
+                self._schema_ready = True
+            self._local.conn = conn
+        return conn
+
+    def start(self):
+        """Start the upload threads in this process (again after a fork)"""
+        with self._start_lock:
+            if self._pid == os.getpid() and all(thread.is_alive() for thread in self._threads):
+                return
+            self._pid = os.getpid()
+            self._stop.clear()
+            self._threads = [threading.Thread(target=self._run, name=f's3-outbox-{n}', daemon=True)
+                             for n in range(self.workers)]
+            for thread in self._threads:
+                thread.start()
+
+    def stop(self, timeout=5):
+        self._stop.set()
+        self._wake.set()
+        for thread in self._threads:
+            thread.join(timeout)
+
+    def _spool_path(self, s3_key):
+        return os.path.join(self.spool_dir, hashlib.sha256(s3_key.encode()).hexdigest())
+
+    def enqueue(self, file_bytes, s3_key, file_hash, file_name=None, content_type=None):
+        """
+        Durably accept bytes for upload to s3_key
+
+        Returns:
+            dict: ledger status (state 'pending', or 'uploaded' if the key is already in S3)
+        """
+        self.start()
+        conn = self._conn()
+        existing = conn.execute('SELECT * FROM uploads WHERE s3_key = ?', (s3_key,)).fetchone()
+        if existing is not None and existing['state'] != 'failed':
+            return self._status(existing)
+
+        spool_path = self._spool_path(s3_key)
+        temp_path = f'{spool_path}.{uuid.uuid4().hex}.part'
+        with open(temp_path, 'wb') as f:
+            f.write(file_bytes)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, spool_path)
+
+        now = time.time()
+        with transaction(conn):
+            # A failed upload of the same key is re-queued with a fresh attempt budget
+            conn.execute(
+                'INSERT INTO uploads (s3_key, file_hash, file_name, content_type, size, spool_path, state, '
+                'attempts, next_attempt_at, created_at) VALUES (?, ?, ?, ?, ?, ?, \'pending\', 0, ?, ?) '
+                'ON CONFLICT (s3_key) DO UPDATE SET state = \'pending\', attempts = 0, '
+                'next_attempt_at = excluded.next_attempt_at, last_error = NULL '
+                'WHERE uploads.state = \'failed\'',
+                (s3_key, file_hash, file_name, content_type, len(file_bytes), spool_path, now, now)
+            )
+        self._wake.set()
+        return self.status(s3_key)
+
+    def status(self, s3_key):
+        row = self._conn().execute('SELECT * FROM uploads WHERE s3_key = ?', (s3_key,)).fetchone()
+        return self._status(row) if row is not None else None
+
+    def status_by_file_hash(self, file_hash):
+        rows = self._conn().execute('SELECT * FROM uploads WHERE file_hash = ? ORDER BY created_at',
+                                    (file_hash,)).fetchall()
+        return [self._status(row) for row in rows]
+
+    def _status(self, row):
+        status = {field: row[field] for field in STATUS_FIELDS}
+        if row['state'] == 'pending' and row['attempts']:
+            status['next_attempt_at'] = row['next_attempt_at']
+        return status
+
+    def stats(self):
+        """Ledger counts by state and the age of the oldest upload still waiting"""
+        conn = self._conn()
+        counts = dict(conn.execute('SELECT state, COUNT(*) FROM uploads GROUP BY state').fetchall())
+        oldest = conn.execute("SELECT MIN(created_at) FROM uploads WHERE state IN ('pending', 'uploading')"
+                              ).fetchone()[0]
+        return {
+            'pending': counts.get('pending', 0) + counts.get('uploading', 0),
+            'failed': counts.get('failed', 0),
+            'uploaded': counts.get('uploaded', 0),
+            'oldest_pending_seconds': round(time.time() - oldest, 1) if oldest else None
+        }
+
+    def retry(self, s3_key):
+        """Re-queue a failed upload; returns False if the key is not failed"""
+        conn = self._conn()
+        with transaction(conn):
+            cursor = conn.execute("UPDATE uploads SET state = 'pending', attempts = 0, next_attempt_at = ?, "
+                                  "last_error = NULL WHERE s3_key = ? AND state = 'failed'", (time.time(), s3_key))
+        self._wake.set()
+        return cursor.rowcount > 0
+
+    def _claim(self, owner):
+        """Lease up to batch_size due uploads (including ones whose worker died mid-upload)"""
+        now = time.time()
+        conn = self._conn()
+        with transaction(conn):
+            rows = conn.execute(
+                "SELECT * FROM uploads WHERE (state = 'pending' AND next_attempt_at <= ?) "
+                "OR (state = 'uploading' AND lease_expires < ?) ORDER BY next_attempt_at LIMIT ?",
+                (now, now, self.batch_size)
+            ).fetchall()
+            conn.executemany(
+                "UPDATE uploads SET state = 'uploading', lease_owner = ?, lease_expires = ? WHERE s3_key = ?",
+                [(owner, now + self.lease_seconds, row['s3_key']) for row in rows]
+            )
+        return rows
+
+    def _backoff(self, attempts):
+        # Full jitter keeps workers from retrying a recovering S3 in lockstep
+        return random.uniform(0.5, 1.0) * min(self.max_backoff, self.base_backoff * 2 ** (attempts - 1))
+
+    def _upload(self, row):
+        extra = {'ContentType': row['content_type']} if row['content_type'] else {}
+        start = time.perf_counter()
+        # upload_file switches to parallel multipart uploads for large files
+        self.client.upload_file(row['spool_path'], self.bucket, row['s3_key'], ExtraArgs=extra)
+        metrics.observe('timesheet_s3_outbox_upload_seconds', time.perf_counter() - start)
+
+    def process_batch(self, owner=None):
+        """Upload one batch of due files; returns how many were claimed"""
+        owner = owner or uuid.uuid4().hex
+        rows = self._claim(owner)
+        results = []
+        for row in rows:
+            try:
+                self._upload(row)
+                results.append((row, None))
+            except Exception as e:
+                results.append((row, e))
+
+        now = time.time()
+        conn = self._conn()
+        with transaction(conn):
+            for row, error in results:
+                if error is None:
+                    conn.execute("UPDATE uploads SET state = 'uploaded', uploaded_at = ?, attempts = attempts + 1, "
+                                 "last_error = NULL, lease_owner = NULL WHERE s3_key = ? AND lease_owner = ?",
+                                 (now, row['s3_key'], owner))
+                    metrics.observe('timesheet_s3_outbox_delay_seconds', now - row['created_at'])
+                    continue
+                attempts = row['attempts'] + 1
+                # A missing spool file can never succeed, so don't keep retrying it
+                final = attempts >= self.max_attempts or isinstance(error, FileNotFoundError)
+                conn.execute("UPDATE uploads SET state = ?, attempts = ?, next_attempt_at = ?, last_error = ?, "
+                             "lease_owner = NULL WHERE s3_key = ? AND lease_owner = ?",
+                             ('failed' if final else 'pending', attempts, now + self._backoff(attempts),
+                              str(error)[:500], row['s3_key'], owner))
+                metrics.inc('timesheet_s3_outbox_errors_total', labels={'final': str(final).lower()})
+                log = logger.error if final else logger.warning
+                log(f'S3 upload failed (attempt {attempts}): {error}', extra={'s3_key': row['s3_key']})
+
+        for row, error in results:
+            if error is None:
+                metrics.inc('timesheet_s3_outbox_uploaded_total')
+                try:
+                    os.unlink(row['spool_path'])
+                except OSError:
+                    pass
+        return len(rows)
+
+    def _prune(self):
+        """Forget uploads that finished more than retention_seconds ago"""
+        conn = self._conn()
+        with transaction(conn):
+            conn.execute("DELETE FROM uploads WHERE state = 'uploaded' AND uploaded_at < ?",
+                         (time.time() - self.retention_seconds,))
+
+    def _run(self):
+        owner = f'{os.getpid()}-{threading.get_ident()}'
+        last_prune = 0.0
+        while not self._stop.is_set():
+            try:
+                if self.process_batch(owner):
+                    continue  # more may be due - drain before sleeping
+                if time.time() - last_prune > 3600:
+                    self._prune()
+                    last_prune = time.time()
+            except Exception as e:
+                logger.warning(f'S3 outbox worker error: {e}')
+            self._wake.wait(self.poll_interval)
+            self._wake.clear()
@@ -0,0 +1,36 @@
+import os
+import sqlite3
+from contextlib import contextmanager
+
+# Seconds a writer waits for another process's lock before raising "database is locked"
+BUSY_TIMEOUT = 10
+
+
+def connect(path, busy_timeout=BUSY_TIMEOUT):
+    """
+    Open a SQLite database shared between gunicorn workers
+
+    WAL mode lets readers proceed while one worker writes; the connection runs in
+    autocommit mode so callers control transactions with transaction().
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    conn = sqlite3.connect(path, timeout=busy_timeout, isolation_level=None, check_same_thread=False)
+    conn.row_factory = sqlite3.Row
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('PRAGMA synchronous=NORMAL')
+    conn.execute(f'PRAGMA busy_timeout={int(busy_timeout * 1000)}')
+    return conn
+
+
+@contextmanager
+def transaction(conn):
+    """BEGIN IMMEDIATE ... COMMIT, taking the write lock up front so read-then-write is atomic"""
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        yield conn
+    except BaseException:
+        conn.execute('ROLLBACK')
+        raise
+    else:
+        conn.execute('COMMIT')
@@ -0,0 +1,143 @@
+import re
+from datetime import date, datetime, time, timedelta
+
+DELIMITER = '|'
+DITTO = '"'
+DITTO_LEGEND = f'({DITTO} = same as row above)'
+
+# Rows scanned when looking for the header row
+HEADER_SCAN_ROWS = 12
+
+_NUMBER_RE = re.compile(r'^[-+]?(\d+(\.\d*)?|\.\d+)$')
+_DATE_RE = re.compile(r'^(\d{4}-\d{1,2}-\d{1,2}|\d{1,2}[/.-]\d{1,2}[/.-]\d{2,4})([ T]\d{1,2}:\d{2}(:\d{2})?)?$')
+_TIME_RE = re.compile(r'^\d{1,2}:\d{2}(:\d{2})?(\s?[AaPp][Mm])?$')
+
+
+def normalize_value(value):
+    """Render a cell value in its shortest unambiguous text form"""
+    if value is None:
+        return ''
+    if isinstance(value, bool):
+        return 'TRUE' if value else 'FALSE'
+    if isinstance(value, datetime):
+        if value.time() == time():
+            return value.date().isoformat()
+        return value.strftime('%Y-%m-%d %H:%M')
+    if isinstance(value, date):
+        return value.isoformat()
+    if isinstance(value, time):
+        return value.strftime('%H:%M') if not value.second else value.strftime('%H:%M:%S')
+    if isinstance(value, timedelta):
+        # Excel [h]:mm durations
+        minutes = round(value.total_seconds() / 60)
+        return f'{minutes // 60}:{minutes % 60:02d}'
+    if isinstance(value, float):
+        if value.is_integer():
+            return str(int(value))
+        return f'{value:.4f}'.rstrip('0').rstrip('.')
+    text = ' '.join(str(value).split())
+    return text.replace(DELIMITER, '/')
+
+
+def cell_kind(value, text=None):
+    """Classify a cell as empty, num, date or text"""
+    if text is None:
+        text = normalize_value(value)
+    if not text:
+        return 'empty'
+    if isinstance(value, bool):
+        return 'text'
+    if isinstance(value, (int, float)):
+        return 'num'
+    if isinstance(value, (datetime, date, time, timedelta)):
+        return 'date'
+    if _NUMBER_RE.match(text):
+        return 'num'
+    if _DATE_RE.match(text) or _TIME_RE.match(text):
+        return 'date'
+    return 'text'
+
+
+def _find_header(kinds):
+    """Index of the widest all-label row that is followed by a row with numbers"""
+    best, best_width = None, 1
+    for index, row_kinds in enumerate(kinds[:HEADER_SCAN_ROWS]):
+        width = sum(1 for k in row_kinds if k != 'empty')
+        if width <= best_width or 'num' in row_kinds or 'text' not in row_kinds:
+            continue
+        following = kinds[index + 1:index + 4]
+        if any('num' in later or 'date' in later for later in following):
+            best, best_width = index, width
+    return best
+
+
+def serialize_table(rows, delimiter=DELIMITER):
+    """
+    Serialize a grid of cell values into a dense delimited table
+
+    Drops empty rows and columns, normalizes dates/times/numbers, detects the
+    header row (rows above it are rendered as 'label: value' lines), and
+    replaces repeated text in data columns with a ditto mark.
+
+    Args:
+        rows: Iterable of row sequences (raw cell values or strings)
+        delimiter: Column delimiter
+
+    Returns:
+        str: Serialized table, or '' if the grid is empty
+    """
+    raw_rows = []
+    for row in rows:
+        texts = [normalize_value(value) for value in row]
+        if any(texts):
+            raw_rows.append((row, texts))
+    if not raw_rows:
+        return ''
+
+    kinds = [[cell_kind(value, text) for value, text in zip(row, texts)] for row, texts in raw_rows]
+    texts = [row_texts for _, row_texts in raw_rows]
+    header_index = _find_header(kinds)
+
+    lines = []
+    table_start = 0
+    if header_index is not None:
+        # Key/value preamble such as "Consultant | Jane Doe" above the table
+        for row_texts in texts[:header_index]:
+            cells = [t for t in row_texts if t]
+            lines.append(': '.join(cells) if len(cells) == 2 else delimiter.join(cells))
+        table_start = header_index
+
+    table = texts[table_start:]
+    table_kinds = kinds[table_start:]
+    width = max(len(row) for row in table)
+    keep = [col for col in range(width) if any(col < len(row) and row[col] for row in table)]
+
+    # Ditto only text columns, never numbers or dates that the model must read exactly
+    data_start = 1 if header_index is not None else 0
+    text_columns = set()
+    for col in keep:
+        column_kinds = [row[col] for row in table_kinds[data_start:] if col < len(row) and row[col] != 'empty']
+        if column_kinds and column_kinds.count('text') * 2 > len(column_kinds):
+            text_columns.add(col)
+
+    used_ditto = False
+    previous = {}
+    for offset, row in enumerate(table):
+        cells = []
+        for col in keep:
+            value = row[col] if col < len(row) else ''
+            if offset >= data_start and col in text_columns:
+                if value and len(value) > 3 and previous.get(col) == value:
+                    cells.append(DITTO)
+                    used_ditto = True
+                    continue
+                previous[col] = value
+            cells.append(value)
+        while cells and not cells[-1]:
+            cells.pop()
+        lines.append(delimiter.join(cells))
+
+    if used_ditto:
+        lines.append(DITTO_LEGEND)
+    return '\n'.join(lines)
+
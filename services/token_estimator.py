@@ -0,0 +1,76 @@
+import re
+import struct
+
+# Fixed instructions, the record_timesheet tool schema and the API's tool-use system prompt
+# wrapped around every extraction request (see ClaudeService prompts)
+PROMPT_OVERHEAD_TOKENS = 950
+
+# Anthropic vision sizing: images are downscaled to a 1568px long edge, ~750 px^2 per token
+IMAGE_MAX_EDGE = 1568
+IMAGE_PIXELS_PER_TOKEN = 750
+# PDF pages are sent as page image plus extracted text
+PDF_TOKENS_PER_PAGE = 2000
+
+_TOKEN_RE = re.compile(r'[A-Za-z]{1,6}|\d{1,3}|[\t\n]|[^\sA-Za-z\d]')
+_PDF_PAGE_RE = re.compile(rb'/Type\s*/Page(?!s)')
+
+
+def estimate_text_tokens(text):
+    """Rough token count: words split every ~6 letters, numbers every 3 digits, 1 per symbol or line/tab break"""
+    return len(_TOKEN_RE.findall(text or ''))
+
+
+def image_dimensions(file_bytes):
+    """(width, height) of a PNG or JPEG from its header, or None"""
+    if file_bytes[:8] == b'\x89PNG\r\n\x1a\n' and len(file_bytes) >= 24:
+        return struct.unpack('>II', file_bytes[16:24])
+    if file_bytes[:2] == b'\xff\xd8':
+        offset = 2
+        while offset + 9 < len(file_bytes):
+            if file_bytes[offset] != 0xFF:
+                offset += 1
+                continue
+            marker = file_bytes[offset + 1]
+            length = struct.unpack('>H', file_bytes[offset + 2:offset + 4])[0]
+            # SOF0-SOF15 except DHT (C4), JPG (C8) and DAC (CC)
+            if 0xC0 <= marker <= 0xCF and marker not in (0xC4, 0xC8, 0xCC):
+                height, width = struct.unpack('>HH', file_bytes[offset + 5:offset + 9])
+                return width, height
+            offset += 2 + length
+    return None
+
+
+def estimate_image_tokens(file_bytes):
+    dimensions = image_dimensions(file_bytes)
+    if not dimensions:
+        return IMAGE_MAX_EDGE * IMAGE_MAX_EDGE // IMAGE_PIXELS_PER_TOKEN
+    width, height = dimensions
+    scale = min(1.0, IMAGE_MAX_EDGE / max(width, height, 1))
+    return int(width * scale * height * scale / IMAGE_PIXELS_PER_TOKEN)
+
+
+def estimate_pdf_pages(file_bytes):
+    return max(1, len(_PDF_PAGE_RE.findall(file_bytes)))
+
+
+def estimate_request_tokens(file_type, text=None, file_bytes=None):
+    """
+    Pre-flight estimate of input tokens for one extraction request
+
+    Args:
+        file_type: File extension (pdf, png, jpg, jpeg, docx, xlsx)
+        text: Serialized text for DOCX/XLSX inputs
+        file_bytes: Raw bytes for PDF/image inputs
+
+    Returns:
+        int: Estimated input tokens including the prompt instructions
+    """
+    if text is not None:
+        content = estimate_text_tokens(text)
+    elif file_type == 'pdf':
+        content = estimate_pdf_pages(file_bytes or b'') * PDF_TOKENS_PER_PAGE
+    elif file_type in ('png', 'jpg', 'jpeg'):
+        content = estimate_image_tokens(file_bytes or b'')
+    else:
+        content = 0
+    return PROMPT_OVERHEAD_TOKENS + content
@@ -0,0 +1,206 @@
+import copy
+import re
+from concurrent.futures import ThreadPoolExecutor
+
+import openpyxl
+
+from services.metrics import RequestTimer
+from services.table_serializer import cell_kind, serialize_table
+
+# Sheet names that never hold the timesheet itself
+SUMMARY_NAME_RE = re.compile(r'summary|total|overview|dashboard|invoice', re.IGNORECASE)
+LOOKUP_NAME_RE = re.compile(r'lookup|list|config|setting|instruction|readme|code|rate|holiday|reference|validation|master',
+                            re.IGNORECASE)
+
+# A sheet needs at least this many rows carrying both a date and a number to count as a timesheet
+MIN_DATED_ROWS = 3
+
+
+class Sheet:
+    """One serialized worksheet and its classification"""
+
+    def __init__(self, name, text, kind, dated_rows):
+        self.name = name
+        self.text = text
+        self.kind = kind
+        self.dated_rows = dated_rows
+
+
+def classify_sheet(name, rows):
+    """
+    Classify a worksheet from its name and contents
+
+    Returns:
+        tuple: (kind, dated_rows) where kind is 'timesheet', 'summary', 'lookup' or 'empty'
+    """
+    dated_rows = 0
+    non_empty = 0
+    for row in rows:
+        kinds = {cell_kind(value) for value in row}
+        kinds.discard('empty')
+        if kinds:
+            non_empty += 1
+        if 'date' in kinds and 'num' in kinds:
+            dated_rows += 1
+
+    if not non_empty:
+        return 'empty', 0
+    if SUMMARY_NAME_RE.search(name):
+        return 'summary', dated_rows
+    if LOOKUP_NAME_RE.search(name):
+        return 'lookup', dated_rows
+    if dated_rows >= MIN_DATED_ROWS:
+        return 'timesheet', dated_rows
+    return 'summary' if dated_rows else 'lookup', dated_rows
+
+
+def read_workbook_sheets(file_path):
+    """Serialize and classify every worksheet in a workbook, in workbook order"""
+    workbook = openpyxl.load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        sheets = []
+        for worksheet in workbook.worksheets:
+            rows = list(worksheet.iter_rows(values_only=True))
+            kind, dated_rows = classify_sheet(worksheet.title, rows)
+            if kind == 'empty':
+                continue
+            sheets.append(Sheet(worksheet.title, serialize_table(rows), kind, dated_rows))
+        return sheets
+    finally:
+        workbook.close()
+
+
+def should_split(sheets):
+    """Split only when more than one sheet actually holds time entries"""
+    return sum(1 for sheet in sheets if sheet.kind == 'timesheet') > 1
+
+
+def sheets_to_text(sheets):
+    """Join serialized sheets into the single-prompt text form"""
+    return "\n\n".join(f"Sheet: {sheet.name}\n{sheet.text}" for sheet in sheets if sheet.text)
+
+
+class WorkbookService:
+    """Extracts multi-sheet workbooks as one concurrent Claude call per timesheet sheet"""
+
+    def __init__(self, claude_service, max_workers=8, max_sheets=24):
+        self.claude_service = claude_service
+        self.max_workers = max_workers
+        self.max_sheets = max_sheets
+
+    def extract(self, sheets, context=''):
+        """
+        Extract each timesheet sheet concurrently and merge the results
+
+        Args:
+            sheets: Sheets from read_workbook_sheets
+            context: Optional text prepended to every per-sheet prompt
+
+        Returns:
+            dict: Merged extraction in the usual response shape plus a 'sheets' list
+        """
+        timesheets = [sheet for sheet in sheets if sheet.kind == 'timesheet']
+        timesheets, over_limit = timesheets[:self.max_sheets], timesheets[self.max_sheets:]
+        skipped = [sheet for sheet in sheets if sheet.kind != 'timesheet']
+
+        def extract_sheet(sheet):
+            # The calls overlap, so each gets its own timer rather than summing into the 'claude' span
+            service = copy.copy(self.claude_service)
+            service.timer = RequestTimer()
+            prompt_text = f"{context}Sheet: {sheet.name}\n{sheet.text}"
+            return service.extract_from_text(prompt_text), service.timer
+
+        timer = self.claude_service.timer
+        with timer.span('claude'):
+            with ThreadPoolExecutor(max_workers=min(self.max_workers, len(timesheets))) as pool:
+                outcomes = list(pool.map(extract_sheet, timesheets))
+        results = []
+        for result, sheet_timer in outcomes:
+            timer.absorb(sheet_timer, exclude=('claude',))
+            results.append(result)
+
+        merged = merge_sheet_results(list(zip(timesheets, results)))
+        merged['skipped_sheets'] = [{'sheet': sheet.name, 'kind': sheet.kind, 'reason': 'not a timesheet'}
+                                    for sheet in skipped]
+        if over_limit:
+            # The total is missing whole sheets - never let it pass as a confident match
+            merged['skipped_sheets'] += [{'sheet': sheet.name, 'kind': sheet.kind, 'reason': 'sheet limit'}
+                                         for sheet in over_limit]
+            merged['anomalies'].append(
+                f'{len(over_limit)} timesheet sheets beyond the limit of {self.max_sheets} were not extracted: '
+                f'{", ".join(sheet.name for sheet in over_limit[:10])}'
+            )
+            merged['confidence_score'] *= len(timesheets) / (len(timesheets) + len(over_limit))
+        return merged
+
+
+def _combine(values):
+    """Single distinct value, or a comma-joined list when sheets disagree"""
+    distinct = []
+    for value in values:
+        if value and value not in distinct:
+            distinct.append(value)
+    if not distinct:
+        return None
+    return distinct[0] if len(distinct) == 1 else ', '.join(str(v) for v in distinct)
+
+
+def merge_sheet_results(sheet_results):
+    """Merge per-sheet extraction results into a single response"""
+    daily_breakdown = []
+    anomalies = []
+    sub_results = []
+
+    for sheet, result in sheet_results:
+        daily_breakdown.extend(result['daily_breakdown'])
+        anomalies.extend(f'[{sheet.name}] {anomaly}' for anomaly in result['anomalies'])
+        sub_results.append({
+            'sheet': sheet.name,
+            'extracted_hours': result['extracted_hours'],
+            'confidence_score': result['confidence_score'],
+            'summary': result['summary'],
+            'days': len(result['daily_breakdown']),
+            'anomalies': result['anomalies'],
+            'approval_status': result.get('approval_status'),
+            'approver_name': result.get('approver_name'),
+            'resource_name': result.get('resource_name'),
+            'period': result.get('period'),
+            'model': result.get('model'),
+            'escalated': bool(result.get('escalated_from'))
+        })
+
+    resource_name = _combine(r['resource_name'] for r in sub_results)
+    # The same date on two sheets of one person's workbook is almost always double counting
+    if resource_name and ', ' not in resource_name:
+        seen = {}
+        for entry in daily_breakdown:
+            if entry['date']:
+                seen[entry['date']] = seen.get(entry['date'], 0) + 1
+        duplicates = sorted(day for day, count in seen.items() if count > 1)
+        if duplicates:
+            anomalies.append(f'Dates appear on more than one sheet: {", ".join(duplicates[:10])}')
+
+    statuses = [r['approval_status'] for r in sub_results if r['approval_status']]
+    if statuses and all(status == 'Approved' for status in statuses):
+        approval_status = 'Approved'
+    elif 'Pending' in statuses:
+        approval_status = 'Pending'
+    else:
+        approval_status = _combine(statuses)
+
+    return {
+        'extracted_hours': sum(r['extracted_hours'] for r in sub_results),
+        # A single unreliable sheet makes the workbook total unreliable
+        'confidence_score': min((r['confidence_score'] for r in sub_results), default=0.0),
+        'summary': f'Workbook with {len(sub_results)} timesheet sheets: ' +
+                   '; '.join(f"{r['sheet']} {r['extracted_hours']:g}h" for r in sub_results),
+        'daily_breakdown': daily_breakdown,
+        'anomalies': anomalies,
+        'approval_status': approval_status,
+        'approver_name': _combine(r['approver_name'] for r in sub_results),
+        'resource_name': resource_name,
+        'period': _combine(r['period'] for r in sub_results),
+        'model': _combine(r['model'] for r in sub_results),
+        'escalated_from': _combine(result.get('escalated_from') for _, result in sheet_results),
+        'sheets': sub_results
+    }
@@ -14,18 +14,18 @@ def test_health_endpoint():
         print(f"Health check failed: {e}")
         return False
 
-def test_validate_endpoint_no_file():
-    """Test validation endpoint without file"""
+def test_upload_endpoint_no_file():
+    """Test upload endpoint without file"""
     try:
-        response = requests.post('http://localhost:5000/validate-timesheet')
+        response = requests.post('http://localhost:5000/api/upload')
         print(f"No file test: {response.status_code} - {response.json()}")
         return response.status_code == 400
     except Exception as e:
         print(f"No file test failed: {e}")
         return False
 
-def test_validate_endpoint_with_sample():
-    """Test validation endpoint with sample data"""
+def test_upload_endpoint_unsupported_type():
+    """Test upload endpoint rejects unsupported file types"""
     try:
         # Create a simple text file to test
         with open('/tmp/test_timesheet.txt', 'w') as f:
@@ -34,13 +34,13 @@ def test_validate_endpoint_with_sample():
         with open('/tmp/test_timesheet.txt', 'rb') as f:
             files = {'file': f}
             data = {'claimed_hours': '8.5'}
-            response = requests.post('http://localhost:5000/validate-timesheet', files=files, data=data)
-            print(f"Sample validation: {response.status_code} - {response.json()}")
+            response = requests.post('http://localhost:5000/api/upload', files=files, data=data)
+            print(f"Unsupported type: {response.status_code} - {response.json()}")
         
         os.unlink('/tmp/test_timesheet.txt')
-        return True
+        return response.status_code == 415
     except Exception as e:
-        print(f"Sample validation failed: {e}")
+        print(f"Unsupported type test failed: {e}")
         return False
 
 if __name__ == "__main__":
@@ -50,8 +50,8 @@ if __name__ == "__main__":
     
     tests = [
         ("Health Check", test_health_endpoint),
-        ("No File Error", test_validate_endpoint_no_file),
-        ("Sample Validation", test_validate_endpoint_with_sample)
+        ("No File Error", test_upload_endpoint_no_file),
+        ("Unsupported Type", test_upload_endpoint_unsupported_type)
     ]
     
     results = []
@@ -0,0 +1,67 @@
+from types import SimpleNamespace
+
+import pytest
+
+from services.claude_service import EXTRACTION_TOOL, ClaudeService
+
+
+def tool_reply(tool_input, name=EXTRACTION_TOOL['name'], stop_reason='tool_use'):
+    return SimpleNamespace(stop_reason=stop_reason,
+                           content=[SimpleNamespace(type='tool_use', name=name, input=tool_input)])
+
+
+def text_reply(text):
+    return SimpleNamespace(stop_reason='end_turn', content=[SimpleNamespace(type='text', text=text)])
+
+
+@pytest.fixture
+def service():
+    return ClaudeService(api_key='test-key')
+
+
+def test_positional_rows_become_keyed_entries(service):
+    result = service._parse_response(tool_reply({
+        'extracted_hours': 15.5, 'confidence_score': 0.9, 'summary': 'ok', 'anomalies': [],
+        'days': [['2026-01-05', 8, '09:00', '17:00', 'Build'], ['2026-01-06', '7.5']]
+    }))
+    assert result['daily_breakdown'] == [
+        {'date': '2026-01-05', 'start_time': '09:00', 'end_time': '17:00', 'hours': 8.0, 'notes': 'Build'},
+        {'date': '2026-01-06', 'start_time': None, 'end_time': None, 'hours': 7.5, 'notes': ''},
+    ]
+
+
+def test_missing_or_null_hours_count_as_zero(service):
+    result = service._parse_response(tool_reply({
+        'extracted_hours': 0, 'confidence_score': 0.5, 'days': [['2026-01-05'], ['2026-01-06', None]]
+    }))
+    assert [entry['hours'] for entry in result['daily_breakdown']] == [0.0, 0.0]
+
+
+def test_non_numeric_hours_fail_validation(service):
+    result = service._parse_response(tool_reply({
+        'extracted_hours': 8, 'confidence_score': 0.9, 'days': [['2026-01-05', 'eight']]
+    }))
+    assert result['confidence_score'] == 0.0
+    assert result['summary'].startswith('Response validation error')
+
+
+def test_keyed_json_reply_is_still_accepted(service):
+    result = service._parse_response(text_reply(
+        '```json\n{"extracted_hours": 8, "confidence_score": 1.4, '
+        '"daily_breakdown": [{"date": "2026-01-05", "hours": 8}]}\n```'
+    ))
+    assert result['confidence_score'] == 1.0
+    assert result['daily_breakdown'][0]['hours'] == 8.0
+
+
+@pytest.mark.parametrize('message, reason', [
+    (SimpleNamespace(stop_reason='end_turn', content=[]), 'no record_timesheet tool call'),
+    (tool_reply({}, name='other_tool'), 'no record_timesheet tool call'),
+    (tool_reply(['not', 'an', 'object']), 'tool input is not an object'),
+    (tool_reply({'extracted_hours': 8}, stop_reason='max_tokens'), 'output truncated'),
+])
+def test_unusable_replies_fail_with_zero_confidence(service, message, reason):
+    result = service._parse_response(message)
+    assert result['confidence_score'] == 0.0
+    assert result['daily_breakdown'] == []
+    assert reason in result['summary']
@@ -0,0 +1,103 @@
+import pytest
+
+from services.reconciliation import ClaimsError, normalize_claims, parse_claims_csv, reconcile
+from services.result_store import ResultStore
+
+THRESHOLDS = {'match_tolerance': 0.5, 'minor_mismatch': 2.0, 'min_confidence': 0.7}
+
+
+def test_day_rows_roll_up_into_their_month():
+    claims, days = normalize_claims([
+        {'resource': 'Priya  Sharma', 'date': '2026-01-05', 'hours': '8'},
+        {'Resource_Name': 'priya sharma', 'date': '2026-01-06', 'claimed_hours': 7.5},
+        {'resource': 'Priya Sharma', 'date': '2026-01-06', 'hours': 0.5},
+    ])
+    assert claims == [('priya sharma', 'Priya Sharma', '2026-01', 16.0)]
+    assert days == {0: {'2026-01-05': 8.0, '2026-01-06': 8.0}}
+
+
+def test_month_row_overrides_the_sum_of_days():
+    claims, days = normalize_claims([
+        {'resource': 'Mei Chen', 'date': '2026-02-02', 'hours': 8},
+        {'resource': 'Mei Chen', 'period': 'February 2026', 'hours': 150},
+        {'resource': 'Mei Chen', 'date': '2026-02-03', 'hours': 8},
+    ])
+    assert claims == [('mei chen', 'Mei Chen', '2026-02', 150.0)]
+    assert days == {0: {'2026-02-02': 8.0, '2026-02-03': 8.0}}
+
+
+def test_invalid_rows_are_all_reported():
+    with pytest.raises(ClaimsError) as error:
+        normalize_claims([
+            {'resource': 'A', 'period': '2026-01', 'hours': 'eight'},
+            {'period': '2026-01', 'hours': 8},
+            {'resource': 'A', 'date': '05/01/2026', 'hours': 8},
+            {'resource': 'A', 'hours': 8},
+            'not a row',
+        ])
+    assert [e['row'] for e in error.value.errors] == [1, 2, 3, 4, 5]
+
+
+def test_csv_header_aliases():
+    rows = parse_claims_csv('﻿Employee,Month,Claimed\nLiam Walker,2026-03,40\n')
+    assert normalize_claims(rows)[0] == [('liam walker', 'Liam Walker', '2026-03', 40.0)]
+
+
+def extraction(hours_per_day, resource='Priya Sharma', confidence=0.9):
+    breakdown = [{'date': f'2026-01-{day:02d}', 'hours': hours} for day, hours in enumerate(hours_per_day, start=5)]
+    return {'resource_name': resource, 'period': 'January 2026', 'extracted_hours': sum(hours_per_day),
+            'confidence_score': confidence, 'daily_breakdown': breakdown, 'anomalies': []}
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = ResultStore(str(tmp_path / 'results.db'))
+    store.ensure_schema()
+    return store
+
+
+def run(store, rows):
+    claims, days = normalize_claims(rows)
+    return list(reconcile(store.db_path, claims, days, THRESHOLDS))
+
+
+def test_match_statuses(store):
+    store.save(extraction([8] * 10), 'a')
+    store.save(extraction([8] * 5, resource='Mei Chen', confidence=0.5), 'b')
+    results = run(store, [
+        {'resource': 'Priya Sharma', 'period': '2026-01', 'hours': 80.4},
+        {'resource': 'priya sharma', 'period': '2026-02', 'hours': 10},
+        {'resource': 'Mei Chen', 'period': '2026-01', 'hours': 40},
+    ])
+    assert [(r['resource_name'], r['month'], r['match_status']) for r in results] == [
+        ('Priya Sharma', '2026-01', 'Match'),
+        ('priya sharma', '2026-02', 'Not Found'),
+        ('Mei Chen', '2026-01', 'Low Confidence'),
+    ]
+    assert results[0]['extracted_hours'] == 80.0
+    assert results[0]['variance'] == 0.4
+
+
+def test_day_discrepancies_include_unclaimed_days(store):
+    store.save(extraction([8, 8, 8]), 'a')
+    [result] = run(store, [
+        {'resource': 'Priya Sharma', 'date': '2026-01-05', 'hours': 8},
+        {'resource': 'Priya Sharma', 'date': '2026-01-06', 'hours': 6},
+    ])
+    assert result['match_status'] == 'Mismatch'
+    assert result['day_discrepancies'] == [
+        {'date': '2026-01-06', 'claimed_hours': 6.0, 'extracted_hours': 8.0, 'difference': 2.0},
+        {'date': '2026-01-07', 'claimed_hours': 0, 'extracted_hours': 8.0, 'difference': 8.0},
+    ]
+
+
+def test_superseded_revision_is_not_counted(store):
+    store.save(extraction([8] * 10), 'v1')
+    store.save(extraction([8] * 9 + [3]), 'v2', supersedes='v1')
+    [result] = run(store, [{'resource': 'Priya Sharma', 'period': '2026-01', 'hours': 75}])
+    assert (result['extracted_hours'], result['timesheets'], result['match_status']) == (75.0, 1, 'Match')
+    [result] = run(store, [{'resource': 'Priya Sharma', 'date': '2026-01-14', 'hours': 3}])
+    assert result['day_discrepancies'] == [
+        {'date': f'2026-01-{day:02d}', 'claimed_hours': 0, 'extracted_hours': 8.0, 'difference': 8.0}
+        for day in range(5, 14)
+    ]
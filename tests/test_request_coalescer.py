@@ -0,0 +1,94 @@
+import threading
+import time
+
+import pytest
+
+from services.request_coalescer import RequestCoalescer
+
+
+@pytest.fixture
+def coalescer(tmp_path):
+    return RequestCoalescer(str(tmp_path / 'coalescing.db'), lease_seconds=30, wait_timeout=5, poll_interval=0.01)
+
+
+def counting_compute(calls, body=None, cacheable=True):
+    def compute():
+        calls.append(time.time())
+        return body or {'n': len(calls)}, 200, cacheable
+    return compute
+
+
+def test_identical_request_after_completion_runs_again(coalescer):
+    calls = []
+    first = coalescer.run('key', counting_compute(calls))
+    second = coalescer.run('key', counting_compute(calls))
+    assert first == ({'n': 1}, 200, 'leader')
+    assert second == ({'n': 2}, 200, 'leader')
+
+
+def test_share_window_shares_a_just_completed_result(tmp_path):
+    coalescer = RequestCoalescer(str(tmp_path / 'coalescing.db'), share_window=5, poll_interval=0.01)
+    calls = []
+    coalescer.run('key', counting_compute(calls))
+    assert coalescer.run('key', counting_compute(calls)) == ({'n': 1}, 200, 'follower')
+    assert len(calls) == 1
+
+
+def test_idempotent_result_is_replayed(coalescer):
+    calls = []
+    coalescer.run('key', counting_compute(calls), idempotent=True)
+    assert coalescer.run('key', counting_compute(calls), idempotent=True) == ({'n': 1}, 200, 'replay')
+    assert len(calls) == 1
+
+
+def test_uncacheable_idempotent_result_is_not_replayed(coalescer):
+    calls = []
+    coalescer.run('key', counting_compute(calls, cacheable=False), idempotent=True)
+    assert coalescer.run('key', counting_compute(calls), idempotent=True)[2] == 'leader'
+    assert len(calls) == 2
+
+
+def test_concurrent_duplicate_follows_the_leader(coalescer):
+    started, release = threading.Event(), threading.Event()
+    calls = []
+
+    def slow_compute():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return {'result': 'shared'}, 200, False
+
+    results = {}
+    leader = threading.Thread(target=lambda: results.setdefault('leader', coalescer.run('key', slow_compute)))
+    leader.start()
+    started.wait(5)
+    follower = threading.Thread(target=lambda: results.setdefault('follower', coalescer.run('key', slow_compute)))
+    follower.start()
+    time.sleep(0.05)
+    release.set()
+    leader.join(5)
+    follower.join(5)
+
+    assert len(calls) == 1
+    assert results['leader'] == ({'result': 'shared'}, 200, 'leader')
+    assert results['follower'] == ({'result': 'shared'}, 200, 'follower')
+
+
+def test_expired_lease_is_taken_over(coalescer):
+    now = time.time()
+    coalescer._conn().execute(
+        "INSERT INTO flights (key, state, owner, heartbeat, created_at) VALUES ('key', 'running', 'dead', ?, ?)",
+        (now - 60, now - 60)
+    )
+    calls = []
+    assert coalescer.run('key', counting_compute(calls)) == ({'n': 1}, 200, 'leader')
+
+
+def test_failed_leader_releases_the_key(coalescer):
+    def failing():
+        raise RuntimeError('boom')
+
+    with pytest.raises(RuntimeError):
+        coalescer.run('key', failing)
+    calls = []
+    assert coalescer.run('key', counting_compute(calls))[2] == 'leader'
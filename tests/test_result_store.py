@@ -0,0 +1,80 @@
+import sqlite3
+
+import pytest
+
+from services.result_store import ResultStore
+
+
+def response(hours_per_day, resource='Priya Sharma', month='2026-01', confidence=0.9):
+    breakdown = [{'date': f'{month}-{day:02d}', 'hours': hours, 'start_time': None, 'end_time': None, 'notes': ''}
+                 for day, hours in enumerate(hours_per_day, start=1)]
+    return {
+        'file_name': 'timesheet.xlsx', 'file_type': 'xlsx', 'resource_name': resource,
+        'period': 'January 2026', 'extracted_hours': sum(hours_per_day), 'confidence_score': confidence,
+        'daily_breakdown': breakdown, 'anomalies': []
+    }
+
+
+@pytest.fixture
+def store(tmp_path):
+    return ResultStore(str(tmp_path / 'results.db'))
+
+
+def test_rollup_sums_timesheets_per_month(store):
+    store.save(response([8] * 10), 'a')
+    store.save(response([8] * 5, resource='Mei Chen'), 'b')
+    assert store.hours_by_resource_month() == [
+        {'resource_name': 'Mei Chen', 'month': '2026-01', 'hours': 40.0, 'entries': 5, 'timesheets': 1},
+        {'resource_name': 'Priya Sharma', 'month': '2026-01', 'hours': 80.0, 'entries': 10, 'timesheets': 1},
+    ]
+
+
+def test_resaving_a_file_replaces_its_record(store):
+    store.save(response([8] * 10), 'a')
+    store.save(response([7] * 10), 'a')
+    rows, _ = store.query()
+    assert len(rows) == 1
+    assert store.hours_by_resource_month()[0]['hours'] == 70.0
+
+
+def test_superseded_revision_leaves_the_rollup(store):
+    store.save(response([8] * 10), 'v1')
+    store.save(response([8] * 9 + [3]), 'v2', supersedes='v1')
+
+    assert store.hours_by_resource_month() == [
+        {'resource_name': 'Priya Sharma', 'month': '2026-01', 'hours': 75.0, 'entries': 10, 'timesheets': 1}
+    ]
+    rows, _ = store.query()
+    assert {row['file_hash']: row['superseded_by'] for row in rows} == {'v1': 'v2', 'v2': None}
+    rows, _ = store.query(include_duplicates=False)
+    assert [row['file_hash'] for row in rows] == ['v2']
+
+
+def test_revision_chain_counts_only_the_newest(store):
+    store.save(response([8] * 10), 'v1')
+    store.save(response([8] * 9 + [3]), 'v2', supersedes='v1')
+    store.save(response([8] * 9 + [4]), 'v3', supersedes='v2')
+    store.save(response([8] * 9 + [5]), 'v4', supersedes='v1')  # edited from an old copy - replaces v3
+    hours = {row['month']: (row['hours'], row['timesheets']) for row in store.hours_by_resource_month()}
+    assert hours == {'2026-01': (77.0, 1)}
+    rows, _ = store.query()
+    assert {row['file_hash']: row['superseded_by'] for row in rows} == {'v1': 'v2', 'v2': 'v3', 'v3': 'v4', 'v4': None}
+
+
+def test_old_store_gains_the_superseded_by_column(tmp_path):
+    path = str(tmp_path / 'results.db')
+    conn = sqlite3.connect(path)
+    conn.execute('CREATE TABLE extractions (id INTEGER PRIMARY KEY, file_hash TEXT NOT NULL UNIQUE, '
+                 'file_name TEXT, file_type TEXT, file_size_bytes INTEGER, s3_url TEXT, request_id TEXT, '
+                 'resource_name TEXT, resource_key TEXT, period TEXT, period_start TEXT, period_end TEXT, '
+                 'period_month TEXT, approval_status TEXT, approver_name TEXT, extracted_hours REAL NOT NULL, '
+                 'confidence_score REAL NOT NULL, claimed_hours REAL, match_status TEXT, variance REAL, '
+                 'summary TEXT, anomalies TEXT, duplicate_of TEXT, entry_count INTEGER NOT NULL, '
+                 'uploaded_at TEXT NOT NULL)')
+    conn.commit()
+    conn.close()
+
+    store = ResultStore(path)
+    store.save(response([8] * 10), 'v1')
+    store.save(response([8] * 10), 'v2', supersedes='v1')
+    assert store.get(1)['superseded_by'] == 'v2'
@@ -0,0 +1,162 @@
+import importlib
+import io
+import sys
+from datetime import datetime
+
+import openpyxl
+import pytest
+
+from services.revision_index import RevisionDiff, RevisionIndex, merge_revision, source_rows
+from services.table_serializer import DELIMITER, DITTO
+
+HEADER = ['Date', 'Start', 'End', 'Hours', 'Notes']
+
+
+def rows(hours_per_day, resource='Priya Sharma'):
+    table = [['Consultant', resource], ['Period', 'January 2026'], HEADER]
+    table += [[f'2026-01-{day:02d}', '09:00', '17:00', f'{hours:g}', 'Project work']
+              for day, hours in enumerate(hours_per_day, start=5)]
+    table.append(['Total', '', '', f'{sum(hours_per_day):g}', ''])
+    return table
+
+
+def result(hours_per_day, resource='Priya Sharma'):
+    breakdown = [{'date': f'2026-01-{day:02d}', 'hours': hours, 'start_time': '09:00', 'end_time': '17:00',
+                  'notes': 'Project work'} for day, hours in enumerate(hours_per_day, start=5)]
+    return {
+        'resource_name': resource, 'period': 'January 2026', 'extracted_hours': sum(hours_per_day),
+        'confidence_score': 0.9, 'daily_breakdown': breakdown, 'anomalies': [], 'summary': 'January timesheet.',
+        'model': 'claude-sonnet'
+    }
+
+
+def test_source_rows_fill_ditto_marks_from_the_row_above():
+    text = DELIMITER.join(['2026-01-05', '09:00', '8']) + '\n\n' + DELIMITER.join(['2026-01-06', DITTO, '7'])
+    assert source_rows(text) == [['2026-01-05', '09:00', '8'], ['2026-01-06', '09:00', '7']]
+
+
+def test_changed_hours_are_numeric_and_the_totals_row_is_ignored():
+    diff = RevisionDiff(rows([8] * 10), rows([8] * 9 + [3]))
+    assert [(day, changed) for day, _, _, changed in diff.numeric] == [('2026-01-14', [3])]
+    assert not (diff.added or diff.removed or diff.metadata_changed)
+
+
+def test_new_and_dropped_days_are_redone():
+    diff = RevisionDiff(rows([8] * 10), rows([8] * 9))
+    assert diff.redo_days() == {'2026-01-14'}
+    assert diff.removed and not diff.added
+
+
+def test_metadata_change_is_flagged():
+    diff = RevisionDiff(rows([8] * 10), rows([8] * 10)[:1] + [['Period', 'February 2026']] + rows([8] * 10)[2:])
+    assert diff.metadata_changed
+    assert not diff.unchanged
+
+
+def test_numeric_change_is_merged_without_reextraction():
+    diff = RevisionDiff(rows([8] * 10), rows([8] * 9 + [3]))
+    updates = diff.apply_numeric_locally(result([8] * 10)['daily_breakdown'])
+    assert updates == {'2026-01-14': {'hours': 3.0}}
+
+    merged = merge_revision(result([8] * 10), diff, updates)
+    assert merged['extracted_hours'] == 75
+    assert merged['changed_days'] == [
+        {'date': '2026-01-14', 'change': 'modified', 'previous_hours': 8, 'hours': 3.0}
+    ]
+    assert merged['model'] is None
+    assert merged['summary'].endswith('Revised: 1 day(s) changed, 75 hours in total.')
+
+
+def test_partial_extraction_missing_a_revised_day_falls_back():
+    diff = RevisionDiff(rows([8] * 10), rows([8] * 11))
+    assert merge_revision(result([8] * 10), diff, {}, partial_result={'daily_breakdown': []}) is None
+
+
+def test_index_finds_the_earlier_version_of_the_same_resource(tmp_path):
+    index = RevisionIndex(str(tmp_path / 'revisions.db'))
+    index.add('v1', 'jan.xlsx', 'xlsx', rows([8] * 10), result([8] * 10))
+    index.add('other', 'jan.xlsx', 'xlsx', rows([8] * 10, resource='Mei Chen'), result([8] * 10, 'Mei Chen'))
+
+    match = index.find(rows([8] * 9 + [3]), 'xlsx')
+    assert match['file_hash'] == 'v1'
+    assert match['similarity'] >= index.min_similarity
+    assert index.find(rows([8] * 10), 'pdf') is None
+    assert index.find(rows([8] * 10), 'xlsx', file_hash='v1') is None
+
+
+def workbook(hours_per_day):
+    book = openpyxl.Workbook()
+    sheet = book.active
+    sheet.append(['Consultant', 'Priya Sharma'])
+    sheet.append(['Period', 'January 2026'])
+    sheet.append(HEADER)
+    for day, hours in enumerate(hours_per_day, start=5):
+        sheet.append([datetime(2026, 1, day), '09:00', '17:00', hours, 'Project work'])
+    sheet.append(['Total', None, None, sum(hours_per_day), None])
+    buffer = io.BytesIO()
+    book.save(buffer)
+    return buffer.getvalue()
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    from benchmarks.fakes import FakeClaudeServer
+
+    claude = FakeClaudeServer()
+    claude.start()
+    for key, value in {
+        'ANTHROPIC_API_KEY': 'test-key', 'ANTHROPIC_BASE_URL': claude.url, 'DATA_DIR': str(tmp_path),
+        'AWS_ACCESS_KEY_ID': '', 'AWS_SECRET_ACCESS_KEY': '', 'LOG_FILE': '', 'COALESCE_REQUESTS': 'false',
+        'NEAR_DUPLICATE_POLICY': 'off'
+    }.items():
+        monkeypatch.setenv(key, value)
+    sys.modules.pop('app', None)
+    app = importlib.import_module('app')
+    try:
+        yield app.app.test_client()
+    finally:
+        sys.modules.pop('app', None)
+        claude.stop()
+
+
+def test_revised_file_replaces_the_old_month_total(client):
+    for hours in ([8] * 10, [8] * 9 + [3]):
+        response = client.post('/api/upload', data={'file': (io.BytesIO(workbook(hours)), 'priya.xlsx')},
+                               content_type='multipart/form-data')
+        assert response.status_code == 200
+
+    body = response.get_json()
+    assert body['revision_of']['mode'] == 'local'
+    assert body['extracted_hours'] == 75
+
+    rows_by_month = client.get('/api/timesheets/hours-by-month').get_json()['rows']
+    assert [(row['hours'], row['timesheets']) for row in rows_by_month] == [(75.0, 1)]
+
+
+def test_revision_chain_keeps_only_the_newest_total(client):
+    for hours in ([8] * 10, [8] * 9 + [3], [8] * 9 + [5]):
+        response = client.post('/api/upload', data={'file': (io.BytesIO(workbook(hours)), 'priya.xlsx')},
+                               content_type='multipart/form-data')
+        assert response.status_code == 200
+
+    rows_by_month = client.get('/api/timesheets/hours-by-month').get_json()['rows']
+    assert [(row['hours'], row['timesheets']) for row in rows_by_month] == [(77.0, 1)]
+
+
+def test_revision_replaces_the_version_it_revises(tmp_path):
+    index = RevisionIndex(str(tmp_path / 'revisions.db'))
+    index.add('v1', 'jan.xlsx', 'xlsx', rows([8] * 10), result([8] * 10))
+    index.add('v2', 'jan.xlsx', 'xlsx', rows([8] * 9 + [3]), result([8] * 9 + [3]), supersedes='v1')
+
+    assert index.find(rows([8] * 9 + [4]), 'xlsx')['file_hash'] == 'v2'
+
+
+def test_reuploading_the_same_file_is_not_a_revision(client):
+    for _ in range(2):
+        response = client.post('/api/upload', data={'file': (io.BytesIO(workbook([8] * 10)), 'priya.xlsx')},
+                               content_type='multipart/form-data')
+        assert response.status_code == 200
+
+    assert 'revision_of' not in response.get_json()
+    rows_by_month = client.get('/api/timesheets/hours-by-month').get_json()['rows']
+    assert [(row['hours'], row['timesheets']) for row in rows_by_month] == [(80.0, 1)]
@@ -0,0 +1,110 @@
+import os
+import time
+
+import pytest
+
+from services.s3_outbox import S3Outbox
+
+
+class FakeS3:
+    """Records uploaded bytes by key; raises while failing is set"""
+
+    def __init__(self):
+        self.objects = {}
+        self.failing = False
+
+    def upload_file(self, path, bucket, key, ExtraArgs=None):
+        if self.failing:
+            raise ConnectionError('S3 unavailable')
+        with open(path, 'rb') as f:
+            self.objects[key] = f.read()
+
+
+@pytest.fixture
+def s3():
+    return FakeS3()
+
+
+@pytest.fixture
+def outbox(tmp_path, s3, monkeypatch):
+    outbox = S3Outbox(str(tmp_path / 'outbox.db'), str(tmp_path / 'spool'), s3, 'bucket', max_attempts=3,
+                      base_backoff=10.0)
+    monkeypatch.setattr(outbox, 'start', lambda: None)  # batches are driven by the test
+    return outbox
+
+
+def test_enqueued_file_is_uploaded_and_unspooled(outbox, s3):
+    status = outbox.enqueue(b'timesheet', 'uploads/a.pdf', 'hash-a', 'a.pdf', 'application/pdf')
+    assert status['state'] == 'pending'
+    spool_path = outbox._spool_path('uploads/a.pdf')
+    assert os.path.exists(spool_path)
+
+    assert outbox.process_batch('worker') == 1
+    assert s3.objects == {'uploads/a.pdf': b'timesheet'}
+    assert outbox.status('uploads/a.pdf')['state'] == 'uploaded'
+    assert not os.path.exists(spool_path)
+
+
+def test_failure_backs_off_then_fails_after_max_attempts(outbox, s3):
+    outbox.enqueue(b'timesheet', 'uploads/a.pdf', 'hash-a')
+    s3.failing = True
+
+    before = time.time()
+    outbox.process_batch('worker')
+    status = outbox.status('uploads/a.pdf')
+    assert (status['state'], status['attempts'], status['last_error']) == ('pending', 1, 'S3 unavailable')
+    assert before + 5.0 <= status['next_attempt_at'] <= time.time() + 10.0
+    assert outbox.process_batch('worker') == 0  # not due yet
+
+    for _ in range(2):
+        outbox._conn().execute('UPDATE uploads SET next_attempt_at = 0')
+        outbox.process_batch('worker')
+    status = outbox.status('uploads/a.pdf')
+    assert (status['state'], status['attempts']) == ('failed', 3)
+    assert os.path.exists(outbox._spool_path('uploads/a.pdf'))
+
+
+def test_missing_spool_file_fails_at_once(outbox):
+    outbox.enqueue(b'timesheet', 'uploads/a.pdf', 'hash-a')
+    os.unlink(outbox._spool_path('uploads/a.pdf'))
+    outbox.process_batch('worker')
+    assert outbox.status('uploads/a.pdf')['state'] == 'failed'
+
+
+def test_expired_lease_is_taken_over(outbox, s3):
+    outbox.enqueue(b'timesheet', 'uploads/a.pdf', 'hash-a')
+    outbox.lease_seconds = -1  # the first worker claims it and dies mid-upload
+    assert len(outbox._claim('dead-worker')) == 1
+    outbox.lease_seconds = 300
+
+    assert outbox.process_batch('worker') == 1
+    assert outbox.status('uploads/a.pdf')['state'] == 'uploaded'
+    assert s3.objects == {'uploads/a.pdf': b'timesheet'}
+
+
+def test_live_lease_is_not_taken_over(outbox):
+    outbox.enqueue(b'timesheet', 'uploads/a.pdf', 'hash-a')
+    assert len(outbox._claim('busy-worker')) == 1
+    assert outbox.process_batch('worker') == 0
+    assert outbox.status('uploads/a.pdf')['state'] == 'uploading'
+
+
+def test_reenqueue_after_failure_starts_a_fresh_attempt_budget(outbox, s3):
+    outbox.enqueue(b'old bytes', 'uploads/a.pdf', 'hash-a')
+    s3.failing = True
+    for _ in range(3):
+        outbox._conn().execute('UPDATE uploads SET next_attempt_at = 0')
+        outbox.process_batch('worker')
+    assert outbox.status('uploads/a.pdf')['state'] == 'failed'
+
+    s3.failing = False
+    status = outbox.enqueue(b'new bytes', 'uploads/a.pdf', 'hash-a')
+    assert (status['state'], status['attempts'], status['last_error']) == ('pending', 0, None)
+    outbox.process_batch('worker')
+    assert s3.objects == {'uploads/a.pdf': b'new bytes'}
+
+
+def test_enqueue_of_a_pending_key_keeps_the_existing_entry(outbox):
+    outbox.enqueue(b'timesheet', 'uploads/a.pdf', 'hash-a')
+    assert outbox.enqueue(b'timesheet', 'uploads/a.pdf', 'hash-a')['state'] == 'pending'
+    assert outbox.stats()['pending'] == 1
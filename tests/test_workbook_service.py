@@ -0,0 +1,46 @@
+import time
+
+from services.metrics import RequestTimer
+from services.workbook_service import Sheet, WorkbookService
+
+
+class SlowClaude:
+    """Stands in for ClaudeService: each call takes CALL_SECONDS and bills 100 input tokens"""
+
+    CALL_SECONDS = 0.1
+
+    def __init__(self):
+        self.timer = RequestTimer()
+
+    def extract_from_text(self, text):
+        with self.timer.span('claude'):
+            time.sleep(self.CALL_SECONDS)
+        self.timer.add_span('parse', 0.001)
+        self.timer.usage['input_tokens'] += 100
+        self.timer.record_model('claude-test')
+        return {'extracted_hours': 40, 'confidence_score': 0.9, 'summary': text.splitlines()[0],
+                'daily_breakdown': [], 'anomalies': []}
+
+
+def sheets(count):
+    return [Sheet(f'Week {index}', 'rows', 'timesheet', 5) for index in range(count)]
+
+
+def test_concurrent_sheets_record_wall_clock_claude_time():
+    claude = SlowClaude()
+    WorkbookService(claude, max_workers=4).extract(sheets(4))
+
+    assert claude.timer.spans['claude'] < 2 * SlowClaude.CALL_SECONDS
+    assert claude.timer.spans['parse'] > 0
+    assert claude.timer.usage['input_tokens'] == 400
+    assert claude.timer.models == ['claude-test'] * 4
+
+
+def test_sheets_over_the_limit_are_reported():
+    claude = SlowClaude()
+    result = WorkbookService(claude, max_sheets=2).extract(sheets(4))
+
+    assert result['extracted_hours'] == 80
+    assert [s['sheet'] for s in result['skipped_sheets'] if s['reason'] == 'sheet limit'] == ['Week 2', 'Week 3']
+    assert result['confidence_score'] == 0.45
+    assert any('beyond the limit of 2' in anomaly for anomaly in result['anomalies'])